@@ -0,0 +1,538 @@
+"""
+Benchmarks of the client-side pieces of the suite, with stored baselines and regression gating.
+
+Every benchmark is warmed up, then timed over `--repeat` runs of its number of calls; the per-call
+times are summarized (min, median, mean, stdev, max) in microseconds. Everything runs offline,
+round-trips go to the in-process Petstore. Run them with
+
+    python tests/benchSuite.py run
+    python tests/benchSuite.py record                 # store this machine's baseline in tests/benchmarks/baseline.json
+    python tests/benchSuite.py compare --threshold 0.25
+
+Baselines are stored per machine, keyed by `machine_key`, and `compare` only checks against the
+baseline of the machine it runs on; without one it reports so and does not gate. It exits with
+status 1 when the best time of a benchmark is more than its threshold slower than the baseline's.
+The best of the runs is compared because noise only ever adds time.
+
+The bulk user endpoints are benchmarked with batches of 1 to 10k users. `batches` charts their
+cost per user against the batch size and exits with status 1 when an endpoint's largest batch
+is not at least `--min-gain` times cheaper per user than a batch of one:
+
+    python tests/benchSuite.py batches
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import fnmatch
+import gc
+import inspect
+import json
+import math
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+from clientPool import LOCAL_BASE_URL, PoolStats, build_transport
+from idAllocator import IdAllocator
+from petAuth import BearerAuth, IdentityPool, TokenCache
+from petDecoding import JSON_BACKENDS, decode, orjson_available
+from petModel import PetResponse
+from petPayloads import pet_payload, user_batch
+from requestTiming import TimingLog
+from resourceTracker import ResourceTracker
+
+DEFAULT_BASELINE = Path(__file__).parent / "benchmarks" / "baseline.json"
+DEFAULT_THRESHOLD = 0.25
+BATCH_SIZES = (1, 10, 100, 1000, 10000)
+BULK_ENDPOINTS = {"users_array": "/user/createWithArray", "users_list": "/user/createWithList"}
+BATCH_NAME = re.compile(r"(?P<endpoint>.+)_batch_(?P<size>\d+)$")
+DEFAULT_MIN_GAIN = 10.0
+BODY = json.dumps(pet_payload(9_000_000_101, tags=[{"id": tag, "name": f"tag{tag}"} for tag in range(5)])).encode()
+
+
+class Benchmark:
+    """
+    One registered benchmark.
+
+    Args:
+        name (str): The name results are stored under.
+        setup (callable): Async context manager factory yielding the operation to time, a sync or async callable.
+        number (int): Calls per timing run.
+        threshold (float or None): Allowed slowdown, `DEFAULT_THRESHOLD` (or `--threshold`) if None.
+        description (str): One line shown in the listing.
+    """
+
+    def __init__(self, name, setup, number, threshold=None, description=""):
+        self.name = name
+        self.setup = setup
+        self.number = number
+        self.threshold = threshold
+        self.description = description
+
+
+BENCHMARKS = {}
+
+
+def benchmark(number, threshold=None, name=None):
+    """Register an async generator function yielding the operation to time as a benchmark."""
+
+    def register(function):
+        benchmark_name = name or function.__name__
+        BENCHMARKS[benchmark_name] = Benchmark(benchmark_name, contextlib.asynccontextmanager(function), number,
+                                               threshold, inspect.getdoc(function) or "")
+        return function
+
+    return register
+
+
+@contextlib.asynccontextmanager
+async def local_transport():
+    transport = build_transport(PoolStats(), target="local")
+    try:
+        yield transport
+    finally:
+        await transport.aclose_shared()
+
+
+@benchmark(number=2000)
+async def fixture_setup():
+    """What the fixtures of a pet test do before it runs: ids, payload, event hooks, auth and client."""
+    allocator = IdAllocator()
+    tokens = TokenCache()
+    identities = IdentityPool()
+    timing = TimingLog()
+    tracker = ResourceTracker()
+    tests = iter(range(sys.maxsize))
+
+    async def setup():
+        nodeid = f"tests/test_swPetStore_post.py::test_post_pet[{next(tests)}]"
+        pet_id = allocator.ids_for(nodeid).next()
+        pet_payload(pet_id)
+        timing_hooks = timing.event_hooks(nodeid, ())
+        tracking_hooks = tracker.event_hooks(nodeid)
+        event_hooks = {
+            "request": timing_hooks["request"] + tracking_hooks["request"],
+            "response": timing_hooks["response"] + tracking_hooks["response"],
+        }
+        auth = BearerAuth(tokens, identities.for_owner(nodeid))
+        auth.token
+        async with httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=transport, event_hooks=event_hooks,
+                                     auth=auth):
+            pass
+
+    async with local_transport() as transport:
+        yield setup
+
+
+@benchmark(number=2000)
+async def client_shared_transport():
+    """`httpx.AsyncClient` construction and close on the session's shared transport."""
+
+    async def construct():
+        async with httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=transport):
+            pass
+
+    async with local_transport() as transport:
+        yield construct
+
+
+@benchmark(number=50, threshold=0.5)
+async def client_own_pool():
+    """`httpx.AsyncClient` construction and close with its own pool and TLS context."""
+
+    async def construct():
+        async with httpx.AsyncClient(base_url=LOCAL_BASE_URL):
+            pass
+
+    yield construct
+
+
+@benchmark(number=5000)
+async def jwt_mint():
+    """Signing a new HS256 token, what `fake_jwt_token` cost before the token cache."""
+    tokens = TokenCache()
+    yield lambda: tokens.mint("test_user", ("write:pets", "read:pets"))
+
+
+@benchmark(number=20000)
+async def jwt_cached():
+    """`fake_jwt_token` from the session's token cache."""
+    auth = BearerAuth(TokenCache())
+    yield lambda: auth.token
+
+
+@benchmark(number=20000)
+async def decode_pet_model():
+    """`PetResponse(**json.loads(body))`, how the tests decoded pets before `petDecoding`."""
+    yield lambda: PetResponse(**json.loads(BODY))
+
+
+def _register_decoders():
+    for backend in JSON_BACKENDS:
+
+        async def decode_pet(backend=backend):
+            yield lambda: decode(BODY, PetResponse, backend)
+
+        decode_pet.__doc__ = f"`petDecoding.decode` of a pet with the {backend} backend."
+        benchmark(number=20000, name=f"decode_pet_{backend}")(decode_pet)
+
+
+_register_decoders()
+
+
+@benchmark(number=500, threshold=0.5)
+async def round_trip_get():
+    """GET /pet/{petId} against the local Petstore through the shared transport."""
+    async with local_transport() as transport:
+        async with httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=transport) as client:
+            (await client.post("/pet", json=pet_payload(9_000_000_101))).raise_for_status()
+            yield lambda: client.get("/pet/9000000101")
+
+
+@benchmark(number=500, threshold=0.5)
+async def round_trip_post():
+    """POST /pet of a new pet against the local Petstore through the shared transport."""
+    ids = iter(range(9_000_000_000, sys.maxsize))
+    async with local_transport() as transport:
+        async with httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=transport) as client:
+            yield lambda: client.post("/pet", json=pet_payload(next(ids)))
+
+
+def _register_batches():
+    for endpoint, path in BULK_ENDPOINTS.items():
+        for size in BATCH_SIZES:
+
+            async def create_users(path=path, size=size):
+                # The same usernames every call: the Petstore overwrites them, so it does not grow.
+                users = user_batch(size, prefix="bench")
+                async with local_transport() as transport:
+                    async with httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=transport) as client:
+
+                        async def post():
+                            (await client.post(path, json=users)).raise_for_status()
+
+                        yield post
+
+            create_users.__doc__ = f"POST {path} of a batch of {size} users against the local Petstore."
+            benchmark(number=max(1000 // size, 2), threshold=0.5, name=f"{endpoint}_batch_{size}")(create_users)
+
+
+_register_batches()
+
+
+def available(name):
+    return name != "decode_pet_orjson" or orjson_available()
+
+
+async def _timer(operation):
+    """Return an async function timing `number` calls of `operation`, calling it once to tell if it is async."""
+    result = operation()
+    if not inspect.isawaitable(result):
+        return lambda number: _time_sync(operation, number)
+    await result
+
+    async def time_async(number):
+        started = time.perf_counter()
+        for _ in range(number):
+            await operation()
+        return time.perf_counter() - started
+
+    return time_async
+
+
+async def _time_sync(operation, number):
+    started = time.perf_counter()
+    for _ in range(number):
+        operation()
+    return time.perf_counter() - started
+
+
+def summarize(times):
+    """Statistics of per-call times in microseconds."""
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "max": max(times),
+    }
+
+
+async def measure(bench, repeat=5, warmup=1, scale=1.0):
+    """
+    Time `bench` after `warmup` discarded runs, with the garbage collector off like `timeit`.
+
+    Returns:
+        dict: `number`, `repeat`, the per-call `times` of every run and their `summarize` statistics.
+    """
+    number = max(int(bench.number * scale), 1)
+    async with bench.setup() as operation:
+        timer = await _timer(operation)
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(warmup):
+                await timer(number)
+            times = [await timer(number) / number * 1e6 for _ in range(repeat)]
+        finally:
+            if collecting:
+                gc.enable()
+    return {"number": number, "repeat": repeat, **summarize(times), "times": times}
+
+
+def machine():
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def machine_key(description):
+    """
+    Return the key the baseline of a `machine()` description is stored under.
+
+    Timings depend on the interpreter and its minor version, the platform and the CPU count, so
+    these make the key; patch versions and processor names do not.
+    """
+    python = ".".join(description["python"].split(".")[:2])
+    return (f"{description['implementation']}-{python}-{description['system']}-{description['machine']}-"
+            f"{description['cpus']}cpu")
+
+
+def select(patterns=None):
+    """Return the available benchmarks matching any of the glob `patterns`, all of them by default."""
+    return [bench for name, bench in BENCHMARKS.items()
+            if available(name) and (not patterns or any(fnmatch.fnmatch(name, pattern) for pattern in patterns))]
+
+
+async def run(benchmarks, repeat=5, warmup=1, scale=1.0, report=print):
+    """Measure `benchmarks` one after the other and return the results document."""
+    results = {}
+    for bench in benchmarks:
+        results[bench.name] = result = await measure(bench, repeat, warmup, scale)
+        report(f"  {bench.name:<26} min {result['min']:10.2f} us  median {result['median']:10.2f} us  "
+               f"stdev {result['stdev'] / result['mean']:6.1%}  ({repeat} x {result['number']})")
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "machine": machine(),
+        "benchmarks": results,
+    }
+
+
+class Comparison:
+    """How a benchmark's best time compares with the baseline's."""
+
+    def __init__(self, name, baseline, current, threshold):
+        self.name = name
+        self.baseline = baseline
+        self.current = current
+        self.threshold = threshold
+
+    @property
+    def ratio(self):
+        if self.baseline is None or self.current is None:
+            return None
+        return self.current["min"] / self.baseline["min"]
+
+    @property
+    def status(self):
+        if self.baseline is None:
+            return "new"
+        if self.current is None:
+            return "missing"
+        if self.ratio > 1 + self.threshold:
+            return "regressed"
+        if self.ratio < 1 / (1 + self.threshold):
+            return "improved"
+        return "ok"
+
+    def __str__(self):
+        if self.ratio is None:
+            return f"  {self.name:<26} {self.status}"
+        return (f"  {self.name:<26} {self.baseline['min']:10.2f} -> {self.current['min']:10.2f} us  "
+                f"{self.ratio:5.2f}x (limit {1 + self.threshold:.2f}x)  {self.status}")
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare two results documents benchmark by benchmark.
+
+    Args:
+        baseline (dict): The stored baseline.
+        current (dict): The results to check.
+        threshold (float): Allowed relative slowdown of benchmarks without their own threshold.
+
+    Returns:
+        list: A `Comparison` per benchmark of either document.
+    """
+    names = list(baseline["benchmarks"]) + [name for name in current["benchmarks"] if name not in baseline["benchmarks"]]
+    comparisons = []
+    for name in names:
+        bench = BENCHMARKS.get(name)
+        limit = bench.threshold if bench is not None and bench.threshold is not None else threshold
+        comparisons.append(Comparison(name, baseline["benchmarks"].get(name), current["benchmarks"].get(name), limit))
+    return comparisons
+
+
+def batch_costs(results):
+    """
+    Cost per item of the batch benchmarks of a results document.
+
+    Returns:
+        dict: Endpoint to `[(batch size, best microseconds per item)]`, by increasing size.
+    """
+    costs = {}
+    for name, result in results["benchmarks"].items():
+        found = BATCH_NAME.match(name)
+        if found is not None:
+            size = int(found.group("size"))
+            costs.setdefault(found.group("endpoint"), []).append((size, result["min"] / size))
+    return {endpoint: sorted(points) for endpoint, points in costs.items()}
+
+
+def batch_gain(points):
+    """How many times cheaper per item the largest batch is than the smallest."""
+    return points[0][1] / points[-1][1]
+
+
+def format_batch_chart(costs, min_gain=DEFAULT_MIN_GAIN, width=40):
+    """
+    Chart the cost per item against the batch size, one bar per batch size of every endpoint.
+
+    The bars are on a log scale, so the tail of large batches stays readable next to a batch
+    of one. The gain column is how much cheaper per item a batch is than the previous size:
+    where it falls to about 1x, bigger batches stop paying off.
+    """
+    lines = []
+    for endpoint, points in costs.items():
+        gain = batch_gain(points)
+        verdict = "ok" if gain >= min_gain else f"DEGRADED, below {min_gain:g}x"
+        lines.append(f"{endpoint}: {gain:.1f}x cheaper per item at {points[-1][0]} than at {points[0][0]}  {verdict}")
+        lowest, highest = min(cost for _, cost in points), max(cost for _, cost in points)
+        span = math.log(highest / lowest) or 1.0
+        previous = None
+        for size, cost in points:
+            bar = "#" * (1 + round(math.log(cost / lowest) / span * (width - 1)))
+            step = f"{previous / cost:6.1f}x" if previous else " " * 7
+            lines.append(f"  {size:>6}  {cost:10.2f} us/item  {step}  {bar}")
+            previous = cost
+    return "\n".join(lines)
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def save(results, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2) + "\n")
+
+
+def load_baselines(path):
+    """
+    Return the baselines stored at `path` by machine key, none when there is no file yet.
+
+    A file holding a single results document is read as the baseline of the machine it names.
+    """
+    if not Path(path).exists():
+        return {}
+    document = load(path)
+    if "baselines" not in document:
+        return {machine_key(document["machine"]): document}
+    return document["baselines"]
+
+
+def record_baseline(results, path):
+    """Store `results` as the baseline of their machine at `path`, keeping the other machines' baselines."""
+    baselines = load_baselines(path)
+    baselines[machine_key(results["machine"])] = results
+    save({"baselines": dict(sorted(baselines.items()))}, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the client-side pieces of the Petstore suite.")
+    measuring = argparse.ArgumentParser(add_help=False)
+    measuring.add_argument("--only", nargs="+", metavar="PATTERN", help="benchmarks to run, glob patterns")
+    measuring.add_argument("--repeat", type=int, default=5, help="timing runs per benchmark")
+    measuring.add_argument("--warmup", type=int, default=1, help="discarded runs before timing")
+    measuring.add_argument("--scale", type=float, default=1.0, help="multiplier of the calls per timing run")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", parents=[measuring], help="run the benchmarks")
+    run_parser.add_argument("--output", help="write the results as JSON to this file")
+    record_parser = commands.add_parser("record", parents=[measuring], help="run and store this machine's baseline")
+    record_parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="file of the baselines by machine")
+    compare_parser = commands.add_parser("compare", parents=[measuring],
+                                         help="run, or load --results, and fail on regressions")
+    compare_parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="file of the baselines by machine")
+    compare_parser.add_argument("--results", help="compare this results file instead of running")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="allowed relative slowdown, 0.25 fails above 1.25x the baseline")
+    compare_parser.add_argument("--output", help="write the results as JSON to this file")
+    batches_parser = commands.add_parser("batches", parents=[measuring],
+                                         help="chart the cost per item of the bulk endpoints against the batch size")
+    batches_parser.add_argument("--results", help="chart this results file instead of running")
+    batches_parser.add_argument("--min-gain", type=float, default=DEFAULT_MIN_GAIN,
+                                help="fail when the largest batch is not this many times cheaper per item than one")
+    batches_parser.add_argument("--output", help="write the results as JSON to this file")
+    commands.add_parser("list", help="list the benchmarks")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for bench in select():
+            print(f"  {bench.name:<26} {bench.description}")
+        return 0
+    if args.command in ("compare", "batches") and args.results:
+        current = load(args.results)
+    else:
+        benchmarks = select(args.only or (["*_batch_*"] if args.command == "batches" else None))
+        if not benchmarks:
+            parser.error(f"no benchmark matches {args.only}")
+        print(f"{len(benchmarks)} benchmarks, {args.repeat} runs each after {args.warmup} warm-up")
+        current = asyncio.run(run(benchmarks, args.repeat, args.warmup, args.scale))
+    if getattr(args, "output", None):
+        save(current, args.output)
+    if args.command == "record":
+        record_baseline(current, args.baseline)
+        print(f"baseline of {machine_key(current['machine'])} written to {args.baseline}")
+        return 0
+    if args.command == "run":
+        return 0
+    if args.command == "batches":
+        costs = batch_costs(current)
+        print(format_batch_chart(costs, args.min_gain))
+        return 1 if any(batch_gain(points) < args.min_gain for points in costs.values()) else 0
+
+    key = machine_key(current["machine"])
+    baselines = load_baselines(args.baseline)
+    if key not in baselines:
+        print(f"no baseline for {key} in {args.baseline}, not gating; stored: {', '.join(baselines) or 'none'}")
+        print("run `record` on this machine to store one")
+        return 0
+    baseline = baselines[key]
+    if baseline["machine"] != current["machine"]:
+        print(f"warning: baseline recorded on {baseline['machine']}, timings may not be comparable")
+    comparisons = compare(baseline, current, args.threshold)
+    for comparison in comparisons:
+        print(comparison)
+    regressed = [comparison.name for comparison in comparisons if comparison.status == "regressed"]
+    if regressed:
+        print(f"{len(regressed)} benchmarks regressed: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
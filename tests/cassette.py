@@ -0,0 +1,194 @@
+import hashlib
+import json
+import sqlite3
+import zlib
+from pathlib import Path
+from urllib.parse import parse_qsl
+
+import httpx
+
+CASSETTE_MODES = ("off", "record", "replay", "new")
+DEFAULT_CASSETTE = Path(__file__).parent / "cassettes" / "petstore.sqlite3"
+# Recomputed by httpx from the stored, already decoded body on replay.
+_DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "date"}
+
+
+class CassetteMiss(httpx.TransportError):
+    """Raised in replay mode for a request that was never recorded."""
+
+
+def normalize_body(content, content_type=""):
+    """
+    Return a canonical form of a request body so equivalent payloads match.
+
+    JSON bodies are re-serialized with sorted keys and form bodies with sorted fields, so
+    key order and whitespace do not matter.
+    """
+    if not content:
+        return b""
+    if "json" in content_type or content[:1] in (b"{", b"["):
+        try:
+            return json.dumps(json.loads(content), sort_keys=True, separators=(",", ":")).encode()
+        except ValueError:
+            pass
+    if "x-www-form-urlencoded" in content_type:
+        return repr(sorted(parse_qsl(content.decode("latin-1")))).encode()
+    return content
+
+
+def request_key(request, match_headers=("content-type",)):
+    """Return the match key of a request: method, path and query, normalized body and `match_headers`."""
+    digest = hashlib.sha1()
+    digest.update(request.method.encode())
+    digest.update(b"\0" + request.url.raw_path)
+    content_type = request.headers.get("content-type", "")
+    if isinstance(request.stream, httpx.ByteStream):
+        digest.update(b"\0" + normalize_body(request.content, content_type))
+    else:
+        digest.update(b"\0<stream>" + request.headers.get("content-length", "").encode())
+    for name in match_headers:
+        digest.update(f"\0{name}={request.headers.get(name, '')}".encode())
+    return digest.hexdigest()
+
+
+class CassetteStore:
+    """
+    On-disk cassette: recorded exchanges in an indexed SQLite file.
+
+    Exchanges are looked up one at a time through the primary key index, with the response
+    headers and zlib-compressed body of a row only read when it is replayed, so opening a
+    cassette costs the same with ten exchanges or ten thousand.
+
+    Args:
+        path (str or Path): The cassette file, created on first write.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._db = None
+        self._pending = 0
+
+    @property
+    def db(self):
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path)
+            self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS exchanges (
+                    key TEXT NOT NULL,
+                    scope TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    method TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    headers TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    PRIMARY KEY (key, scope, seq)
+                ) WITHOUT ROWID;
+            """)
+        return self._db
+
+    def find(self, key, scope, seq):
+        """
+        Return `(status, headers, body)` recorded for `key` in `scope`, or None.
+
+        The `seq`-th exchange of the scope is preferred, falling back to the latest one recorded
+        before it in the same scope, for a test polling more times than when it was recorded.
+        Exchanges of other scopes are never used: another test's response to the same request
+        may reflect a state this test never reached.
+        """
+        row = self.db.execute(
+            "SELECT status, headers, body FROM exchanges WHERE key = ? AND scope = ? AND seq <= ? "
+            "ORDER BY seq DESC LIMIT 1", (key, scope, seq)
+        ).fetchone()
+        if row is None:
+            return None
+        status, headers, body = row
+        return status, json.loads(headers), zlib.decompress(body)
+
+    def has(self, key, scope, seq):
+        return self.db.execute(
+            "SELECT 1 FROM exchanges WHERE key = ? AND scope = ? AND seq = ?", (key, scope, seq)
+        ).fetchone() is not None
+
+    def save(self, key, scope, seq, method, url, status, headers, body):
+        self.db.execute(
+            "INSERT OR REPLACE INTO exchanges VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (key, scope, seq, method, url, status, json.dumps(headers), zlib.compress(body)),
+        )
+        self._pending += 1
+        if self._pending >= 100:
+            self.commit()
+
+    def commit(self):
+        if self._db is not None:
+            self._db.commit()
+            self._pending = 0
+
+    def close(self):
+        if self._db is not None:
+            self.commit()
+            self._db.close()
+            self._db = None
+
+
+class CassetteTransport(httpx.AsyncBaseTransport):
+    """
+    Transport recording exchanges with the target to a cassette and replaying them.
+
+    Modes: "record" always sends the request and stores the exchange, "replay" only answers
+    from the cassette and raises `CassetteMiss` for unknown requests, and "new" replays what
+    is recorded and records the rest. Repeated identical requests within a test (for example
+    a GET before and after a DELETE) are told apart by their order within a scope, the node id
+    of the test that sent them (the `test_nodeid` request extension).
+
+    Args:
+        transport (httpx.AsyncBaseTransport): The transport to the real target.
+        store (CassetteStore): Where exchanges are recorded.
+        mode (str): "record", "replay" or "new".
+        match_headers (tuple): Request headers that take part in matching.
+    """
+
+    def __init__(self, transport, store, mode="new", match_headers=("content-type",)):
+        self.transport = transport
+        self.store = store
+        self.mode = mode
+        self.match_headers = tuple(name.lower() for name in match_headers)
+        self._seen = {}
+        self.hits = 0
+        self.recorded = 0
+        self.misses = 0
+
+    async def handle_async_request(self, request):
+        key = request_key(request, self.match_headers)
+        scope = request.extensions.get("test_nodeid", "")
+        seq = self._seen.get((key, scope), 0)
+        self._seen[(key, scope)] = seq + 1
+
+        if self.mode == "replay" or (self.mode == "new" and self.store.has(key, scope, seq)):
+            recorded = self.store.find(key, scope, seq)
+            if recorded is None:
+                self.misses += 1
+                raise CassetteMiss(
+                    f"no recorded exchange for {request.method} {request.url.raw_path.decode()}, "
+                    "record it with --cassette-mode=new", request=request
+                )
+            self.hits += 1
+            status, headers, body = recorded
+            return httpx.Response(status, headers=headers, content=body,
+                                  extensions={"http_version": b"cassette"})
+
+        response = await self.transport.handle_async_request(request)
+        raw = httpx.Response(response.status_code, headers=response.headers, stream=response.stream)
+        body = await raw.aread()
+        headers = [(name, value) for name, value in response.headers.items() if name.lower() not in _DROPPED_HEADERS]
+        self.store.save(key, scope, seq, request.method, str(request.url), response.status_code, headers, body)
+        self.recorded += 1
+        return httpx.Response(response.status_code, headers=headers, content=body, extensions=response.extensions)
+
+    def summary(self):
+        return f"mode {self.mode}: {self.hits} replayed, {self.recorded} recorded, {self.misses} missing"
+
+    async def aclose(self):
+        self.store.close()
+        await self.transport.aclose()
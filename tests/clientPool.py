@@ -0,0 +1,207 @@
+import asyncio
+import functools
+import importlib.util
+import os
+import time
+
+import httpx
+
+from cassette import DEFAULT_CASSETTE, CassetteStore, CassetteTransport
+from petStoreServer import PetStoreApp
+from resilientTransport import CircuitBreaker, ResilienceStats, ResilientTransport, TokenBucket
+
+
+BASE_URL = "https://petstore.swagger.io/v2"
+LOCAL_BASE_URL = "http://petstore.local/v2"
+
+# Responses answered without a network connection: the local stand-in and cassette replays.
+IN_PROCESS_VERSIONS = ("ASGI", "cassette")
+
+
+class PoolStats:
+    """Connection accounting for the shared client pool, fed by httpcore trace events."""
+
+    def __init__(self):
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.http_versions = {}
+
+    @property
+    def reused(self):
+        network_requests = self.requests - sum(self.http_versions.get(version, 0) for version in IN_PROCESS_VERSIONS)
+        return max(network_requests - self.connections, 0)
+
+    async def trace(self, event_name, info):
+        if event_name == "connection.connect_tcp.complete":
+            self.connections += 1
+        elif event_name == "connection.start_tls.complete":
+            self.tls_handshakes += 1
+
+    def summary(self):
+        if sum(self.http_versions.get(version, 0) for version in IN_PROCESS_VERSIONS) == self.requests:
+            return f"{self.requests} requests served in-process, no connections opened"
+        versions = ", ".join(f"{version}: {count}" for version, count in sorted(self.http_versions.items()))
+        return (
+            f"{self.requests} requests over {self.connections} connections "
+            f"({self.reused} reused), {self.tls_handshakes} TLS handshakes"
+            + (f", {versions}" if versions else "")
+        )
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    """
+    Transport shared by every per-test `httpx.AsyncClient` of a session.
+
+    Closing a client closes its transport, so `aclose` is a no-op here and the pool
+    underneath is only released by `aclose_shared` at the end of the session. Each
+    request is traced so connection reuse can be reported.
+
+    Args:
+        transport (httpx.AsyncBaseTransport): The pooled transport requests are sent through.
+        stats (PoolStats): Where connection and handshake counts are accumulated.
+        app (PetStoreApp or None): The in-process stand-in behind the transport, if any.
+    """
+
+    def __init__(self, transport, stats, app=None):
+        self.transport = transport
+        self.stats = stats
+        self.app = app
+
+    async def handle_async_request(self, request):
+        self.stats.requests += 1
+        trace = request.extensions.get("trace")
+        if trace is None:
+            request.extensions["trace"] = self.stats.trace
+        else:
+            async def chained(event_name, info):
+                await self.stats.trace(event_name, info)
+                await trace(event_name, info)
+            request.extensions["trace"] = chained
+        response = await self.transport.handle_async_request(request)
+        version = response.extensions.get("http_version", b"").decode() or "ASGI"
+        self.stats.http_versions[version] = self.stats.http_versions.get(version, 0) + 1
+        return response
+
+    async def aclose(self):
+        pass
+
+    async def aclose_shared(self):
+        await self.transport.aclose()
+
+
+class Pacer:
+    """Spaces the starts of concurrent tasks to hold a target rate per second, 0 for unpaced."""
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_slot = time.perf_counter()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        now = time.perf_counter()
+        slot = max(self.next_slot, now)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def petstore_base_url(target):
+    """
+    Return the base URL for a Petstore target.
+
+    With `--petstore-target=local` (or `PETSTORE_TARGET=local`) requests are served in-process
+    by `PetStoreApp` through `httpx.ASGITransport`, so no socket is opened at all.
+
+    The remote target is `BASE_URL` unless `PETSTORE_BASE_URL` points elsewhere, such as a
+    `faultServer.py` stand-in.
+
+    Args:
+        target (str): The `--petstore-target` value, "remote" or "local".
+
+    Returns:
+        str: `LOCAL_BASE_URL` for the local target, `$PETSTORE_BASE_URL` or `BASE_URL` otherwise.
+    """
+    if target == "local":
+        return LOCAL_BASE_URL
+    return os.environ.get("PETSTORE_BASE_URL", BASE_URL)
+
+
+def http2_available():
+    return importlib.util.find_spec("h2") is not None
+
+
+def build_transport(stats, target="remote", max_connections=20, max_keepalive=20, keepalive_expiry=30.0, http2=False,
+                    cassette_mode="off", cassette_path=DEFAULT_CASSETTE, resilience=None):
+    """
+    Build the shared transport for a Petstore target.
+
+    The remote target gets a keep-alive pool with the given limits, multiplexed over
+    HTTP/2 when `http2` is set. The local target serves a single `PetStoreApp` in-process.
+    `resilience` wraps the transport to the target, typically in a `ResilientTransport`; it is
+    placed under the cassette, so replayed exchanges are never throttled or retried. Unless
+    `cassette_mode` is "off", exchanges are recorded to or replayed from the cassette at
+    `cassette_path`.
+
+    Args:
+        stats (PoolStats): Where the shared transport reports connection usage.
+        target (str): "remote" or "local".
+        max_connections (int): Maximum number of pooled connections.
+        max_keepalive (int): Maximum number of idle keep-alive connections.
+        keepalive_expiry (float): Seconds an idle connection is kept open.
+        http2 (bool): Whether to negotiate HTTP/2.
+        cassette_mode (str): "off", "record", "replay" or "new", see `CassetteTransport`.
+        cassette_path (str or Path): The cassette file.
+        resilience (callable or None): Called with the transport to the target, returns its wrapper.
+
+    Returns:
+        SharedTransport: The transport every client is built on.
+    """
+    app = None
+    if target == "local":
+        app = PetStoreApp()
+        transport = httpx.ASGITransport(app=app)
+    else:
+        limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        transport = httpx.AsyncHTTPTransport(limits=limits, http2=http2)
+    if resilience is not None:
+        transport = resilience(transport)
+    if cassette_mode != "off":
+        transport = CassetteTransport(transport, CassetteStore(cassette_path), cassette_mode)
+    return SharedTransport(transport, stats, app)
+
+
+def resilience_from_config(config, stats):
+    """Return the `ResilientTransport` wrapper set up by the retry, rate limit and breaker options."""
+    rate = config.getoption("rate_limit")
+    threshold = config.getoption("breaker_threshold")
+    return functools.partial(
+        ResilientTransport,
+        retries=config.getoption("retries"),
+        bucket=TokenBucket(rate, config.getoption("rate_burst")) if rate else None,
+        breaker=CircuitBreaker(threshold, config.getoption("breaker_cooldown")) if threshold else None,
+        stats=stats,
+    )
+
+
+def transport_from_config(config, stats, resilience_stats=None):
+    """
+    Build the session transport from the `--petstore-target`, pool, cassette and resilience
+    command line options.
+    """
+    return build_transport(
+        stats,
+        target=config.getoption("petstore_target"),
+        max_connections=config.getoption("pool_max_connections"),
+        max_keepalive=config.getoption("pool_max_keepalive"),
+        keepalive_expiry=config.getoption("pool_keepalive_expiry"),
+        http2=config.getoption("http2"),
+        cassette_mode=config.getoption("cassette_mode"),
+        cassette_path=config.getoption("cassette_path"),
+        resilience=resilience_from_config(config, resilience_stats or ResilienceStats()),
+    )
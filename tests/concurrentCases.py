@@ -0,0 +1,216 @@
+"""
+Run the parametrized cases of an async test concurrently on the session event loop.
+
+Cases of a test marked `@pytest.mark.concurrent(limit=N)` (or of every parametrized async test
+with `--concurrent-cases=N`) are grouped at collection. When pytest calls the first case of a
+group, all cases of the group are started together, at most `limit` at a time, and each
+outcome is kept; every case is still its own pytest item and reports its own result and
+duration when pytest reaches it. Cases marked skip, skipif or xfail are left to pytest.
+
+pytest sets up the fixtures of one item at a time, so before the group runs the fixtures of the
+other cases are set up through pytest too, each case with function scoped fixtures of its own
+(broader scoped ones are shared). pytest then finds them set up when it reaches those cases, and
+tears them down in their own teardown, as for any other test.
+"""
+import asyncio
+import copy
+import time
+
+import pytest
+from pytest_asyncio import is_async_test
+
+DEFAULT_LIMIT = 8
+# Cases carrying these marks are left out of the groups: pytest decides whether they run at all.
+UNGROUPED_MARKERS = ("skip", "skipif", "xfail")
+# Fixtures holding per-test state on a session object, which overlapping cases would share: the
+# fault profile of `faults` is installed on the one session server.
+UNGROUPED_FIXTURES = ("faults",)
+case_group_key = pytest.StashKey["CaseGroup"]()
+# Finalizers of the fixtures a group set up for a case, handed to pytest when it sets the case up.
+case_finalizers_key = pytest.StashKey[list]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("petstore")
+    group.addoption(
+        "--concurrent-cases",
+        action="store",
+        dest="concurrent_cases",
+        type=int,
+        default=0,
+        metavar="N",
+        help="run the parametrized cases of every async test concurrently, at most N at a time.",
+    )
+
+
+class CaseOutcome:
+    def __init__(self, duration, error=None):
+        self.duration = duration
+        self.error = error
+
+
+class CaseGroup:
+    """The parametrized cases of one test function run together."""
+
+    def __init__(self, items, limit):
+        self.items = items
+        self.limit = limit
+        self.outcomes = None
+
+    def set_up(self, first):
+        """Set up the fixtures of the cases other than `first`, the one pytest has set up."""
+        for item in self.items:
+            if item is not first:
+                set_up_case(item)
+
+    async def run_case(self, item, semaphore):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await test_function(item)(**{name: item.funcargs[name] for name in item._fixtureinfo.argnames})
+            except BaseException as error:
+                if isinstance(error, (KeyboardInterrupt, SystemExit)):
+                    raise
+                return CaseOutcome(time.perf_counter() - started, error)
+            return CaseOutcome(time.perf_counter() - started)
+
+    async def run(self, first):
+        semaphore = asyncio.Semaphore(self.limit)
+        # A case whose fixtures failed to set up is left to pytest, which reports the error.
+        cases = [item for item in self.items if item is first or case_finalizers_key in item.stash]
+        results = await asyncio.gather(*(self.run_case(item, semaphore) for item in cases))
+        self.outcomes = {item.nodeid: outcome for item, outcome in zip(cases, results)}
+
+
+def test_function(item):
+    """Return the undecorated test function of `item`, not the loop-synchronized one pytest-asyncio calls."""
+    return getattr(item.parent.obj, item.originalname)
+
+
+def set_up_case(item):
+    """
+    Fill the fixture values of `item` through pytest before pytest reaches it, see the module docstring.
+
+    Its function scoped fixture definitions are copies, so their cached values do not replace
+    those of the case pytest has set up, and the finalizers registered on `item` are kept in
+    its stash until pytest sets it up.
+    """
+    request = item._request
+    copies = {}
+    for name, fixturedefs in request._arg2fixturedefs.items():
+        request._arg2fixturedefs[name] = [_fresh_copy(fixturedef, copies) for fixturedef in fixturedefs]
+    finalizers = []
+    item.addfinalizer = finalizers.append
+    try:
+        request._fillfixtures()
+    except (KeyboardInterrupt, SystemExit):
+        raise
+    except BaseException:
+        # Torn down and left for pytest to set up again, and report, when it reaches the case.
+        _finalize(finalizers)
+        item._initrequest()
+    else:
+        item.stash[case_finalizers_key] = finalizers
+    finally:
+        del item.addfinalizer
+
+
+def _fresh_copy(fixturedef, copies):
+    if fixturedef.scope != "function":
+        return fixturedef
+    if fixturedef not in copies:
+        copies[fixturedef] = fresh = copy.copy(fixturedef)
+        fresh.cached_result = None
+        fresh._finalizers = []
+    return copies[fixturedef]
+
+
+def _finalize(finalizers):
+    for finalizer in reversed(finalizers):
+        finalizer()
+
+
+def concurrency_limit(item, default):
+    """The limit of the marker of `item`, else --concurrent-cases, else `DEFAULT_LIMIT`."""
+    marker = item.get_closest_marker("concurrent")
+    fallback = default if default > 0 else DEFAULT_LIMIT
+    if marker is not None:
+        return marker.kwargs.get("limit", *marker.args or (fallback,))
+    return fallback
+
+
+@pytest.hookimpl(trylast=True)
+def pytest_collection_modifyitems(config, items):
+    default = config.getoption("concurrent_cases")
+    run = []
+    for item in items + [None]:
+        if run and (item is None or (item.parent, item.originalname) != (run[0].parent, run[0].originalname)):
+            if len(run) > 1:
+                group = CaseGroup(run, concurrency_limit(run[0], default))
+                for member in run:
+                    member.stash[case_group_key] = group
+            run = []
+        if item is None or not is_async_test(item) or not hasattr(item, "callspec"):
+            continue
+        if any(item.get_closest_marker(name) is not None for name in UNGROUPED_MARKERS):
+            # Run by pytest on its own, so its skip or xfail marks are honoured.
+            continue
+        if set(UNGROUPED_FIXTURES) & set(item.fixturenames) or any(
+                scope.value != "function" for scope in item.callspec._arg2scope.values()):
+            # Cases sharing a session object, or whose parameters are set up per module or
+            # session, cannot overlap.
+            continue
+        if item.get_closest_marker("concurrent") is not None or default > 0:
+            run.append(item)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_setup(item):
+    yield
+    finalizers = item.stash.get(case_finalizers_key, None)
+    if finalizers is not None and item in item.session._setupstate.stack:
+        del item.stash[case_finalizers_key]
+        for finalizer in finalizers:
+            item.addfinalizer(finalizer)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_call(item):
+    group = item.stash.get(case_group_key, None)
+    if group is None:
+        return
+    if group.outcomes is None:
+        # Outside of the event loop, which pytest-asyncio runs the async fixtures on.
+        group.set_up(item)
+
+    async def run_in_group(**arguments):
+        if group.outcomes is None:
+            await group.run(item)
+        outcome = group.outcomes.get(item.nodeid)
+        if outcome is None:
+            await test_function(item)(**arguments)
+        elif outcome.error is not None:
+            raise outcome.error
+
+    # pytest-asyncio runs whatever coroutine function the item holds on the session event loop,
+    # so the whole group runs there, started by the first case pytest calls.
+    item.obj = run_in_group
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionfinish(session):
+    # Cases a group set up that pytest never reached, after -x or a Ctrl-C, are torn down here,
+    # before the session scoped fixtures they may use.
+    for item in session.items:
+        finalizers = item.stash.get(case_finalizers_key, None)
+        if finalizers is not None:
+            del item.stash[case_finalizers_key]
+            _finalize(finalizers)
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    report = (yield).get_result()
+    group = item.stash.get(case_group_key, None)
+    if call.when == "call" and group is not None and group.outcomes and item.nodeid in group.outcomes:
+        report.duration = group.outcomes[item.nodeid].duration
@@ -0,0 +1,547 @@
+"""
+Session plugin of the Petstore suite: command line options, hooks and session fixtures.
+
+Only pytest is imported up front. The cassette, client pool, timing, auth, cleanup and convergence
+modules, and with them httpx, are imported by the hooks and fixtures that use them, and the
+session objects they define are built on first use (`session_object`), so a run that selects a
+few tests only pays for what those tests need.
+"""
+import os
+import sys
+
+import pytest
+from pytest_asyncio import is_async_test
+
+pytest_plugins = ["concurrentCases", "shardScheduler", "petstoreFixtures", "startupProfiler", "resultLog",
+                  "contractSpec"]
+
+pool_stats_key = pytest.StashKey["clientPool.PoolStats"]()
+timing_log_key = pytest.StashKey["requestTiming.TimingLog"]()
+cassette_key = pytest.StashKey["cassette.CassetteTransport"]()
+resource_tracker_key = pytest.StashKey["resourceTracker.ResourceTracker"]()
+convergence_log_key = pytest.StashKey["waitUntil.ConvergenceLog"]()
+resilience_stats_key = pytest.StashKey["resilientTransport.ResilienceStats"]()
+token_cache_key = pytest.StashKey["petAuth.TokenCache"]()
+identity_pool_key = pytest.StashKey["petAuth.IdentityPool"]()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("petstore")
+    group.addoption(
+        "--petstore-target",
+        action="store",
+        dest="petstore_target",
+        choices=("remote", "local"),
+        default=os.environ.get("PETSTORE_TARGET", "remote"),
+        help="petstore to run against: the public host (remote) or the in-process stand-in (local). "
+             "Defaults to $PETSTORE_TARGET or remote.",
+    )
+    group.addoption(
+        "--pool-max-connections",
+        action="store",
+        dest="pool_max_connections",
+        type=int,
+        default=20,
+        help="maximum number of connections in the shared client pool.",
+    )
+    group.addoption(
+        "--pool-max-keepalive",
+        action="store",
+        dest="pool_max_keepalive",
+        type=int,
+        default=20,
+        help="maximum number of idle keep-alive connections kept in the shared client pool.",
+    )
+    group.addoption(
+        "--pool-keepalive-expiry",
+        action="store",
+        dest="pool_keepalive_expiry",
+        type=float,
+        default=30.0,
+        help="seconds an idle keep-alive connection is kept open.",
+    )
+    group.addoption(
+        "--http2",
+        action="store_true",
+        dest="http2",
+        default=False,
+        help="negotiate HTTP/2 and multiplex requests over the shared connections (needs h2).",
+    )
+    group.addoption(
+        "--cassette-mode",
+        action="store",
+        dest="cassette_mode",
+        # cassette.CASSETTE_MODES and DEFAULT_CASSETTE, spelled out as the module imports httpx.
+        choices=("off", "record", "replay", "new"),
+        default=os.environ.get("PETSTORE_CASSETTE_MODE", "off"),
+        help="record exchanges with the target to the cassette, replay them from it, or record only "
+             "new ones (new). Defaults to $PETSTORE_CASSETTE_MODE or off.",
+    )
+    group.addoption(
+        "--cassette",
+        action="store",
+        dest="cassette_path",
+        metavar="PATH",
+        default=os.path.join(os.path.dirname(__file__), "cassettes", "petstore.sqlite3"),
+        help="cassette file used by --cassette-mode.",
+    )
+    group.addoption(
+        "--request-timings",
+        action="store",
+        dest="request_timings",
+        metavar="PATH",
+        default=None,
+        help="write the per-request timings and latency budget results to PATH as JSON.",
+    )
+    group.addoption(
+        "--payload-seed",
+        action="store",
+        dest="payload_seed",
+        default=os.environ.get("PETSTORE_PAYLOAD_SEED", "0"),
+        help="seed of the generated pet payloads; a failing case is reported with the seed that "
+             "reproduces it. Defaults to $PETSTORE_PAYLOAD_SEED or 0.",
+    )
+    group.addoption(
+        "--payload-cases",
+        action="store",
+        dest="payload_cases",
+        type=int,
+        default=100,
+        metavar="N",
+        help="number of generated payloads each property-based test checks.",
+    )
+    group.addoption(
+        "--retries",
+        action="store",
+        dest="retries",
+        type=int,
+        default=2,
+        help="retries of a request that got a connection error or a 429/5xx answer; only idempotent "
+             "requests are retried unless they surely were not processed.",
+    )
+    group.addoption(
+        "--rate-limit",
+        action="store",
+        dest="rate_limit",
+        type=float,
+        default=0.0,
+        metavar="RPS",
+        help="requests per second allowed to the target across all tests, 0 for unlimited.",
+    )
+    group.addoption(
+        "--rate-burst",
+        action="store",
+        dest="rate_burst",
+        type=int,
+        default=10,
+        help="requests allowed at once above --rate-limit.",
+    )
+    group.addoption(
+        "--breaker-threshold",
+        action="store",
+        dest="breaker_threshold",
+        type=int,
+        default=5,
+        help="consecutive failed requests after which the remaining tests fail fast as 'target unhealthy', "
+             "0 to never fail fast.",
+    )
+    group.addoption(
+        "--breaker-cooldown",
+        action="store",
+        dest="breaker_cooldown",
+        type=float,
+        default=30.0,
+        help="seconds of failing fast before a request is let through to probe the target again.",
+    )
+    group.addoption(
+        "--keep-resources",
+        action="store_true",
+        dest="keep_resources",
+        default=False,
+        help="leave the pets, orders and users the tests created on the target instead of deleting them.",
+    )
+    group.addoption(
+        "--cleanup-concurrency",
+        action="store",
+        dest="cleanup_concurrency",
+        type=int,
+        default=8,
+        help="maximum number of delete requests in flight when removing the created resources.",
+    )
+    group.addoption(
+        "--cleanup-rate",
+        action="store",
+        dest="cleanup_rate",
+        type=float,
+        default=50.0,
+        help="maximum delete requests per second when removing the created resources from the remote "
+             "target, 0 for unlimited. The local target is not rate limited.",
+    )
+    group.addoption(
+        "--eventually-timeout",
+        action="store",
+        dest="eventually_timeout",
+        type=float,
+        default=10.0,
+        help="seconds the `eventually` fixture polls for a condition before failing the test.",
+    )
+    group.addoption(
+        "--convergence-log",
+        action="store",
+        dest="convergence_log",
+        metavar="PATH",
+        default=None,
+        help="write how long every `eventually` wait took to converge to PATH as JSON.",
+    )
+    group.addoption(
+        "--auth-identities",
+        action="store",
+        dest="auth_identities",
+        type=int,
+        default=1,
+        help="number of distinct users the tests authenticate as, each test always as the same one.",
+    )
+    group.addoption(
+        "--token-lifetime",
+        action="store",
+        dest="token_lifetime",
+        type=float,
+        default=3600.0,
+        help="seconds until the minted bearer tokens expire; they are minted again a minute before.",
+    )
+    group.addoption(
+        "--upload-size",
+        action="store",
+        dest="upload_size",
+        default="4MB",
+        help="size of the image files the upload tests stream, e.g. 512KB or 1.5GB.",
+    )
+    group.addoption(
+        "--upload-concurrency",
+        action="store",
+        dest="upload_concurrency",
+        type=int,
+        default=4,
+        help="image uploads in flight at once in the concurrent upload tests.",
+    )
+    parser.addini(
+        "latency_budgets",
+        type="linelist",
+        default=[],
+        help="p95 latency budgets in ms for the requests of tests with a marker, one '<marker> = <ms>' per line.",
+    )
+
+
+def pytest_configure(config):
+    if config.getoption("http2"):
+        from clientPool import http2_available
+
+        if not http2_available():
+            raise pytest.UsageError("--http2 needs the h2 package: pip install 'httpx[http2]'")
+    if config.getoption("token_lifetime") <= 0:
+        raise pytest.UsageError(f"--token-lifetime must be positive, got {config.getoption('token_lifetime')}")
+    if config.getoption("auth_identities") < 1:
+        raise pytest.UsageError(f"--auth-identities must be at least 1, got {config.getoption('auth_identities')}")
+
+
+def _pool_stats(config):
+    from clientPool import PoolStats
+
+    return PoolStats()
+
+
+def _timing_log(config):
+    from requestTiming import TimingLog, parse_marker_budgets
+
+    return TimingLog(parse_marker_budgets(config.getini("latency_budgets")))
+
+
+def _convergence_log(config):
+    from waitUntil import ConvergenceLog
+
+    return ConvergenceLog(config.getoption("eventually_timeout"))
+
+
+def _resilience_stats(config):
+    from resilientTransport import ResilienceStats
+
+    return ResilienceStats()
+
+
+def _token_cache(config):
+    from petAuth import TokenCache
+
+    lifetime = config.getoption("token_lifetime")
+    return TokenCache(lifetime, min(60.0, lifetime / 2))
+
+
+def _identity_pool(config):
+    from petAuth import IdentityPool
+
+    return IdentityPool(config.getoption("auth_identities"))
+
+
+SESSION_FACTORIES = {
+    pool_stats_key: _pool_stats,
+    timing_log_key: _timing_log,
+    convergence_log_key: _convergence_log,
+    resilience_stats_key: _resilience_stats,
+    token_cache_key: _token_cache,
+    identity_pool_key: _identity_pool,
+}
+
+
+def session_object(config, key):
+    """Return the session object stored under `key`, built and stashed the first time it is asked for."""
+    if key not in config.stash:
+        config.stash[key] = SESSION_FACTORIES[key](config)
+    return config.stash[key]
+
+
+def pytest_collection_modifyitems(config, items):
+    """
+    Run every async test in the session event loop the shared client pool lives in, and
+    register the `latency_budget` of the tests declaring one.
+    """
+    session_scope_marker = pytest.mark.asyncio(loop_scope="session")
+    for item in items:
+        if is_async_test(item):
+            item.add_marker(session_scope_marker, append=False)
+        budget = item.get_closest_marker("latency_budget")
+        if budget is not None:
+            from requestTiming import marker_budget
+
+            try:
+                session_object(config, timing_log_key).test_budgets[item.nodeid] = marker_budget(budget)
+            except ValueError as error:
+                raise pytest.UsageError(f"{item.nodeid}: {error}")
+
+
+def request_markers(item):
+    """Return the names of the markers declared in pytest.ini that `item` carries, e.g. ["post"]."""
+    declared = {line.split(":")[0].split("(")[0].strip() for line in item.config.getini("markers")}
+    return sorted({marker.name for marker in item.iter_markers()} & declared - {"asyncio", "latency_budget"})
+
+
+"""
+Fixture to provide the transport shared by all clients of the session.
+
+The connection pool is opened once and kept alive across tests, so only the first request
+to the target pays for the TCP and TLS handshakes.
+
+Yields:
+    clientPool.SharedTransport: The pooled transport for the configured Petstore target.
+"""
+@pytest.fixture(scope="session")
+async def petstore_transport(pytestconfig):
+    from cassette import CassetteTransport
+    from clientPool import transport_from_config
+
+    transport = transport_from_config(pytestconfig, session_object(pytestconfig, pool_stats_key),
+                                      session_object(pytestconfig, resilience_stats_key))
+    if isinstance(transport.transport, CassetteTransport):
+        pytestconfig.stash[cassette_key] = transport.transport
+    yield transport
+    await transport.aclose_shared()
+
+
+"""
+Fixture to track the pets, orders and users the tests create, and delete them all at the end.
+
+The resources left at the end of the session are removed in one concurrent, rate limited batch
+(--cleanup-concurrency, --cleanup-rate) unless --keep-resources is given.
+
+Yields:
+    resourceTracker.ResourceTracker: The tracker of the session.
+"""
+@pytest.fixture(scope="session")
+async def resource_tracker(pytestconfig, petstore_transport):
+    import httpx
+    from clientPool import petstore_base_url
+    from resourceTracker import ResourceTracker
+
+    local = pytestconfig.getoption("petstore_target") == "local"
+    rate = 0 if local else pytestconfig.getoption("cleanup_rate")
+    tracker = ResourceTracker(pytestconfig.getoption("cleanup_concurrency"), rate)
+    pytestconfig.stash[resource_tracker_key] = tracker
+    yield tracker
+    if pytestconfig.getoption("keep_resources") or not tracker.resources:
+        return
+    base_url = petstore_base_url(pytestconfig.getoption("petstore_target"))
+    async with httpx.AsyncClient(base_url=base_url, transport=petstore_transport) as client:
+        await tracker.cleanup(client)
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_teardown(item):
+    timing_log = item.config.stash.get(timing_log_key, None)
+    timings = timing_log.for_test(item.nodeid) if timing_log is not None else None
+    if timings and item.config.pluginmanager.hasplugin("reporter"):
+        from requestTiming import annotate_html_report
+
+        annotate_html_report(timings)
+    if timings and item.config.pluginmanager.hasplugin("petstore-result-log"):
+        # The teardown report carries the user properties, which is where the result log reads them.
+        requests = [timing.as_dict() for timing in timings]
+        for request in requests:
+            del request["nodeid"], request["markers"]
+        item.user_properties.append(("requests", requests))
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item, call):
+    report = (yield).get_result()
+    # Only a run that built the resilient transport can fail with TargetUnhealthy.
+    resilience = sys.modules.get("resilientTransport")
+    if call.excinfo is not None and resilience is not None and call.excinfo.errisinstance(resilience.TargetUnhealthy):
+        report.longrepr = str(call.excinfo.value)
+        report.target_unhealthy = True
+
+
+def pytest_report_teststatus(report):
+    if getattr(report, "target_unhealthy", False):
+        return "failed", "U", ("TARGET UNHEALTHY", {"red": True})
+    return None
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption("request_timings")
+    if path:
+        session_object(session.config, timing_log_key).write_json(path)
+    path = session.config.getoption("convergence_log")
+    if path:
+        session_object(session.config, convergence_log_key).write_json(path)
+    timing_log = session.config.stash.get(timing_log_key, None)
+    if timing_log is None:
+        return
+    if timing_log.budget_violations() and session.exitstatus == pytest.ExitCode.OK:
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
+"""
+Fixture to provide the socket-served Petstore stand-in, started on first use.
+
+Requests to its `base_url` go over real HTTP connections to a `PetStoreApp` in a background
+thread, with the faults of its current profile, see the `faults` fixture.
+
+Yields:
+    faultServer.PetStoreServer: The running server of the session.
+"""
+@pytest.fixture(scope="session")
+def petstore_server():
+    from faultServer import PetStoreServer
+
+    with PetStoreServer() as server:
+        yield server
+
+
+"""
+Fixture to provide the pet id allocator of this worker.
+
+The namespace and worker index come from `PETSTORE_ID_NAMESPACE` and `PETSTORE_WORKER_INDEX`
+or the pytest-xdist worker id, so tests on different workers and machines never share an id.
+
+Returns:
+    idAllocator.IdAllocator: The session wide allocator.
+"""
+@pytest.fixture(scope="session")
+def id_allocator():
+    from idAllocator import IdAllocator
+
+    return IdAllocator.from_environment()
+
+
+"""
+Fixture to provide the bearer token auth of the clients of a test.
+
+The test authenticates as one identity of the --auth-identities pool, picked by its node id, and
+the token comes from the session's token cache, so it is only signed again when it nears expiry.
+
+Returns:
+    petAuth.BearerAuth: The `httpx.Auth` to build the client with.
+"""
+@pytest.fixture
+def petstore_auth(request):
+    from petAuth import BearerAuth
+
+    identity = session_object(request.config, identity_pool_key).for_owner(request.node.nodeid)
+    return BearerAuth(session_object(request.config, token_cache_key), identity)
+
+
+"""
+Fixture to provide the httpx event hooks of the clients of a test.
+
+Every request is tagged with the test node id in its `test_nodeid` extension, which the
+cassette uses to tell tests apart, its timing is recorded and the resources it creates are tracked.
+
+Returns:
+    dict: The event hooks to build the client with.
+"""
+@pytest.fixture
+def client_event_hooks(request, resource_tracker):
+    nodeid = request.node.nodeid
+
+    async def tag_request(http_request):
+        http_request.extensions["test_nodeid"] = nodeid
+
+    timing_hooks = session_object(request.config, timing_log_key).event_hooks(nodeid, request_markers(request.node))
+    tracking_hooks = resource_tracker.event_hooks(nodeid)
+    return {
+        "request": [tag_request] + timing_hooks["request"] + tracking_hooks["request"],
+        "response": timing_hooks["response"] + tracking_hooks["response"],
+    }
+
+
+"""
+Fixture to wait for an eventually consistent target to show a change.
+
+`await eventually(probe, condition, label=...)` calls the async `probe` until `condition` holds
+for its result, with exponential backoff and jitter between attempts, and fails the test after
+--eventually-timeout seconds. How long each wait took is reported as replication lag.
+
+Returns:
+    callable: The test's `waitUntil.wait_until`, recording into the session's convergence log.
+"""
+@pytest.fixture
+def eventually(request):
+    return session_object(request.config, convergence_log_key).for_test(request.node.nodeid)
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    stats = config.stash.get(pool_stats_key, None)
+    if stats is not None and stats.requests:
+        terminalreporter.write_sep("-", "petstore client pool")
+        terminalreporter.write_line(stats.summary())
+    cassette = config.stash.get(cassette_key, None)
+    if cassette is not None:
+        terminalreporter.write_sep("-", "petstore cassette")
+        terminalreporter.write_line(f"{cassette.store.path}: {cassette.summary()}")
+    resilience = config.stash.get(resilience_stats_key, None)
+    if resilience is not None and resilience.eventful:
+        terminalreporter.write_sep("-", "petstore resilience")
+        terminalreporter.write_line(resilience.summary())
+    token_cache = config.stash.get(token_cache_key, None)
+    if token_cache is not None and token_cache.minted:
+        terminalreporter.write_sep("-", "petstore auth")
+        terminalreporter.write_line(token_cache.summary())
+    tracker = config.stash.get(resource_tracker_key, None)
+    if tracker is not None and (tracker.removed or tracker.failures):
+        terminalreporter.write_sep("-", "petstore cleanup")
+        terminalreporter.write_line(tracker.summary())
+        for kind, key, nodeid, reason in tracker.failures:
+            terminalreporter.write_line(f"could not remove {kind} {key} created by {nodeid}: {reason}", red=True)
+    convergence_log = config.stash.get(convergence_log_key, None)
+    if convergence_log is not None and convergence_log.records:
+        terminalreporter.write_sep("-", "petstore convergence")
+        for line in convergence_log.summary():
+            terminalreporter.write_line(line)
+    timing_log = config.stash.get(timing_log_key, None)
+    if timing_log is not None and timing_log.records:
+        terminalreporter.write_sep("-", "petstore request latency")
+        for line in timing_log.endpoint_summary():
+            terminalreporter.write_line(line)
+        violations = timing_log.budget_violations()
+        if violations:
+            terminalreporter.write_sep("-", "latency budgets exceeded", red=True)
+            for line in violations:
+                terminalreporter.write_line(line, red=True)
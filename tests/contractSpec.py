@@ -0,0 +1,477 @@
+"""
+Contract tests generated from the vendored Petstore `swagger.json`.
+
+Every operation of `spec/swagger.json` becomes one case of `test_contract.py`: the request is
+built from the operation's parameters and body schema, the resources it refers to are created
+first, and the answer must have a documented (or 2xx) status and match the response schema.
+
+The response validators are compiled from the spec to Python source, one module per operation
+in `.contract_cache/`, named after the operation and the hash of its part of the spec: the
+operation and every definition it references. A run with an unchanged spec imports them
+without compiling any schema, and a change to the spec only recompiles the operations it
+touches. The fingerprints of the operations that passed are kept in the cache as well, and
+`--contract-changed` runs only the cases of operations whose fingerprint changed since.
+"""
+import hashlib
+import importlib.util
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+SPEC_PATH = Path(__file__).parent / "spec" / "swagger.json"
+CACHE_DIR = ".contract_cache"
+MANIFEST = "manifest.json"
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch")
+# Operations answering differently from the spec on petstore.swagger.io and the stand-in alike.
+KNOWN_DEVIATIONS = {
+    "loginUser": "the Petstore answers the login with an ApiResponse object, the spec documents a string",
+}
+# The operation creating the resource a path parameter or request body refers to.
+CREATORS = {"petId": "addPet", "orderId": "placeOrder", "username": "createUser"}
+# Values of the parameters and fields that cannot be sampled from their schema alone.
+SAMPLE_VALUES = {"status": "available"}
+DATE_TIME = "2024-01-01T00:00:00.000+0000"
+_DATE_TIME_PATTERN = r"^\d{4}-\d{2}-\d{2}[Tt ]\d{2}:\d{2}:\d{2}(\.\d+)?([Zz]|[+-]\d{2}:?\d{2})?$"
+_INT_RANGES = {"int32": (-2**31, 2**31 - 1), "int64": (-2**63, 2**63 - 1)}
+
+
+def load_spec(path=SPEC_PATH):
+    with open(path, "rb") as file:
+        return json.load(file)
+
+
+def fingerprint(document):
+    """SHA-256 of the canonical JSON of `document`, the same for equal documents whatever their key order."""
+    return hashlib.sha256(json.dumps(document, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def references(node, definitions, found=None):
+    """Names of the definitions `node` refers to, directly or through other definitions."""
+    found = set() if found is None else found
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#/definitions/"):
+            name = ref.rsplit("/", 1)[1]
+            if name not in found:
+                found.add(name)
+                references(definitions[name], definitions, found)
+        for value in node.values():
+            references(value, definitions, found)
+    elif isinstance(node, list):
+        for value in node:
+            references(value, definitions, found)
+    return found
+
+
+class Operation:
+    """
+    One operation of the spec, with the definitions it uses.
+
+    Attributes:
+        operation_id (str): The `operationId`, the name of its contract case.
+        method (str): The HTTP method, upper case.
+        path (str): The path template, e.g. "/pet/{petId}".
+        definition (dict): The operation object of the spec.
+        definitions (dict): The definitions it references, by name.
+        fingerprint (str): Hash of the operation and its definitions, changes with any of them.
+    """
+
+    def __init__(self, method, path, definition, definitions):
+        self.operation_id = definition["operationId"]
+        self.method = method.upper()
+        self.path = path
+        self.definition = definition
+        self.definitions = {name: definitions[name] for name in sorted(references(definition, definitions))}
+        self.fingerprint = fingerprint({"method": self.method, "path": path, "operation": definition,
+                                        "definitions": self.definitions})
+
+    def __repr__(self):
+        return f"Operation({self.operation_id}: {self.method} {self.path})"
+
+    @property
+    def parameters(self):
+        return self.definition.get("parameters", [])
+
+    @property
+    def responses(self):
+        return self.definition.get("responses", {})
+
+    @property
+    def body_schema(self):
+        return next((parameter["schema"] for parameter in self.parameters if parameter["in"] == "body"), None)
+
+    def requires(self, operations):
+        """The resources, by parameter name, that must exist before the operation is called."""
+        names = {parameter["name"] for parameter in self.parameters if parameter["in"] == "path"}
+        for name, creator in CREATORS.items():
+            created = operations.get(creator)
+            if created is not None and created is not self and self.body_schema is not None \
+                    and self.body_schema == created.body_schema:
+                names.add(name)
+        return sorted(names & set(CREATORS))
+
+
+def operations(spec):
+    """The operations of `spec` by `operationId`, in the order of the spec."""
+    found = {}
+    definitions = spec.get("definitions", {})
+    for path, item in spec["paths"].items():
+        for method in HTTP_METHODS:
+            if method in item:
+                operation = Operation(method, path, item[method], definitions)
+                found[operation.operation_id] = operation
+    return found
+
+
+class ValidatorCompiler:
+    """
+    Compiles the Swagger 2.0 schemas of one operation to the Python source of its validators.
+
+    Each response schema becomes a function `(value, loc, errors)` appending a pydantic style
+    error dict to `errors` for every mismatch; definitions become shared helper functions.
+    """
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.helpers = []
+        self.compiled = {}
+        self.depth = 0
+
+    def source(self):
+        functions = []
+        for status, response in self.operation.responses.items():
+            if "schema" in response:
+                functions.append((status, self.function(f"validate_{status}", response["schema"])))
+        lines = [
+            f"# Response validators of {self.operation.operation_id}, compiled by contractSpec.py "
+            f"from the spec with fingerprint {self.operation.fingerprint}.",
+            "import re",
+            "",
+            f"_DATE_TIME = re.compile({_DATE_TIME_PATTERN!r})",
+            "",
+        ]
+        lines += self.helpers
+        lines += [source for _, source in functions]
+        lines.append("VALIDATORS = {" + ", ".join(f"{status!r}: validate_{status}" for status, _ in functions) + "}")
+        return "\n".join(lines) + "\n"
+
+    def definition(self, name):
+        if name not in self.compiled:
+            self.compiled[name] = f"_definition_{name}"
+            self.helpers.append(self.function(self.compiled[name], self.operation.definitions[name]))
+        return self.compiled[name]
+
+    def function(self, name, schema):
+        body = self.checks(schema, "value", "loc", 1)
+        return "\n".join([f"def {name}(value, loc, errors):"] + (body or ["    pass"]) + ["", ""])
+
+    def error(self, indent, loc, message, kind, value):
+        return f"{'    ' * indent}errors.append({{'loc': {loc}, 'msg': {message!r}, 'type': {kind!r}, 'input': {value}}})"
+
+    def checks(self, schema, value, loc, indent):
+        pad = "    " * indent
+        ref = schema.get("$ref")
+        if ref is not None:
+            return [f"{pad}{self.definition(ref.rsplit('/', 1)[1])}({value}, {loc}, errors)"]
+        kind = schema.get("type")
+        if kind == "object" or (kind is None and "properties" in schema):
+            lines = [f"{pad}if not isinstance({value}, dict):",
+                     self.error(indent + 1, loc, "Input should be an object", "dict_type", value),
+                     f"{pad}else:"]
+            inner = []
+            for field in schema.get("required", []):
+                inner += [f"{pad}    if {field!r} not in {value}:",
+                          self.error(indent + 2, f"{loc} + ({field!r},)", "Field required", "missing", value)]
+            for field, field_schema in schema.get("properties", {}).items():
+                checks = self.checks(field_schema, f"{value}[{field!r}]", f"{loc} + ({field!r},)", indent + 2)
+                if checks:
+                    inner += [f"{pad}    if {field!r} in {value}:"] + checks
+            extra = schema.get("additionalProperties")
+            if isinstance(extra, dict):
+                self.depth += 1
+                key, item = f"key{self.depth}", f"item{self.depth}"
+                known = tuple(schema.get("properties", {}))
+                checks = self.checks(extra, item, f"{loc} + ({key},)", indent + 3)
+                if checks and known:
+                    inner += [f"{pad}    for {key}, {item} in {value}.items():",
+                              f"{pad}        if {key} not in {known!r}:"] + checks
+                elif checks:
+                    checks = self.checks(extra, item, f"{loc} + ({key},)", indent + 2)
+                    inner += [f"{pad}    for {key}, {item} in {value}.items():"] + checks
+            return lines + (inner or [f"{pad}    pass"])
+        if kind == "array":
+            self.depth += 1
+            index, item = f"index{self.depth}", f"item{self.depth}"
+            lines = [f"{pad}if not isinstance({value}, list):",
+                     self.error(indent + 1, loc, "Input should be a valid list", "list_type", value)]
+            checks = self.checks(schema.get("items", {}), item, f"{loc} + ({index},)", indent + 2)
+            if checks:
+                lines += [f"{pad}else:", f"{pad}    for {index}, {item} in enumerate({value}):"] + checks
+            return lines
+        if kind == "integer":
+            low, high = _INT_RANGES.get(schema.get("format"), (None, None))
+            lines = [f"{pad}if not isinstance({value}, int) or isinstance({value}, bool):",
+                     self.error(indent + 1, loc, "Input should be a valid integer", "int_type", value)]
+            if low is not None:
+                lines += [f"{pad}elif not {low} <= {value} <= {high}:",
+                          self.error(indent + 1, loc, f"Input should fit in {schema['format']}", "int_range", value)]
+            return lines
+        if kind == "number":
+            return [f"{pad}if not isinstance({value}, (int, float)) or isinstance({value}, bool):",
+                    self.error(indent + 1, loc, "Input should be a valid number", "float_type", value)]
+        if kind == "boolean":
+            return [f"{pad}if not isinstance({value}, bool):",
+                    self.error(indent + 1, loc, "Input should be a valid boolean", "bool_type", value)]
+        if kind == "string":
+            lines = [f"{pad}if not isinstance({value}, str):",
+                     self.error(indent + 1, loc, "Input should be a valid string", "string_type", value)]
+            if "enum" in schema:
+                lines += [f"{pad}elif {value} not in {tuple(schema['enum'])!r}:",
+                          self.error(indent + 1, loc, f"Input should be one of {', '.join(schema['enum'])}",
+                                     "enum", value)]
+            elif schema.get("format") == "date-time":
+                lines += [f"{pad}elif not _DATE_TIME.match({value}):",
+                          self.error(indent + 1, loc, "Input should be a valid datetime", "datetime_parsing", value)]
+            return lines
+        return []
+
+
+def _import(path):
+    spec = importlib.util.spec_from_file_location(f"contract_{path.stem.replace('-', '_')}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class ValidatorCache:
+    """
+    Compiled response validators of the operations, on disk in `directory`.
+
+    `compiled` counts the operations whose validators had to be compiled in this process, the
+    others were imported as they were.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.loaded = {}
+        self.compiled = 0
+
+    def path(self, operation):
+        return self.directory / f"{operation.operation_id}-{operation.fingerprint[:16]}.py"
+
+    def validators(self, operation):
+        """Return `{status: validator}` of `operation`, compiling and storing them if not cached yet."""
+        path = self.path(operation)
+        if path in self.loaded:
+            return self.loaded[path]
+        if not path.exists():
+            self.directory.mkdir(parents=True, exist_ok=True)
+            for stale in self.directory.glob(f"{operation.operation_id}-*.py"):
+                stale.unlink()
+            temporary = path.with_suffix(f".{os.getpid()}.tmp")
+            temporary.write_text(ValidatorCompiler(operation).source())
+            # Atomic, so parallel workers never import a half written module.
+            os.replace(temporary, path)
+            self.compiled += 1
+        self.loaded[path] = _import(path).VALIDATORS
+        return self.loaded[path]
+
+    def manifest(self):
+        """The fingerprints of the operations whose contract cases last passed, by `operationId`."""
+        try:
+            with open(self.directory / MANIFEST) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def save_manifest(self, passed, failed=()):
+        """Record the fingerprints the operations of `passed` passed with, forget those of `failed`."""
+        manifest = {operation_id: fingerprint for operation_id, fingerprint in self.manifest().items()
+                    if operation_id not in failed}
+        manifest.update(passed)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        temporary = self.directory / f"{MANIFEST}.{os.getpid()}.tmp"
+        temporary.write_text(json.dumps(manifest, indent=2, sort_keys=True))
+        os.replace(temporary, self.directory / MANIFEST)
+
+
+def check_response(operation, response, validators):
+    """
+    Check `response` against the contract of `operation`.
+
+    Raises:
+        petDecoding.ResponseValidationError: If the status is neither documented nor 2xx, or
+            the body does not match the documented schema of the status.
+    """
+    from petDecoding import ResponseValidationError
+
+    name = f"{operation.operation_id} {response.status_code}"
+    status = str(response.status_code)
+    if status not in operation.responses and "default" not in operation.responses and not response.is_success:
+        raise ResponseValidationError(name, [{"loc": ("status",), "msg": "Status not documented",
+                                              "type": "undocumented_status", "input": response.status_code}])
+    validate = validators.get(status)
+    if validate is None:
+        return
+    try:
+        body = response.json()
+    except ValueError as error:
+        raise ResponseValidationError(name, [{"loc": (), "msg": f"Invalid JSON: {error}", "type": "json_invalid",
+                                              "input": response.content[:80]}])
+    errors = []
+    validate(body, (), errors)
+    if errors:
+        raise ResponseValidationError(name, errors)
+
+
+def sample(schema, definitions, values, name=None):
+    """
+    A value matching `schema`, taking fields from `values` where it has one of their name.
+
+    Args:
+        schema (dict): A Swagger 2.0 schema.
+        definitions (dict): The definitions its references resolve to.
+        values (dict): Field name to value, e.g. the ids of the resources the test created.
+        name (str or None): The name of the field the value is for.
+    """
+    ref = schema.get("$ref")
+    if ref is not None:
+        return sample(definitions[ref.rsplit("/", 1)[1]], definitions, values, name)
+    kind = schema.get("type")
+    if kind == "object" or "properties" in schema:
+        return {field: sample(field_schema, definitions, values, field)
+                for field, field_schema in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [sample(schema.get("items", {}), definitions, values)]
+    if name in values and values[name] in schema.get("enum", (values[name],)):
+        return values[name]
+    if "enum" in schema:
+        return schema["enum"][0]
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 1.0
+    if kind == "boolean":
+        return True
+    if schema.get("format") == "date-time":
+        return DATE_TIME
+    return schema.get("example", f"contract-{name or 'value'}")
+
+
+def request_values(operation, operations, ids):
+    """
+    The `values` of `build_request` for `operation`: `SAMPLE_VALUES`, the ids of the resources
+    of the test by parameter name, and `id` of the resource its body stands for.
+    """
+    values = {**SAMPLE_VALUES, **ids}
+    for name, creator in CREATORS.items():
+        created = operations.get(creator)
+        if created is not None and operation.body_schema is not None and operation.body_schema == created.body_schema \
+                and isinstance(ids.get(name), int):
+            values["id"] = ids[name]
+    return values
+
+
+def build_request(operation, values):
+    """
+    Keyword arguments of `httpx.AsyncClient.request` calling `operation`.
+
+    Path, query, header and form parameters take their value from `values`, or a sample of
+    their type; the body is sampled from its schema.
+    """
+    path = operation.path
+    params, headers, data, files, body = {}, {}, {}, {}, None
+    for parameter in operation.parameters:
+        name = parameter["name"]
+        location = parameter["in"]
+        if location == "body":
+            body = sample(parameter["schema"], operation.definitions, values)
+            continue
+        if not parameter.get("required") and name not in values and location != "formData":
+            continue
+        if parameter.get("type") == "file":
+            files[name] = ("contract.png", b"\x89PNG\r\n\x1a\ncontract", "image/png")
+            continue
+        value = values[name] if name in values else sample(parameter.get("items", parameter),
+                                                           operation.definitions, values, name)
+        if location == "path":
+            path = path.replace(f"{{{name}}}", str(value))
+        elif location == "query":
+            params[name] = value
+        elif location == "header":
+            headers[name] = str(value)
+        elif location == "formData":
+            data[name] = value
+    request = {"method": operation.method, "url": path}
+    if params:
+        request["params"] = params
+    if headers:
+        request["headers"] = headers
+    if body is not None:
+        request["json"] = body
+    if files:
+        request["files"] = files
+    if data:
+        request["data"] = data
+    return request
+
+
+class ContractPlugin:
+    """Records the fingerprints of the passing contract cases and deselects the unchanged ones."""
+
+    def __init__(self, cache, changed_only=False):
+        self.cache = cache
+        self.changed_only = changed_only
+        self.items = {}
+        self.failed = set()
+        self.passed = {}
+
+    def pytest_collection_modifyitems(self, config, items):
+        for item in items:
+            operation = getattr(getattr(item, "callspec", None), "params", {}).get("operation")
+            if isinstance(operation, Operation):
+                self.items[item.nodeid] = operation
+        if not self.changed_only:
+            return
+        manifest = self.cache.manifest()
+        unchanged = [item for item in items
+                     if item.nodeid in self.items and manifest.get(self.items[item.nodeid].operation_id)
+                     == self.items[item.nodeid].fingerprint]
+        if unchanged:
+            skip = set(unchanged)
+            items[:] = [item for item in items if item not in skip]
+            config.hook.pytest_deselected(items=unchanged)
+
+    def pytest_runtest_logreport(self, report):
+        operation = self.items.get(report.nodeid)
+        if operation is None:
+            return
+        # Only a case whose call passed vouches for its fingerprint: skipped and xfailed cases
+        # must run again next time, and a failing teardown takes the pass back.
+        if report.when == "call" and report.passed and not hasattr(report, "wasxfail"):
+            self.passed[operation.operation_id] = operation.fingerprint
+        elif report.failed:
+            self.passed.pop(operation.operation_id, None)
+            self.failed.add(operation.operation_id)
+
+    def pytest_sessionfinish(self, session):
+        if self.passed or self.failed:
+            self.cache.save_manifest(self.passed, self.failed)
+
+
+def pytest_addoption(parser):
+    parser.getgroup("petstore").addoption(
+        "--contract-changed",
+        action="store_true",
+        dest="contract_changed",
+        default=False,
+        help="only run the contract cases of the operations whose part of spec/swagger.json changed "
+             "since they last passed.",
+    )
+
+
+def pytest_configure(config):
+    cache = ValidatorCache(config.rootpath / CACHE_DIR)
+    config.pluginmanager.register(ContractPlugin(cache, config.getoption("contract_changed")), "petstore-contract")
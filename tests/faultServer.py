@@ -0,0 +1,360 @@
+"""
+Socket-served Petstore stand-in with a scriptable fault layer.
+
+`PetStoreServer` answers the Petstore API of `PetStoreApp` over real HTTP/1.1 connections on
+127.0.0.1, from a background thread with its own event loop, so timeouts, retries, connection
+errors and concurrency limits of the clients are exercised the way they are against the public
+host. Its `FaultProfile` decides, per route and request, what goes wrong:
+
+- latency, fixed, uniform between two bounds or drawn by any callable;
+- a 5xx or 429 answer, optionally with `Retry-After`, at a given rate or for the first `times`
+  requests;
+- a dropped connection (closed without an answer) or a reset one (RST);
+- a slow-dripped body, `chunk` bytes every `interval` seconds;
+- a throughput cap in requests per second.
+
+Decisions come from a seeded random generator, so a test's faults are the same on every run.
+Run it standalone as a drop-in target for `BASE_URL`:
+
+    python tests/faultServer.py --port 8080 --faults faults.json
+    PETSTORE_BASE_URL=http://127.0.0.1:8080/v2 pytest
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import struct
+import threading
+import time
+from urllib.parse import urlsplit
+
+from petStoreServer import PetStoreApp, PetStoreError, Request, json_array_chunks, route_template
+from resilientTransport import TokenBucket
+
+MAX_HEAD = 64 * 1024
+ACTIONS = ("status", "drop", "reset")
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 429: "Too Many Requests",
+           500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+
+class FaultRule:
+    """
+    Faults of the requests to one route, or all of them.
+
+    Args:
+        route (str or None): Route template such as "/pet/{petId}", None for every route.
+        method (str or None): HTTP method, None for every method.
+        latency (float, tuple or callable): Seconds added before answering: a number, a
+            `(low, high)` uniform range or a callable drawing from the profile's `random.Random`.
+        status (int or None): Answer with this status instead of the real one, e.g. 503 or 429.
+        retry_after (float or None): `Retry-After` seconds sent with `status`.
+        drop (bool): Close the connection without answering.
+        reset (bool): Reset the connection without answering.
+        rate (float): Probability that `status`, `drop` or `reset` applies to a matching request.
+        times (int or None): Apply them to at most this many requests, None for no limit.
+        drip (tuple or None): `(chunk, interval)`, send the body `chunk` bytes every `interval` seconds.
+        max_rps (float or None): Requests per second the route answers at most, the rest wait.
+    """
+
+    def __init__(self, route=None, method=None, latency=None, status=None, retry_after=None, drop=False,
+                 reset=False, rate=1.0, times=None, drip=None, max_rps=None):
+        if sum((status is not None, drop, reset)) > 1:
+            raise ValueError("a fault rule answers with a status, drops or resets, not several of them")
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f"fault rate must be between 0 and 1, got {rate}")
+        self.route = route
+        self.method = method.upper() if method else None
+        self.latency = latency
+        self.status = status
+        self.retry_after = retry_after
+        self.action = "status" if status is not None else "drop" if drop else "reset" if reset else None
+        self.rate = rate
+        self.times = times
+        self.drip = drip
+        self.bucket = TokenBucket(max_rps, burst=1) if max_rps else None
+        self.matched = 0
+        self.fired = 0
+
+    def __repr__(self):
+        return f"FaultRule({self.method or '*'} {self.route or '*'}, action={self.action}, fired={self.fired})"
+
+    def matches(self, method, route):
+        return (self.method is None or self.method == method) and (self.route is None or self.route == route)
+
+    def delay(self, rng):
+        if self.latency is None:
+            return 0.0
+        if callable(self.latency):
+            return max(float(self.latency(rng)), 0.0)
+        if isinstance(self.latency, (tuple, list)):
+            return rng.uniform(*self.latency)
+        return float(self.latency)
+
+    def fires(self, rng):
+        if self.action is None or (self.times is not None and self.fired >= self.times):
+            return False
+        # Drawn even at rate 1, so adding a rule does not shift the draws of the others.
+        if rng.random() >= self.rate:
+            return False
+        self.fired += 1
+        return True
+
+
+class Plan:
+    """What the server does with one request: wait, then answer normally or fault."""
+
+    def __init__(self):
+        self.latency = 0.0
+        self.rule = None
+        self.drip = None
+        self.buckets = []
+
+
+class FaultProfile:
+    """
+    The fault rules of a server, applied in order to every request.
+
+    Latencies of all matching rules add up; the first matching rule whose action fires decides
+    the answer.
+
+    Args:
+        rules (list): `FaultRule`s, more can be added with `add`.
+        seed (int): Seed of the decisions, the same seed gives the same faults.
+    """
+
+    def __init__(self, rules=(), seed=0):
+        self.rules = list(rules)
+        self.random = random.Random(seed)
+
+    def add(self, **kwargs):
+        """Add a `FaultRule` built from `kwargs` and return it."""
+        rule = FaultRule(**kwargs)
+        self.rules = self.rules + [rule]
+        return rule
+
+    def plan(self, method, route):
+        plan = Plan()
+        for rule in self.rules:
+            if not rule.matches(method, route):
+                continue
+            rule.matched += 1
+            plan.latency += rule.delay(self.random)
+            if rule.bucket is not None:
+                plan.buckets.append(rule.bucket)
+            if rule.drip is not None:
+                plan.drip = rule.drip
+            if plan.rule is None and rule.fires(self.random):
+                plan.rule = rule
+        return plan
+
+    @classmethod
+    def from_json(cls, rules, seed=0):
+        """Build a profile from a list of `FaultRule` keyword dicts, as read from a JSON file."""
+        return cls([FaultRule(**{key: tuple(value) if isinstance(value, list) else value
+                                 for key, value in rule.items()}) for rule in rules], seed)
+
+
+class _HttpError(Exception):
+    pass
+
+
+async def read_request(reader):
+    """Read one HTTP/1.1 request, returning None when the client closed the connection."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as error:
+        if error.partial.strip():
+            raise _HttpError("connection closed in the middle of a request head")
+        return None
+    except asyncio.LimitOverrunError:
+        raise _HttpError("request head too large")
+    request_line, *lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = request_line.split(" ")
+    except ValueError:
+        raise _HttpError(f"malformed request line {request_line!r}")
+    headers = {}
+    for line in lines:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        body = bytearray()
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if size == 0:
+                await reader.readuntil(b"\r\n")
+                break
+            body += await reader.readexactly(size)
+            await reader.readexactly(2)
+        body = bytes(body)
+    else:
+        body = await reader.readexactly(int(headers.get("content-length", 0)))
+    url = urlsplit(target)
+    keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+    return Request(method, url.path, url.query, body, headers), keep_alive
+
+
+class PetStoreServer:
+    """
+    `PetStoreApp` served over HTTP/1.1 on a local port, with the faults of `profile`.
+
+    Use it as a context manager, or `start` and `stop` it; `base_url` is the Petstore base URL
+    clients point at. `profile` can be replaced at any time, e.g. by the `faults` fixture for
+    each test.
+
+    Args:
+        app (PetStoreApp or None): The API served, a freshly seeded one by default.
+        host (str): The interface to listen on.
+        port (int): The port, 0 for any free one.
+        profile (FaultProfile or None): The faults, none by default.
+    """
+
+    def __init__(self, app=None, host="127.0.0.1", port=0, profile=None):
+        self.app = app or PetStoreApp()
+        self.host = host
+        self.port = port
+        self.profile = profile or FaultProfile()
+        self.requests = 0
+        self.loop = None
+        self.server = None
+        self.thread = None
+        self.connections = set()
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}{self.app.base_path}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        ready = threading.Event()
+        self.loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.server = self.loop.run_until_complete(
+                asyncio.start_server(self.serve_connection, self.host, self.port, limit=MAX_HEAD))
+            self.port = self.server.sockets[0].getsockname()[1]
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name="petstore-server", daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    def stop(self):
+        if self.thread is None:
+            return
+
+        async def shutdown():
+            self.server.close()
+            for writer in list(self.connections):
+                writer.transport.abort()
+            await self.server.wait_closed()
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.thread = None
+
+    async def serve_connection(self, reader, writer):
+        self.connections.add(writer)
+        try:
+            while True:
+                parsed = await read_request(reader)
+                if parsed is None:
+                    break
+                request, keep_alive = parsed
+                if not await self.respond(request, keep_alive, writer):
+                    return
+                if not keep_alive:
+                    break
+        except (_HttpError, ValueError):
+            await self.write_response(writer, 400, {"code": 400, "type": "unknown", "message": "bad request"}, {},
+                                      keep_alive=False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    async def respond(self, request, keep_alive, writer):
+        """Answer one request with its faults, returning False when the connection was dropped or reset."""
+        self.requests += 1
+        plan = self.profile.plan(request.method, route_template(request.method, request.path, self.app.base_path))
+        for bucket in plan.buckets:
+            await bucket.acquire()
+        if plan.latency:
+            await asyncio.sleep(plan.latency)
+        rule = plan.rule
+        if rule is not None and rule.action == "drop":
+            writer.close()
+            return False
+        if rule is not None and rule.action == "reset":
+            # Linger 0 makes the close send a RST instead of a FIN.
+            writer.get_extra_info("socket").setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+            writer.transport.abort()
+            return False
+        if rule is not None:
+            error = PetStoreError(rule.status, "injected fault")
+            headers = {} if rule.retry_after is None else {"Retry-After": f"{rule.retry_after:g}"}
+            status, payload = error.status, error.body()
+        else:
+            status, payload, headers = self.app.handle(request)
+        await self.write_response(writer, status, payload, headers, keep_alive, plan.drip)
+        return True
+
+    async def write_response(self, writer, status, payload, headers, keep_alive=True, drip=None):
+        if isinstance(payload, (dict, list)):
+            content = json.dumps(payload, separators=(",", ":")).encode()
+        else:
+            content = b"".join(json_array_chunks(payload))
+        head = [f"HTTP/1.1 {status} {REASONS.get(status, 'Unknown')}", "Content-Type: application/json",
+                f"Content-Length: {len(content)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        head += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+        if drip is None:
+            writer.write(content)
+            await writer.drain()
+            return
+        size, interval = drip
+        for start in range(0, len(content), size):
+            writer.write(content[start:start + size])
+            await writer.drain()
+            if start + size < len(content):
+                await asyncio.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Petstore stand-in over HTTP with injected faults.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--faults", metavar="PATH", help="JSON list of fault rules, keyword arguments of FaultRule")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    profile = FaultProfile(seed=args.seed)
+    if args.faults:
+        with open(args.faults) as file:
+            profile = FaultProfile.from_json(json.load(file), args.seed)
+    server = PetStoreServer(host=args.host, port=args.port, profile=profile)
+    server.start()
+    print(f"Petstore serving on {server.base_url} with {len(profile.rules)} fault rules, Ctrl-C to stop", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import os
+import random
+import re
+import zlib
+
+NAMESPACE_SPAN = 10**12
+WORKER_SPAN = 10**9
+BLOCK_SIZE = 10**4
+BLOCKS_PER_WORKER = WORKER_SPAN // BLOCK_SIZE
+MAX_NAMESPACE = 9_000_000
+MAX_WORKERS = NAMESPACE_SPAN // WORKER_SPAN
+
+
+def worker_index(environ=os.environ):
+    """
+    Return the index of this worker process among the workers of a run.
+
+    `PETSTORE_WORKER_INDEX` wins, then the pytest-xdist worker id (`gw3` is worker 3);
+    a run without workers is worker 0.
+    """
+    if environ.get("PETSTORE_WORKER_INDEX"):
+        return int(environ["PETSTORE_WORKER_INDEX"])
+    found = re.search(r"\d+", environ.get("PYTEST_XDIST_WORKER", ""))
+    return int(found.group()) if found else 0
+
+
+def namespace_from_environment(environ=os.environ):
+    """
+    Return the id namespace of this run from `PETSTORE_ID_NAMESPACE`.
+
+    Runs sharing a namespace reuse the same ids, which keeps recorded cassettes matching.
+    Machines sharding one run should each set their own namespace, and `random` picks a
+    fresh one for runs that must never meet another run's data.
+    """
+    value = environ.get("PETSTORE_ID_NAMESPACE", "1")
+    if value == "random":
+        return random.SystemRandom().randrange(1, MAX_NAMESPACE)
+    return int(value)
+
+
+class IdBlock:
+    """
+    Ids handed to one owner, a test or a load run, from its own disjoint block.
+
+    A new block is claimed from the allocator whenever the current one runs out.
+    """
+
+    def __init__(self, allocator, owner, keep=True):
+        self.allocator = allocator
+        self.owner = owner
+        self.keep = keep
+        self.issued = []
+        self._next = self._end = 0
+
+    def next(self):
+        if self._next >= self._end:
+            self._next = self.allocator.claim_block(self.owner)
+            self._end = self._next + BLOCK_SIZE
+        value = self._next
+        self._next += 1
+        if self.keep:
+            self.issued.append(value)
+        return value
+
+    __next__ = next
+
+    def __iter__(self):
+        return self
+
+
+class IdAllocator:
+    """
+    Allocates pet ids so concurrent tests, workers and machines never share one.
+
+    The id space of a run is split by namespace (one per run or machine), then by worker
+    process, then into blocks of `BLOCK_SIZE` ids. Each test owns its blocks; the first one is
+    placed by a stable hash of the test node id, so a test gets the same ids on every run no
+    matter which other tests are selected. Every issued id is kept per owner.
+
+    Args:
+        namespace (int): The run's namespace, 0 < namespace < MAX_NAMESPACE.
+        worker (int): The index of this worker process, below MAX_WORKERS.
+    """
+
+    def __init__(self, namespace=1, worker=0):
+        if not 0 < namespace < MAX_NAMESPACE:
+            raise ValueError(f"id namespace must be between 1 and {MAX_NAMESPACE - 1}, got {namespace}")
+        if not 0 <= worker < MAX_WORKERS:
+            raise ValueError(f"worker index must be between 0 and {MAX_WORKERS - 1}, got {worker}")
+        self.namespace = namespace
+        self.worker = worker
+        self.base = namespace * NAMESPACE_SPAN + worker * WORKER_SPAN
+        self.blocks = {}
+        self.owners = {}
+        self.id_blocks = []
+
+    @classmethod
+    def from_environment(cls, environ=os.environ):
+        return cls(namespace_from_environment(environ), worker_index(environ))
+
+    def claim_block(self, owner):
+        """Reserve a free block for `owner` and return its first id."""
+        if len(self.blocks) >= BLOCKS_PER_WORKER:
+            raise RuntimeError("pet id space of this worker is exhausted")
+        index = zlib.crc32(f"{owner}#{len(self.owners.get(owner, ()))}".encode()) % BLOCKS_PER_WORKER
+        while index in self.blocks:
+            index = (index + 1) % BLOCKS_PER_WORKER
+        self.blocks[index] = owner
+        self.owners.setdefault(owner, []).append(index)
+        return self.base + index * BLOCK_SIZE
+
+    def ids_for(self, owner, keep=True):
+        """
+        Return a new `IdBlock` issuing ids to `owner`.
+
+        With `keep` False the ids it issues are not kept, so a long load or soak run does not
+        grow with them; `issued` leaves them out.
+        """
+        block = IdBlock(self, owner, keep)
+        self.id_blocks.append(block)
+        return block
+
+    def issued(self):
+        """Return `{owner: [ids]}` for every id handed out so far."""
+        issued = {}
+        for block in self.id_blocks:
+            issued.setdefault(block.owner, []).extend(block.issued)
+        return issued
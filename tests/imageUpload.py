@@ -0,0 +1,260 @@
+"""
+Streaming image uploads to POST /pet/{petId}/uploadImage.
+
+`MultipartFileStream` sends a file as a ``multipart/form-data`` body without ever holding it in
+memory: the file is memory-mapped and the body is yielded in `chunk_size` slices of the mapping,
+between the part headers and the closing boundary. The length of the body is known up front, so
+it goes out with a Content-Length rather than chunked transfer encoding, which not every server
+accepts on uploads.
+
+`run_uploads` uploads a set of files concurrently and reports the throughput in MB/s along with
+the peak of the memory this process traced while uploading. The default "server" target is the
+stand-in of `faultServer.py` in a child process, so that the peak is the client side's alone: the
+stand-in reads every body whole before answering.
+
+    python tests/imageUpload.py --size 64MB --files 8 --concurrency 4
+"""
+import argparse
+import asyncio
+import contextlib
+import mmap
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import httpx
+
+from clientPool import PoolStats, build_transport, petstore_base_url
+from idAllocator import IdAllocator
+from petAuth import BearerAuth, IdentityPool, TokenCache
+from requestTiming import percentile
+from soakRunner import TARGETS, stand_in_process
+
+CHUNK_SIZE = 256 * 1024
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+SIZE_UNITS = {"": 1, "B": 1, "KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+UPLOADED = re.compile(r"File uploaded to \./(?P<filename>.*), (?P<size>\d+) bytes")
+
+
+def parse_size(text):
+    """Number of bytes of a size such as ``512``, ``64KB`` or ``1.5MB``."""
+    found = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*", text, re.IGNORECASE)
+    if found is None:
+        raise ValueError(f"not a size: {text!r}")
+    return int(float(found.group(1)) * SIZE_UNITS[found.group(2).upper()])
+
+
+def write_image(path, size, seed=0):
+    """
+    Write a `size` bytes file starting with the PNG signature, a block at a time.
+
+    The content after the signature is pseudo-random, fresh for every block, so that nothing on
+    the way can compress it, and seeded, so that the same seed writes the same file.
+    """
+    rng = random.Random(seed)
+    with open(path, "wb") as file:
+        remaining = size - file.write(PNG_SIGNATURE[:size])
+        while remaining > 0:
+            remaining -= file.write(rng.randbytes(min(CHUNK_SIZE, remaining)))
+    return Path(path)
+
+
+class MultipartFileStream(httpx.AsyncByteStream):
+    """
+    A ``multipart/form-data`` request body streaming one file from disk.
+
+    The body can be iterated again, each time mapping the file anew, so a request built on it can
+    be sent more than once.
+
+    Args:
+        path (str or Path): The file sent in the part named `field`.
+        field (str): Name of the file part.
+        fields (dict): Plain form fields sent before the file part, name to value.
+        content_type (str): Content type of the file part.
+        chunk_size (int): Bytes of the mapping yielded at a time.
+        boundary (str or None): The multipart boundary, a random one by default.
+    """
+
+    def __init__(self, path, field="file", fields=None, content_type="image/png", chunk_size=CHUNK_SIZE,
+                 boundary=None):
+        self.path = Path(path)
+        self.chunk_size = chunk_size
+        self.boundary = boundary or os.urandom(16).hex()
+        delimiter = f"--{self.boundary}\r\n"
+        head = "".join(f'{delimiter}Content-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+                       for name, value in (fields or {}).items())
+        head += (f'{delimiter}Content-Disposition: form-data; name="{field}"; filename="{self.path.name}"\r\n'
+                 f"Content-Type: {content_type}\r\n\r\n")
+        self.head = head.encode()
+        self.tail = f"\r\n--{self.boundary}--\r\n".encode()
+        self.size = self.path.stat().st_size
+
+    @property
+    def headers(self):
+        return {
+            "Content-Type": f"multipart/form-data; boundary={self.boundary}",
+            "Content-Length": str(len(self.head) + self.size + len(self.tail)),
+        }
+
+    async def __aiter__(self):
+        yield self.head
+        if self.size:
+            with open(self.path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    for start in range(0, self.size, self.chunk_size):
+                        # Slices are views of the mapping, not copies; each one is released before
+                        # the next so that the mapping can be closed.
+                        with view[start:start + self.chunk_size] as chunk:
+                            yield chunk
+        yield self.tail
+
+
+async def upload_image(client, pet_id, path, metadata="", chunk_size=CHUNK_SIZE):
+    """
+    Upload the file at `path` as the image of pet `pet_id`, streaming it from disk.
+
+    Returns:
+        httpx.Response: The response of the Petstore, read.
+    """
+    stream = MultipartFileStream(path, fields={"additionalMetadata": metadata}, chunk_size=chunk_size)
+    return await client.post(f"/pet/{pet_id}/uploadImage", content=stream, headers=stream.headers)
+
+
+def uploaded_size(response):
+    """Bytes the Petstore says it received, from the message of an uploadImage response."""
+    found = UPLOADED.search(response.json().get("message", ""))
+    return int(found.group("size")) if found else None
+
+
+def max_rss_bytes():
+    """High-water mark of the resident memory of the process so far."""
+    # Linux reports kilobytes, macOS bytes.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+async def run_uploads(target="server", size=16 * 1024 ** 2, files=8, concurrency=4, chunk_size=CHUNK_SIZE,
+                      directory=None, base_url=None):
+    """
+    Upload `files` images of `size` bytes, `concurrency` at a time, each to a pet of its own.
+
+    Args:
+        target (str): "server" for the stand-in in a child process, or "remote" or "local" as
+            for `--petstore-target`.
+        size (int): Bytes of every file.
+        files (int): Number of files uploaded.
+        concurrency (int): Uploads in flight at once.
+        chunk_size (int): Bytes of a file handed to the transport at a time.
+        directory (str or None): Where the files are written, a temporary directory by default.
+        base_url (str or None): URL of an already running Petstore, instead of the one of `target`.
+
+    Returns:
+        dict: Bytes sent, throughput, upload latency percentiles, failed uploads and the memory peaks.
+    """
+    stats = PoolStats()
+    async with contextlib.AsyncExitStack() as stack:
+        if directory is None:
+            directory = stack.enter_context(tempfile.TemporaryDirectory(prefix="petstore-upload-"))
+        paths = [write_image(Path(directory) / f"image-{index}.png", size, seed=index) for index in range(files)]
+        if base_url is None:
+            if target == "server":
+                base_url = await stack.enter_async_context(stand_in_process())
+            else:
+                base_url = petstore_base_url(target)
+        transport = build_transport(stats, target="local" if target == "local" else "remote",
+                                    max_connections=concurrency, max_keepalive=concurrency)
+        stack.push_async_callback(transport.aclose_shared)
+        client = await stack.enter_async_context(httpx.AsyncClient(
+            base_url=base_url, transport=transport, auth=BearerAuth(TokenCache(), IdentityPool().next()),
+            timeout=httpx.Timeout(30.0, write=None)))
+        ids = IdAllocator.from_environment().ids_for("imageUpload")
+        pet_ids = [ids.next() for _ in range(files)]
+        for pet_id in pet_ids:
+            created = await client.post("/pet", json={"id": pet_id, "name": f"upload-{pet_id}", "photoUrls": []})
+            created.raise_for_status()
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+        failures = []
+
+        async def upload(pet_id, path):
+            async with semaphore:
+                began = time.perf_counter()
+                try:
+                    response = await upload_image(client, pet_id, path, metadata=path.name, chunk_size=chunk_size)
+                except httpx.HTTPError as error:
+                    failures.append(f"{path.name}: {type(error).__name__}: {error}")
+                    return
+                latencies.append(time.perf_counter() - began)
+                if response.status_code != 200 or uploaded_size(response) != size:
+                    failures.append(f"{path.name}: {response.status_code} {response.text[:200]}")
+
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        try:
+            await asyncio.gather(*(upload(pet_id, path) for pet_id, path in zip(pet_ids, paths)))
+            elapsed = time.perf_counter() - started
+            peak = tracemalloc.get_traced_memory()[1] - baseline
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+    latencies.sort()
+    sent = size * (files - len(failures))
+    return {
+        "target": target,
+        "files": files,
+        "size_bytes": size,
+        "concurrency": concurrency,
+        "chunk_size": chunk_size,
+        "elapsed_s": elapsed,
+        "bytes_sent": sent,
+        "mb_per_s": sent / 1024 ** 2 / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000 if latencies else None,
+        "p95_ms": percentile(latencies, 95) * 1000 if latencies else None,
+        "failures": failures,
+        "peak_traced_bytes": peak,
+        "max_rss_bytes": max_rss_bytes(),
+    }
+
+
+def format_report(report):
+    lines = [
+        f"target: {report['target']}  files: {report['files']} x {report['size_bytes'] / 1024 ** 2:.1f} MB  "
+        f"concurrency: {report['concurrency']}  chunk: {report['chunk_size'] // 1024} KB",
+        f"sent {report['bytes_sent'] / 1024 ** 2:.1f} MB in {report['elapsed_s']:.2f}s: {report['mb_per_s']:.1f} MB/s",
+    ]
+    if report["p50_ms"] is not None:
+        lines.append(f"upload latency p50 {report['p50_ms']:.0f}ms  p95 {report['p95_ms']:.0f}ms")
+    lines.append(f"client peak traced memory {report['peak_traced_bytes'] / 1024 ** 2:.2f} MB  "
+                 f"max RSS {report['max_rss_bytes'] / 1024 ** 2:.1f} MB")
+    if report["failures"]:
+        lines += [f"FAILED UPLOADS ({len(report['failures'])}):"] + [f"  {failure}" for failure in report["failures"]]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Upload images to the petstore concurrently, streaming them from disk.")
+    parser.add_argument("--target", choices=TARGETS, default="server")
+    parser.add_argument("--size", type=parse_size, default="16MB", help="size of every file, e.g. 512KB or 1.5GB")
+    parser.add_argument("--files", type=int, default=8, help="number of files uploaded")
+    parser.add_argument("--concurrency", type=int, default=4, help="uploads in flight at once")
+    parser.add_argument("--chunk-size", type=parse_size, default=str(CHUNK_SIZE), help="bytes streamed at a time")
+    parser.add_argument("--directory", help="where the files are written, a temporary directory by default")
+    args = parser.parse_args(argv)
+    report = asyncio.run(run_uploads(args.target, args.size, args.files, args.concurrency, args.chunk_size,
+                                     args.directory))
+    print(format_report(report))
+    return 1 if report["failures"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
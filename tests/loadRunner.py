@@ -0,0 +1,246 @@
+"""
+Load mode: replay the pet test scenarios as a weighted, concurrent workload.
+
+The scenarios are the test functions themselves, called with the same payload builders
+the fixtures use, so the load run and the suite never drift apart. Run it with
+
+    python tests/loadRunner.py --target local --users 20 --rate 200 --duration 30
+
+`--rate` paces the requests, not the scenarios, which send several each: every request of
+every virtual user waits for its slot, and the report shows the achieved rate next to it.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import random
+import time
+
+import httpx
+
+from clientPool import Pacer, PoolStats, build_transport, petstore_base_url
+from idAllocator import IdAllocator
+from petAuth import BearerAuth, IdentityPool, TokenCache
+from petPayloads import pet_payload, pet_reference
+from petStoreServer import route_template
+from requestTiming import percentile
+from waitUntil import ConvergenceLog
+import test_swPetStore_delete
+import test_swPetStore_get
+import test_swPetStore_post
+import test_swPetStore_put
+
+SCENARIOS = {
+    "get": test_swPetStore_get.test_get_pet_by_id_success,
+    "post": test_swPetStore_post.test_post_pet,
+    "put": test_swPetStore_put.test_put_pet,
+    "delete": test_swPetStore_delete.test_delete_pet,
+}
+DEFAULT_WEIGHTS = {"get": 3, "post": 3, "put": 2, "delete": 2}
+# Latest waits summarized in the report; a soak run loops long enough for all of them to add up.
+WAITS_KEPT = 10_000
+
+
+class LatencyRecorder:
+    """Collects request latencies per endpoint and status code through httpx event hooks."""
+
+    def __init__(self):
+        self.samples = {}
+
+    async def on_request(self, request):
+        request.extensions["load_started"] = time.perf_counter()
+
+    async def on_response(self, response):
+        await response.aread()
+        request = response.request
+        elapsed = time.perf_counter() - request.extensions["load_started"]
+        key = (request.method, route_template(request.method, request.url.path), response.status_code)
+        self.samples.setdefault(key, []).append(elapsed)
+
+    @property
+    def event_hooks(self):
+        return {"request": [self.on_request], "response": [self.on_response]}
+
+    def summary(self):
+        rows = []
+        for (method, route, status), latencies in sorted(self.samples.items()):
+            latencies = sorted(latencies)
+            rows.append({
+                "endpoint": f"{method} {route}",
+                "status": status,
+                "count": len(latencies),
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "p99_ms": percentile(latencies, 99) * 1000,
+            })
+        return rows
+
+
+class Workload:
+    """
+    Weighted mix of test scenarios and the fixture values they are called with.
+
+    Unlike the suite's, its id source and convergence log keep no record of every id and wait,
+    only the latest `WAITS_KEPT` waits, so a long run stays flat in memory.
+
+    Args:
+        weights (dict): Scenario name to relative weight.
+        seed (int or None): Seed for scenario selection.
+    """
+
+    def __init__(self, weights=None, seed=None):
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        unknown = set(self.weights) - set(SCENARIOS)
+        if unknown:
+            raise ValueError(f"unknown scenarios: {', '.join(sorted(unknown))}")
+        self.random = random.Random(seed)
+        self.ids = IdAllocator.from_environment().ids_for("loadRunner", keep=False)
+        self.convergence = ConvergenceLog(keep=WAITS_KEPT)
+        self.names = list(self.weights)
+
+    def pick(self):
+        return self.random.choices(self.names, weights=[self.weights[name] for name in self.names])[0]
+
+    def arguments(self, scenario, client):
+        fixtures = {
+            "default_client": lambda: client,
+            "mock_post_pet": lambda: pet_payload(next(self.ids)),
+            "mock_get_pet": pet_reference,
+            "fake_jwt_token": lambda: client.auth.token,
+            "eventually": lambda: self.convergence.for_test("loadRunner"),
+        }
+        return {name: fixtures[name]() for name in inspect.signature(scenario).parameters}
+
+
+async def virtual_user(client, workload, deadline, outcomes):
+    while time.perf_counter() < deadline:
+        # The in-process target never suspends, without this one user would keep the loop to itself.
+        await asyncio.sleep(0)
+        if time.perf_counter() >= deadline:
+            break
+        name = workload.pick()
+        scenario = SCENARIOS[name]
+        try:
+            await scenario(**workload.arguments(scenario, client))
+            outcome = "passed"
+        except (AssertionError, httpx.HTTPError, ValueError, KeyError, TypeError) as error:
+            outcome = f"failed: {type(error).__name__}"
+        counts = outcomes.setdefault(name, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+
+async def run_load(target="local", users=10, rate=0, duration=10.0, weights=None, seed=None, http2=False,
+                   identities=1):
+    """
+    Replay the scenarios with `users` concurrent virtual users for `duration` seconds.
+
+    Args:
+        target (str): "remote" or "local", as for `--petstore-target`.
+        users (int): Number of concurrent virtual users.
+        rate (float): Target requests per second across all users, 0 for as fast as possible.
+        duration (float): Seconds to keep starting new scenarios.
+        weights (dict): Scenario name to relative weight, `DEFAULT_WEIGHTS` by default.
+        seed (int or None): Seed making scenario selection reproducible.
+        http2 (bool): Whether to negotiate HTTP/2 against the remote target.
+        identities (int): Number of distinct users the virtual users authenticate as, in turn.
+
+    Returns:
+        dict: Throughput, scenario outcomes and latency percentiles per endpoint and status code.
+    """
+    workload = Workload(weights, seed)
+    recorder = LatencyRecorder()
+    stats = PoolStats()
+    transport = build_transport(stats, target=target, max_connections=users, max_keepalive=users, http2=http2)
+    outcomes = {}
+    started = time.perf_counter()
+    tokens = TokenCache()
+    pool = IdentityPool(identities)
+    pacer = Pacer(rate)
+
+    async def paced(request):
+        await pacer.wait()
+
+    # Paced before the latency starts counting, so waiting for a slot is not latency of the target.
+    event_hooks = {**recorder.event_hooks, "request": [paced, *recorder.event_hooks["request"]]}
+    # One client per virtual user on the shared transport, each signed in as its own identity.
+    clients = [httpx.AsyncClient(base_url=petstore_base_url(target), transport=transport,
+                                 event_hooks=event_hooks, auth=BearerAuth(tokens, pool.next()))
+               for _ in range(users)]
+    deadline = started + duration
+    try:
+        await asyncio.gather(*(virtual_user(client, workload, deadline, outcomes) for client in clients))
+    finally:
+        for client in clients:
+            await client.aclose()
+        await transport.aclose_shared()
+    elapsed = time.perf_counter() - started
+    return {
+        "target": target,
+        "users": users,
+        "duration_s": elapsed,
+        "requests": stats.requests,
+        "throughput_rps": stats.requests / elapsed if elapsed else 0.0,
+        "target_rps": rate,
+        "scenarios": outcomes,
+        "endpoints": recorder.summary(),
+        "pool": stats.summary(),
+        "auth": tokens.summary(),
+        "convergence": workload.convergence.summary(),
+    }
+
+
+def format_report(report):
+    lines = [
+        f"target: {report['target']}  users: {report['users']}  duration: {report['duration_s']:.2f}s",
+        f"requests: {report['requests']}  throughput: {report['throughput_rps']:.1f} req/s"
+        + (f" of {report['target_rps']:g} req/s targeted" if report["target_rps"] else ""),
+        f"pool: {report['pool']}",
+        f"auth: {report['auth']}",
+        "",
+        "scenario outcomes:",
+    ]
+    for name, counts in sorted(report["scenarios"].items()):
+        lines.append(f"  {name:<8} " + "  ".join(f"{outcome}={count}" for outcome, count in sorted(counts.items())))
+    if report["convergence"]:
+        lines += ["", "convergence:"] + [f"  {line}" for line in report["convergence"]]
+    lines += ["", f"  {'endpoint':<32}{'status':>7}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"]
+    for row in report["endpoints"]:
+        lines.append(
+            f"  {row['endpoint']:<32}{row['status']:>7}{row['count']:>8}"
+            f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}"
+        )
+    return "\n".join(lines)
+
+
+def parse_weights(values):
+    weights = dict(DEFAULT_WEIGHTS)
+    for value in values or []:
+        name, _, weight = value.partition("=")
+        weights[name] = float(weight)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the petstore test scenarios as a load test.")
+    parser.add_argument("--target", choices=("remote", "local"), default="local")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--rate", type=float, default=0, help="requests per second, 0 for unpaced")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--weight", action="append", metavar="SCENARIO=WEIGHT",
+                        help=f"scenario weight, repeatable; scenarios: {', '.join(SCENARIOS)}")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--http2", action="store_true")
+    parser.add_argument("--identities", type=int, default=1, help="distinct users the virtual users sign in as")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+    report = asyncio.run(run_load(args.target, args.users, args.rate, args.duration,
+                                  parse_weights(args.weight), args.seed, args.http2,
+                                  args.identities))
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Bearer tokens for the Petstore clients, minted once per identity and scope.
+
+`TokenCache` signs a fake HS256 JWT the first time an identity asks for one and hands out the
+same token until it gets within `refresh_margin` seconds of its `exp`, so a test run or a load
+run signs one token per identity instead of one per test or scenario. `BearerAuth` is the
+`httpx.Auth` attaching it to every request of a client, and `IdentityPool` gives load runs and
+tests a fixed set of distinct users to spread their traffic over.
+"""
+import threading
+import time
+import warnings
+import zlib
+
+import httpx
+import jwt
+
+from clientPool import BASE_URL
+
+DEFAULT_USERNAME = "test_user"
+DEFAULT_SCOPES = ("write:pets", "read:pets")
+# The fake tokens are signed with the Petstore URL, the target does not check them.
+SECRET = BASE_URL
+
+
+class TokenCache:
+    """
+    Tokens per `(username, scopes)`, re-minted shortly before they expire.
+
+    Args:
+        lifetime (float): Seconds from `iat` to `exp` of a minted token.
+        refresh_margin (float): A token this close to its `exp` is minted again.
+        secret (str): The HS256 signing key.
+        clock (callable): Returns the current time in seconds, `time.time` by default.
+    """
+
+    def __init__(self, lifetime=3600.0, refresh_margin=60.0, secret=SECRET, clock=time.time):
+        if refresh_margin >= lifetime:
+            raise ValueError(f"refresh margin {refresh_margin}s must be shorter than the token lifetime {lifetime}s")
+        self.lifetime = lifetime
+        self.refresh_margin = refresh_margin
+        self.secret = secret
+        self.clock = clock
+        self.tokens = {}
+        self.minted = 0
+        self.hits = 0
+        # Load runs and tests only share it between tasks of one loop, but minting is cheap to guard.
+        self.lock = threading.Lock()
+
+    def mint(self, username, scopes):
+        now = int(self.clock())
+        payload = {
+            "username": username,
+            "scope": " ".join(scopes),
+            "iat": now,
+            "exp": now + int(self.lifetime),
+        }
+        with warnings.catch_warnings():
+            # PyJWT warns that the key is short, the target does not check the fake tokens anyway.
+            warnings.simplefilter("ignore")
+            return jwt.encode(payload, self.secret, algorithm="HS256"), payload["exp"]
+
+    def token(self, username=DEFAULT_USERNAME, scopes=DEFAULT_SCOPES):
+        """Return a valid token for `username` and `scopes`, minting one if none is cached or it expires soon."""
+        key = (username, tuple(scopes))
+        with self.lock:
+            cached = self.tokens.get(key)
+            if cached is not None and cached[1] - self.clock() > self.refresh_margin:
+                self.hits += 1
+                return cached[0]
+            token, expires = self.mint(username, key[1])
+            self.tokens[key] = (token, expires)
+            self.minted += 1
+            return token
+
+    def summary(self):
+        return f"{self.minted} tokens minted for {len(self.tokens)} identities, {self.hits} served from cache"
+
+
+class Identity:
+    """A user the clients authenticate as, with the scopes its tokens carry."""
+
+    def __init__(self, username=DEFAULT_USERNAME, scopes=DEFAULT_SCOPES):
+        self.username = username
+        self.scopes = tuple(scopes)
+
+    def __repr__(self):
+        return f"Identity({self.username!r}, {self.scopes!r})"
+
+
+class IdentityPool:
+    """
+    `size` distinct identities, `test_user` alone for a pool of one so single runs keep the old token.
+
+    Args:
+        size (int): Number of identities.
+        prefix (str): Username prefix of the identities of a larger pool.
+        scopes (tuple): The scopes of every identity.
+    """
+
+    def __init__(self, size=1, prefix=DEFAULT_USERNAME, scopes=DEFAULT_SCOPES):
+        if size < 1:
+            raise ValueError(f"an identity pool needs at least one identity, got {size}")
+        names = [prefix] if size == 1 else [f"{prefix}_{index}" for index in range(size)]
+        self.identities = [Identity(name, scopes) for name in names]
+        self.next_index = 0
+
+    def __len__(self):
+        return len(self.identities)
+
+    def next(self):
+        """Return the identities in turn, for virtual users of a load run."""
+        identity = self.identities[self.next_index % len(self.identities)]
+        self.next_index += 1
+        return identity
+
+    def for_owner(self, owner):
+        """Return the identity of `owner`, e.g. a test node id, the same one on every run."""
+        return self.identities[zlib.crc32(owner.encode()) % len(self.identities)]
+
+
+class BearerAuth(httpx.Auth):
+    """
+    Adds `Authorization: Bearer <token>` of `identity` to requests that do not carry one yet.
+
+    Args:
+        cache (TokenCache): Where the tokens come from.
+        identity (Identity): Who the requests are sent as.
+    """
+
+    def __init__(self, cache, identity=None):
+        self.cache = cache
+        self.identity = identity or Identity()
+
+    @property
+    def token(self):
+        return self.cache.token(self.identity.username, self.identity.scopes)
+
+    def auth_flow(self, request):
+        if "authorization" not in request.headers:
+            request.headers["Authorization"] = f"Bearer {self.token}"
+        yield request
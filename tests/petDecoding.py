@@ -0,0 +1,248 @@
+import functools
+import importlib.util
+import re
+
+from pydantic import TypeAdapter, ValidationError
+
+from petModel import OrderResponse, PetResponse, UserResponse
+
+JSON_BACKENDS = ("pydantic", "orjson")
+DEFAULT_BACKEND = "pydantic"
+
+
+class ResponseValidationError(AssertionError):
+    """
+    Raised when a response body is not valid JSON or does not match its model.
+
+    It is an `AssertionError`, so a test fails with it like with a failed assert.
+
+    Attributes:
+        model (type): The model the body was validated against.
+        errors (list): One dict per problem, with the `loc`, `msg`, `type` and `input` of pydantic.
+    """
+
+    def __init__(self, model, errors):
+        self.model = model
+        self.errors = errors
+        lines = [f"{len(errors)} validation error(s) for {getattr(model, '__name__', model)}"]
+        for error in errors:
+            location = ".".join(str(part) for part in error["loc"]) or "<body>"
+            lines.append(f"  {location}: {error['msg']} [type={error['type']}, input={error.get('input')!r:.80}]")
+        super().__init__("\n".join(lines))
+
+
+@functools.lru_cache(maxsize=None)
+def validator(model):
+    """Return the compiled validator of `model`, built once per model and cached."""
+    return TypeAdapter(model)
+
+
+def orjson_available():
+    return importlib.util.find_spec("orjson") is not None
+
+
+def decode(response, model=PetResponse, backend=DEFAULT_BACKEND):
+    """
+    Validate a response body straight into `model`.
+
+    The default backend hands the raw bytes to pydantic-core, which parses and validates them
+    in one pass without building intermediate Python dicts. The "orjson" backend parses with
+    orjson first, for when that measures faster (see the decode_pet_* benchmarks of benchSuite.py).
+
+    Args:
+        response (httpx.Response or bytes): The response, or its raw body.
+        model (type): The model, or any type pydantic can validate such as `List[PetResponse]`.
+        backend (str): "pydantic" or "orjson".
+
+    Returns:
+        The validated model instance.
+
+    Raises:
+        ResponseValidationError: If the body is not JSON or does not match `model`.
+    """
+    content = getattr(response, "content", response)
+    adapter = validator(model)
+    try:
+        if backend == "orjson":
+            import orjson
+            try:
+                data = orjson.loads(content)
+            except orjson.JSONDecodeError as error:
+                raise ResponseValidationError(model, [
+                    {"loc": (), "msg": f"Invalid JSON: {error}", "type": "json_invalid", "input": content[:80]}
+                ])
+            return adapter.validate_python(data)
+        return adapter.validate_json(content)
+    except ValidationError as error:
+        raise ResponseValidationError(model, error.errors(include_url=False))
+
+
+def decode_pet(response, backend=DEFAULT_BACKEND):
+    """Validate a response body into a `PetResponse`, see `decode`."""
+    return decode(response, PetResponse, backend)
+
+
+def decode_order(response, backend=DEFAULT_BACKEND):
+    """Validate a response body into an `OrderResponse`, see `decode`."""
+    return decode(response, OrderResponse, backend)
+
+
+def decode_user(response, backend=DEFAULT_BACKEND):
+    """Validate a response body into a `UserResponse`, see `decode`."""
+    return decode(response, UserResponse, backend)
+
+
+_STRUCTURAL = re.compile(rb'[\[\]{},"]')
+_STRING_END = re.compile(rb'["\\]')
+
+
+class JsonArraySplitter:
+    """
+    Incremental splitter of a JSON array into the raw bytes of its elements.
+
+    Bytes are fed in arbitrary chunks; complete top level elements are returned as soon as
+    their closing byte arrives, so only the element being received is ever buffered. The
+    scanner jumps between structural characters with regular expressions rather than
+    walking the input byte by byte.
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.started = False
+        self.finished = False
+        self.element = bytearray()
+
+    def feed(self, chunk):
+        """Consume `chunk` and return the list of elements it completed."""
+        elements = []
+        position = 0
+        size = len(chunk)
+        while position < size and not self.finished:
+            if self.in_string:
+                if self.escaped:
+                    self.element += chunk[position:position + 1]
+                    self.escaped = False
+                    position += 1
+                    continue
+                found = _STRING_END.search(chunk, position)
+                if found is None:
+                    self.element += chunk[position:]
+                    return elements
+                end = found.end()
+                self.element += chunk[position:end]
+                position = end
+                if found.group() == b"\\":
+                    self.escaped = True
+                else:
+                    self.in_string = False
+                continue
+            found = _STRUCTURAL.search(chunk, position)
+            if found is None:
+                if self.started:
+                    self.element += chunk[position:]
+                return elements
+            start = found.start()
+            token = chunk[start:start + 1]
+            skipped = chunk[position:start]
+            position = start + 1
+            if not self.started:
+                if token != b"[" or skipped.strip():
+                    raise ValueError("response body is not a JSON array")
+                self.started = True
+                continue
+            self.element += skipped
+            if token == b'"':
+                self.in_string = True
+                self.element += token
+            elif token in b"[{":
+                self.depth += 1
+                self.element += token
+            elif token in b"]}":
+                if self.depth == 0:
+                    self.finished = True
+                    if self.element.strip():
+                        elements.append(bytes(self.element))
+                        self.element.clear()
+                    continue
+                self.depth -= 1
+                self.element += token
+            elif token == b"," and self.depth == 0:
+                if self.element.strip():
+                    elements.append(bytes(self.element))
+                self.element.clear()
+            else:
+                self.element += token
+        return elements
+
+    def close(self):
+        if not self.finished:
+            raise ValueError("response body ended before the JSON array was closed")
+
+
+class ListStats:
+    """
+    Aggregates of a validated list response.
+
+    Attributes:
+        count (int): Items seen, valid or not.
+        invalid (int): Items that failed validation.
+        by_status (dict): Valid items per `status` value.
+        errors (list): `(index, ResponseValidationError)` of the first `max_errors` invalid items.
+    """
+
+    def __init__(self, max_errors=20):
+        self.count = 0
+        self.invalid = 0
+        self.by_status = {}
+        self.errors = []
+        self.max_errors = max_errors
+
+    def add(self, index, item=None, error=None):
+        self.count += 1
+        if error is not None:
+            self.invalid += 1
+            if len(self.errors) < self.max_errors:
+                self.errors.append((index, error))
+            return
+        status = getattr(item, "status", None)
+        self.by_status[status] = self.by_status.get(status, 0) + 1
+
+
+async def validate_stream(response, model=PetResponse, max_errors=20, on_item=None):
+    """
+    Validate a JSON array response item by item while it streams in.
+
+    Memory stays constant in the size of the response: each element is validated as soon as
+    it is complete and then dropped, only the aggregates are kept. Use it with a streamed
+    response, `async with client.stream("GET", ...) as response`.
+
+    Args:
+        response (httpx.Response): The streamed, not yet read, response.
+        model (type): The model of one item of the array.
+        max_errors (int): How many item errors to keep in full.
+        on_item (callable or None): Called with `(index, item)` for every valid item.
+
+    Returns:
+        ListStats: The count, invalid count, count per status and the first item errors.
+
+    Raises:
+        ValueError: If the body is not a well-formed JSON array.
+    """
+    adapter = validator(model)
+    splitter = JsonArraySplitter()
+    stats = ListStats(max_errors)
+    async for chunk in response.aiter_bytes():
+        for element in splitter.feed(chunk):
+            index = stats.count
+            try:
+                item = adapter.validate_json(element)
+            except ValidationError as error:
+                stats.add(index, error=ResponseValidationError(model, error.errors(include_url=False)))
+                continue
+            stats.add(index, item)
+            if on_item is not None:
+                on_item(index, item)
+    splitter.close()
+    return stats
@@ -0,0 +1,318 @@
+"""
+Pet payloads derived from the pet models, for property-based tests.
+
+Valid payloads fill every field of `PetResponse` (and of its nested `Category` and `Tag`)
+from the field's type; invalid ones take a valid payload and apply exactly one mutation: a
+required field left out, a value of the wrong type or a status outside the allowed ones.
+Cases are yielded lazily and case `n` of a seed is always the same payload, so a run of ten
+thousand cases builds one at a time and any failing case can be generated again alone.
+"""
+import functools
+import inspect
+import json
+import random
+import typing
+
+from pydantic import BaseModel
+
+from petModel import PetResponse
+from petStoreServer import PET_STATUSES
+
+# The models describe responses, where every field is set; requests only need the fields the
+# Petstore spec marks as required.
+REQUIRED_FIELDS = {PetResponse: ("name", "photoUrls")}
+FIELD_CHOICES = {(PetResponse, "status"): PET_STATUSES}
+ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 -_'\"\\/éßΩ漢🐶"
+MAX_INT = 2**31 - 1
+MAX_STRING = 16
+MAX_ITEMS = 3
+
+
+class Case:
+    """
+    One generated payload.
+
+    Attributes:
+        index (int): The position of the case in its stream, `generator.case(index, ...)` rebuilds it.
+        payload (dict): The request body.
+        mutation (tuple or None): `(kind, path)` of the mutation making it invalid, None for a valid case.
+    """
+
+    def __init__(self, index, payload, mutation=None):
+        self.index = index
+        self.payload = payload
+        self.mutation = mutation
+
+    @property
+    def valid(self):
+        return self.mutation is None
+
+    def __repr__(self):
+        kind = "valid" if self.valid else f"{self.mutation[0]} {'.'.join(map(str, self.mutation[1]))}"
+        return f"Case({self.index}, {kind}, {json.dumps(self.payload, ensure_ascii=False)})"
+
+
+class PropertyFailure(AssertionError):
+    """A generated case failed; carries the case, its seed and the shrunk payload."""
+
+    def __init__(self, case, seed, minimal, error):
+        self.case = case
+        self.seed = seed
+        self.minimal = minimal
+        self.error = error
+        super().__init__(
+            f"{case!r} of seed {seed} failed: {error}\n"
+            f"minimal payload: {json.dumps(minimal, ensure_ascii=False)}"
+        )
+
+
+def _fields(model):
+    return [(name, field.annotation) for name, field in model.model_fields.items()]
+
+
+def _item_type(annotation):
+    if typing.get_origin(annotation) in (list, typing.List):
+        return typing.get_args(annotation)[0]
+    return None
+
+
+def _is_model(annotation):
+    return inspect.isclass(annotation) and issubclass(annotation, BaseModel)
+
+
+@functools.lru_cache(maxsize=None)
+def _shape(annotation):
+    """Return `("model", fields)`, `("list", item type)` or `(annotation, None)`, computed once per type."""
+    if _is_model(annotation):
+        return "model", tuple(_fields(annotation))
+    item_type = _item_type(annotation)
+    if item_type is not None:
+        return "list", item_type
+    return annotation, None
+
+
+class PayloadGenerator:
+    """
+    Generates valid and invalid payloads of a model.
+
+    Args:
+        model (type): The pydantic model the payloads are derived from.
+        seed (int or str): Makes every case reproducible; the same seed gives the same cases.
+    """
+
+    def __init__(self, model=PetResponse, seed=0):
+        self.model = model
+        self.seed = seed
+        self.mutations = list(self._mutations(model, ()))
+
+    def _random(self, kind, index):
+        return random.Random(f"{self.seed}:{self.model.__name__}:{kind}:{index}")
+
+    def value(self, annotation, rng, owner=None, name=None):
+        """Return a random valid value of `annotation`."""
+        choices = FIELD_CHOICES.get((owner, name))
+        if choices:
+            return rng.choice(choices)
+        kind, detail = _shape(annotation)
+        if kind == "model":
+            return {field: self.value(field_type, rng, annotation, field) for field, field_type in detail}
+        if kind == "list":
+            return [self.value(detail, rng) for _ in range(rng.randint(0, MAX_ITEMS))]
+        if kind is int:
+            return rng.randint(0, MAX_INT)
+        if kind is str:
+            return "".join(rng.choices(ALPHABET, k=rng.randint(0, MAX_STRING)))
+        raise TypeError(f"cannot generate values of {annotation!r}")
+
+    def wrong_value(self, annotation, rng):
+        """Return a random value that is not of `annotation`."""
+        if annotation is str:
+            return rng.randint(0, MAX_INT)
+        if annotation is int:
+            return "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(1, MAX_STRING)))
+        if _is_model(annotation):
+            return rng.choice([rng.randint(0, MAX_INT), "x", [self.value(annotation, rng)]])
+        return rng.choice([rng.randint(0, MAX_INT), "x"])
+
+    def _mutations(self, model, path):
+        required = REQUIRED_FIELDS.get(model, ())
+        for name, annotation in _fields(model):
+            field_path = path + (name,)
+            if name in required:
+                yield "missing", field_path
+            yield "type", field_path
+            if (model, name) in FIELD_CHOICES:
+                yield "choice", field_path
+            item_type = _item_type(annotation)
+            if item_type is not None:
+                yield "type", field_path + (0,)
+                if _is_model(item_type):
+                    yield from self._mutations(item_type, field_path + (0,))
+            elif _is_model(annotation):
+                yield from self._mutations(annotation, field_path)
+
+    def _annotation(self, path):
+        annotation = self.model
+        for step in path:
+            annotation = _item_type(annotation) if isinstance(step, int) else annotation.model_fields[step].annotation
+        return annotation
+
+    def _mutate(self, payload, mutation, rng):
+        kind, path = mutation
+        parent = payload
+        for depth, step in enumerate(path[:-1]):
+            if isinstance(step, int) and not parent:
+                parent.append(self.value(self._annotation(path[:depth + 1]), rng))
+            parent = parent[step]
+        last = path[-1]
+        if isinstance(last, int) and not parent:
+            parent.append(None)
+        if kind == "missing":
+            del parent[last]
+        elif kind == "type":
+            parent[last] = self.wrong_value(self._annotation(path), rng)
+        else:
+            parent[last] = "".join(rng.choices(ALPHABET, k=rng.randint(0, MAX_STRING))) + "?"
+
+    def case(self, index, valid=True):
+        """Return case `index` of the valid or of the invalid stream."""
+        rng = self._random("valid" if valid else "invalid", index)
+        payload = self.value(self.model, rng)
+        if valid:
+            return Case(index, payload)
+        mutation = rng.choice(self.mutations)
+        self._mutate(payload, mutation, rng)
+        return Case(index, payload, mutation)
+
+    def valid_cases(self, count=None):
+        """Yield `count` valid cases, or valid cases forever when `count` is None."""
+        index = 0
+        while count is None or index < count:
+            yield self.case(index)
+            index += 1
+
+    def invalid_cases(self, count=None):
+        """Yield `count` invalid cases, each with one mutation, or invalid cases forever."""
+        index = 0
+        while count is None or index < count:
+            yield self.case(index, valid=False)
+            index += 1
+
+    def conforms(self, payload, model=None):
+        """Return whether `payload` is a valid request body of the model under the generator's rules."""
+        model = model or self.model
+        if not isinstance(payload, dict):
+            return False
+        if any(name not in payload for name in REQUIRED_FIELDS.get(model, ())):
+            return False
+        return all(self._conforms_value(payload[name], annotation, model, name)
+                   for name, annotation in _fields(model) if name in payload)
+
+    def _conforms_value(self, value, annotation, owner=None, name=None):
+        choices = FIELD_CHOICES.get((owner, name))
+        if choices and value not in choices:
+            return False
+        if _is_model(annotation):
+            return self.conforms(value, annotation)
+        item_type = _item_type(annotation)
+        if item_type is not None:
+            return isinstance(value, list) and all(self._conforms_value(item, item_type) for item in value)
+        if annotation is int:
+            return isinstance(value, int) and not isinstance(value, bool)
+        return isinstance(value, annotation)
+
+
+def shrink_candidates(value):
+    """Yield simpler variants of `value`, simplest first."""
+    if isinstance(value, dict):
+        for key in value:
+            yield {name: item for name, item in value.items() if name != key}
+        for key, item in value.items():
+            for smaller in shrink_candidates(item):
+                yield {**value, key: smaller}
+    elif isinstance(value, list):
+        if value:
+            yield []
+        for index in range(len(value)):
+            yield value[:index] + value[index + 1:]
+        for index, item in enumerate(value):
+            for smaller in shrink_candidates(item):
+                yield value[:index] + [smaller] + value[index + 1:]
+    elif isinstance(value, str):
+        if value:
+            yield ""
+        if len(value) > 1:
+            yield value[:len(value) // 2]
+    elif isinstance(value, int) and not isinstance(value, bool):
+        if value:
+            yield 0
+        if abs(value) > 1:
+            yield value // 2
+
+
+async def shrink(payload, fails, max_attempts=500):
+    """
+    Return the simplest variant of `payload` that still fails.
+
+    Candidates are tried greedily: the first simpler one that fails replaces the payload and
+    the search starts again from it, until no candidate fails or `max_attempts` checks are spent.
+
+    Args:
+        payload: The failing payload.
+        fails (callable): Called with a candidate, returns (or resolves to) True if it still fails.
+        max_attempts (int): Upper bound on calls to `fails`.
+    """
+    attempts = 0
+    improved = True
+    while improved and attempts < max_attempts:
+        improved = False
+        for candidate in shrink_candidates(payload):
+            attempts += 1
+            result = fails(candidate)
+            if inspect.isawaitable(result):
+                result = await result
+            if result:
+                payload = candidate
+                improved = True
+                break
+            if attempts >= max_attempts:
+                break
+    return payload
+
+
+async def check_property(generator, cases, check, max_attempts=500):
+    """
+    Run `check` on every case, shrinking the first failure to a minimal payload.
+
+    A shrunk candidate only counts as failing while it stays as valid, or as invalid, as the
+    original case, so the minimal payload fails for the same reason.
+
+    Args:
+        generator (PayloadGenerator): The generator the cases come from.
+        cases (iterable): The cases, typically `generator.valid_cases(n)`.
+        check (callable): Async callable taking a `Case`, raises AssertionError on failure.
+        max_attempts (int): Upper bound on checks spent shrinking.
+
+    Returns:
+        int: The number of cases checked.
+
+    Raises:
+        PropertyFailure: For the first failing case.
+    """
+    checked = 0
+    for case in cases:
+        try:
+            await check(case)
+        except AssertionError as error:
+            async def fails(candidate):
+                if generator.conforms(candidate) != case.valid:
+                    return False
+                try:
+                    await check(Case(case.index, candidate, case.mutation))
+                except AssertionError:
+                    return True
+                return False
+
+            raise PropertyFailure(case, generator.seed, await shrink(case.payload, fails, max_attempts), error)
+        checked += 1
+    return checked
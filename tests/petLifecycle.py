@@ -0,0 +1,282 @@
+"""
+Stateful, model-based testing of the pet lifecycle.
+
+Random sequences of POST, PUT, GET and DELETE on `/pet` (and optionally findByStatus) are
+run against a target while a reference model tracks which pets should exist and what they
+hold; every response is checked against the model. A sequence works on a few pet slots so
+operations keep colliding on the same pets, and a failing sequence is shrunk to the fewest
+steps that still fail.
+
+Two drivers run the sequences: `AppDriver` calls `PetStoreApp.handle` directly on a fresh,
+empty store, thousands of sequences a second with no HTTP involved, and `ClientDriver` sends
+them through an httpx client to any target, with fresh pet ids for every run.
+"""
+import random
+
+from petGenerator import PayloadGenerator
+from petModel import PetResponse
+from petStoreServer import BASE_PATH, PET_STATUSES, PetStore, PetStoreApp, Request
+
+OPERATIONS = ("post", "put", "get", "delete")
+ALL_OPERATIONS = OPERATIONS + ("find",)
+PAYLOAD_POOL = 64
+
+
+class Step:
+    """One operation of a sequence on pet slot `slot`; `payload` for post and put, `status` for find."""
+
+    def __init__(self, operation, slot=None, payload=None, status=None):
+        self.operation = operation
+        self.slot = slot
+        self.payload = payload
+        self.status = status
+
+    def __repr__(self):
+        if self.operation == "find":
+            return f"find status={self.status}"
+        if self.payload is None:
+            return f"{self.operation} #{self.slot}"
+        return f"{self.operation} #{self.slot} name={self.payload['name']!r} status={self.payload['status']}"
+
+
+class SequenceFailure(AssertionError):
+    """A sequence got a response the model did not expect; carries the shrunk sequence."""
+
+    def __init__(self, seed, index, steps, minimal, message):
+        self.seed = seed
+        self.index = index
+        self.steps = steps
+        self.minimal = minimal
+        lines = "\n".join(f"  {number}. {step!r}" for number, step in enumerate(minimal, 1))
+        super().__init__(
+            f"sequence {index} of seed {seed} ({len(steps)} steps) failed: {message}\n"
+            f"minimal sequence of {len(minimal)} steps:\n{lines}"
+        )
+
+
+class LifecycleModel:
+    """Reference model: the pets each slot should hold, None for a slot without a pet."""
+
+    def __init__(self):
+        self.pets = {}
+
+    def check(self, step, pet_id, status, body, ids):
+        """
+        Check one response against the model and advance the model.
+
+        Returns:
+            str or None: What was wrong with the response, None if it was the expected one.
+        """
+        current = self.pets.get(step.slot)
+        if step.operation == "post":
+            if current is not None:
+                return _expect_status(status, 405)
+            expected = {**step.payload, "id": pet_id}
+            self.pets[step.slot] = expected
+            return _expect_status(status, 200) or _expect_body(body, expected)
+        if step.operation == "put":
+            if current is None:
+                return _expect_status(status, 404)
+            expected = {**step.payload, "id": pet_id}
+            self.pets[step.slot] = expected
+            return _expect_status(status, 200) or _expect_body(body, expected)
+        if step.operation == "get":
+            if current is None:
+                return _expect_status(status, 404)
+            return _expect_status(status, 200) or _expect_body(body, current)
+        if step.operation == "delete":
+            if current is None:
+                return _expect_status(status, 404)
+            del self.pets[step.slot]
+            return _expect_status(status, 200)
+        problem = _expect_status(status, 200)
+        if problem:
+            return problem
+        ours = {ids[slot]: pet for slot, pet in self.pets.items() if slot in ids}
+        listed = {pet.get("id"): pet for pet in body if pet.get("id") in ids.values()}
+        expected = {pet_id: pet for pet_id, pet in ours.items() if pet["status"] == step.status}
+        if listed != expected:
+            return f"findByStatus {step.status} listed {sorted(listed)}, expected {sorted(expected)}"
+        return None
+
+
+def _expect_status(status, expected):
+    return None if status == expected else f"status {status}, expected {expected}"
+
+
+def _expect_body(body, expected):
+    return None if body == expected else f"body {body}, expected {expected}"
+
+
+class _ParsedRequest(Request):
+    """Request whose JSON body is already parsed, so the direct driver skips encoding it."""
+
+    def __init__(self, method, path, data=None, query=b""):
+        super().__init__(method, path, query)
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class AppDriver:
+    """
+    Runs sequences by calling `PetStoreApp.handle` directly, on a new empty store every run.
+
+    Args:
+        store_factory (callable): Builds the store of a run, an empty `PetStore` by default.
+    """
+
+    def __init__(self, store_factory=None):
+        self.store_factory = store_factory or (lambda: PetStore(seed=False))
+        self.app = None
+        self.ids = {}
+
+    async def reset(self):
+        self.app = PetStoreApp(self.store_factory())
+        self.ids = {}
+
+    def pet_id(self, slot):
+        return self.ids.setdefault(slot, slot + 1)
+
+    async def send(self, method, path, data=None, query=b""):
+        status, body, _ = self.app.handle(_ParsedRequest(method, BASE_PATH + path, data, query))
+        return status, list(body) if path.startswith("/pet/findByStatus") else body
+
+
+class ClientDriver:
+    """
+    Runs sequences through an httpx client; every run uses new pet ids from `ids`.
+
+    Args:
+        client (httpx.AsyncClient): A client for the target, like `default_client`.
+        ids (idAllocator.IdBlock): Where the pet ids of the runs come from.
+    """
+
+    def __init__(self, client, ids):
+        self.client = client
+        self.id_source = ids
+        self.ids = {}
+
+    async def reset(self):
+        self.ids = {}
+
+    def pet_id(self, slot):
+        if slot not in self.ids:
+            self.ids[slot] = self.id_source.next()
+        return self.ids[slot]
+
+    async def send(self, method, path, data=None, query=b""):
+        response = await self.client.request(method, path, json=data, params=query or None)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+
+class LifecycleEngine:
+    """
+    Generates pet lifecycle sequences, runs them on a driver and shrinks the first failure.
+
+    Args:
+        driver (AppDriver or ClientDriver): Where the sequences run.
+        seed (int or str): The same seed generates the same sequences.
+        slots (int): Number of pets a sequence works on; fewer slots mean more collisions.
+        length (int): Steps per sequence.
+        operations (tuple): The operations to draw from, `OPERATIONS` or `ALL_OPERATIONS`.
+    """
+
+    def __init__(self, driver, seed=0, slots=3, length=20, operations=OPERATIONS):
+        self.driver = driver
+        self.seed = seed
+        self.slots = slots
+        self.length = length
+        self.operations = operations
+        # Payloads are drawn from a pool generated once, generating one per step would cost more
+        # than running the step.
+        self.payloads = []
+        for case in PayloadGenerator(PetResponse, seed).valid_cases(PAYLOAD_POOL):
+            del case.payload["id"]
+            self.payloads.append(case.payload)
+
+    def sequence(self, index):
+        """Return sequence `index` of the seed as a list of `Step`."""
+        rng = random.Random(f"{self.seed}:lifecycle:{index}")
+        steps = []
+        for _ in range(self.length):
+            operation = rng.choice(self.operations)
+            if operation == "find":
+                steps.append(Step(operation, status=rng.choice(PET_STATUSES)))
+                continue
+            slot = rng.randrange(self.slots)
+            payload = rng.choice(self.payloads) if operation in ("post", "put") else None
+            steps.append(Step(operation, slot, payload))
+        return steps
+
+    async def run(self, steps):
+        """
+        Run `steps` on a reset driver.
+
+        Returns:
+            tuple or None: `(step number, problem)` of the first unexpected response, None if all matched.
+        """
+        await self.driver.reset()
+        model = LifecycleModel()
+        for number, step in enumerate(steps, 1):
+            pet_id = None if step.slot is None else self.driver.pet_id(step.slot)
+            if step.operation in ("post", "put"):
+                data = {**step.payload, "id": pet_id}
+                status, body = await self.driver.send(step.operation.upper(), "/pet", data)
+            elif step.operation == "find":
+                status, body = await self.driver.send("GET", "/pet/findByStatus", query=f"status={step.status}")
+            else:
+                status, body = await self.driver.send(step.operation.upper(), f"/pet/{pet_id}")
+            problem = model.check(step, pet_id, status, body, self.driver.ids)
+            if problem:
+                return number, f"step {number} {step!r}: {problem}"
+        return None
+
+    async def shrink(self, steps, max_runs=2000):
+        """
+        Return the shortest sequence found that still fails, removing chunks of steps and then
+        single steps while the sequence keeps failing.
+        """
+        runs = 0
+        failure = await self.run(steps)
+        steps = steps[:failure[0]]
+        chunk = max(len(steps) // 2, 1)
+        while chunk >= 1 and runs < max_runs:
+            start = 0
+            removed = False
+            while start < len(steps) and runs < max_runs:
+                candidate = steps[:start] + steps[start + chunk:]
+                runs += 1
+                failure = await self.run(candidate) if candidate else None
+                if failure is not None:
+                    steps = candidate[:failure[0]]
+                    removed = True
+                else:
+                    start += chunk
+            if not removed:
+                chunk //= 2
+        return steps
+
+    async def check(self, count):
+        """
+        Run `count` sequences.
+
+        Returns:
+            int: The number of steps run.
+
+        Raises:
+            SequenceFailure: For the first failing sequence, with its shrunk reproduction.
+        """
+        total = 0
+        for index in range(count):
+            steps = self.sequence(index)
+            failure = await self.run(steps)
+            if failure is not None:
+                minimal = await self.shrink(steps)
+                raise SequenceFailure(self.seed, index, steps, minimal, (await self.run(minimal))[1])
+            total += len(steps)
+        return total
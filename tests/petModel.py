@@ -1,18 +1,50 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Optional
 
+# defer_build: the validators are built on first use rather than at import, so collecting the
+# tests does not pay for them.
 class Category(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     id: int
     name: str
 
 class Tag(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     id: int
     name: str
 
 class PetResponse(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
     id: int
     category: Category
     name: str
     photoUrls: List[str]
     tags: List[Tag]
-    status: str
\ No newline at end of file
+    status: str
+
+
+class OrderResponse(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
+    id: int
+    petId: int
+    quantity: int
+    shipDate: Optional[str] = None
+    status: str
+    complete: bool
+
+
+class UserResponse(BaseModel):
+    model_config = ConfigDict(defer_build=True)
+
+    id: int
+    username: str
+    firstName: Optional[str] = None
+    lastName: Optional[str] = None
+    email: Optional[str] = None
+    password: Optional[str] = None
+    phone: Optional[str] = None
+    userStatus: int
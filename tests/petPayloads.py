@@ -0,0 +1,92 @@
+def pet_reference(pet_id=1):
+    """Build the reference pet the get scenarios compare a fetched pet against."""
+    return {
+        "id": pet_id,
+        "category": {
+            "id": 0,
+            "name": ""
+        },
+        "name": "",
+        "photoUrls": [],
+        "tags": [],
+        "status": ""
+    }
+
+
+def pet_payload(pet_id=101, **overrides):
+    """
+    Build the pet body the post, put and delete scenarios send.
+
+    Args:
+        pet_id (int or str): The id of the pet.
+        **overrides: Fields replacing the defaults, e.g. `status="vendido"`.
+
+    Returns:
+        dict: A new pet payload.
+    """
+    payload = {
+        "id": pet_id,
+        "category": {
+            "id": 1,
+            "name": "cat"
+        },
+        "name": "boy",
+        "photoUrls": [
+            "path/to/photo"
+        ],
+        "tags": [
+            {
+                "id": 506,
+                "name": "good"
+            }
+        ],
+        "status": "sold"
+    }
+    payload.update(overrides)
+    return payload
+
+
+def pet_payload_without(field, pet_id=101):
+    """Build a pet payload with `field` left out."""
+    payload = pet_payload(pet_id)
+    del payload[field]
+    return payload
+
+
+def order_payload(order_id=1, pet_id=101, **overrides):
+    """Build the order body the store scenarios place, for `quantity` 2 of pet `pet_id`."""
+    payload = {
+        "id": order_id,
+        "petId": pet_id,
+        "quantity": 2,
+        "shipDate": "2024-01-01T00:00:00.000+0000",
+        "status": "placed",
+        "complete": False
+    }
+    payload.update(overrides)
+    return payload
+
+
+def user_payload(username="user1", user_id=0, **overrides):
+    """Build the user body the user scenarios create, with every optional field filled in."""
+    payload = {
+        "id": user_id,
+        "username": username,
+        "firstName": "first",
+        "lastName": "last",
+        "email": f"{username}@example.com",
+        "password": "secret",
+        "phone": "555-0100",
+        "userStatus": 1
+    }
+    payload.update(overrides)
+    return payload
+
+
+def user_batch(size, prefix="user", ids=None):
+    """
+    Build `size` user bodies with the distinct usernames `<prefix>_0` to `<prefix>_<size - 1>`,
+    and ids drawn from `ids`, such as an `idAllocator.IdBlock`, or 0 to `size - 1` without it.
+    """
+    ids = iter(range(size)) if ids is None else ids
+    return [user_payload(f"{prefix}_{index}", user_id=next(ids)) for index in range(size)]
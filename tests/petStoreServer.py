@@ -0,0 +1,534 @@
+import json
+import re
+import types
+from itertools import islice
+from urllib.parse import parse_qs
+
+BASE_PATH = "/v2"
+PET_STATUSES = ("available", "pending", "sold")
+ORDER_STATUSES = ("placed", "approved", "delivered")
+STREAM_BATCH = 256
+INT64_MAX = 2**63 - 1
+
+
+ROUTES = [
+    ("POST", r"/pet", "add_pet"),
+    ("PUT", r"/pet", "update_pet"),
+    ("GET", r"/pet/findByStatus", "find_pets_by_status"),
+    ("GET", r"/pet/findByTags", "find_pets_by_tags"),
+    ("GET", r"/pet/(?P<petId>[^/]+)", "get_pet"),
+    ("POST", r"/pet/(?P<petId>[^/]+)", "update_pet_with_form"),
+    ("DELETE", r"/pet/(?P<petId>[^/]+)", "delete_pet"),
+    ("POST", r"/pet/(?P<petId>[^/]+)/uploadImage", "upload_image"),
+    ("GET", r"/store/inventory", "get_inventory"),
+    ("POST", r"/store/order", "place_order"),
+    ("GET", r"/store/order/(?P<orderId>[^/]+)", "get_order"),
+    ("DELETE", r"/store/order/(?P<orderId>[^/]+)", "delete_order"),
+    ("POST", r"/user", "create_user"),
+    ("POST", r"/user/createWithArray", "create_users"),
+    ("POST", r"/user/createWithList", "create_users"),
+    ("GET", r"/user/login", "login_user"),
+    ("GET", r"/user/logout", "logout_user"),
+    ("GET", r"/user/(?P<username>[^/]+)", "get_user"),
+    ("PUT", r"/user/(?P<username>[^/]+)", "update_user"),
+    ("DELETE", r"/user/(?P<username>[^/]+)", "delete_user"),
+]
+_ROUTE_TEMPLATES = [
+    (method, re.compile(pattern + "$"), re.sub(r"\(\?P<(\w+)>[^)]*\)", r"{\1}", pattern))
+    for method, pattern, _ in ROUTES
+]
+
+
+def route_template(method, path, base_path=BASE_PATH):
+    """
+    Map a request path to its Petstore route, e.g. ``/v2/pet/101`` to ``/pet/{petId}``.
+
+    Paths outside the API are returned unchanged.
+    """
+    if path.startswith(base_path + "/"):
+        path = path[len(base_path):]
+    path = path.rstrip("/") or "/"
+    for route_method, pattern, template in _ROUTE_TEMPLATES:
+        if route_method == method and pattern.match(path):
+            return template
+    return path
+
+
+class PetStoreError(Exception):
+    """Error raised by a route handler, rendered with the Petstore error body."""
+
+    def __init__(self, status, message, code=None, type="unknown"):
+        super().__init__(message)
+        self.status = status
+        self.code = status if code is None else code
+        self.type = type
+        self.message = message
+
+    def body(self):
+        return {"code": self.code, "type": self.type, "message": self.message}
+
+
+def api_message(message, code=200):
+    """Build the ``{"code","type","message"}`` body the Petstore answers with."""
+    return {"code": code, "type": "unknown", "message": str(message)}
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _path_id(raw):
+    """Parse an id path segment the way the Java Petstore does.
+
+    Non numeric segments answer 404 with the NumberFormatException text, which
+    is what ``test_get_pet_by_id_pet_invalid_input`` asserts on.
+    """
+    try:
+        value = int(raw)
+    except ValueError:
+        raise PetStoreError(404, f'java.lang.NumberFormatException: For input string: "{raw}"')
+    if abs(value) > INT64_MAX:
+        raise PetStoreError(404, f'java.lang.NumberFormatException: For input string: "{raw}"')
+    return value
+
+
+def _strict_path_id(raw):
+    """Parse an id path segment for the routes documented with 400 Invalid ID."""
+    try:
+        return _path_id(raw)
+    except PetStoreError:
+        raise PetStoreError(400, "Invalid ID supplied")
+
+
+def _named_entity(value):
+    return isinstance(value, dict) and _is_int(value.get("id", 0)) and isinstance(value.get("name", ""), str)
+
+
+def validate_pet(data):
+    """Return a normalized pet dict, or raise ``ValueError`` naming the bad field."""
+    if not isinstance(data, dict):
+        raise ValueError("body")
+    if "id" in data and data["id"] is not None and not _is_int(data["id"]):
+        raise ValueError("id")
+    if not isinstance(data.get("name"), str):
+        raise ValueError("name")
+    photo_urls = data.get("photoUrls")
+    if not isinstance(photo_urls, list) or not all(isinstance(url, str) for url in photo_urls):
+        raise ValueError("photoUrls")
+    category = data.get("category", {"id": 0, "name": ""})
+    if not _named_entity(category):
+        raise ValueError("category")
+    tags = data.get("tags", [])
+    if not isinstance(tags, list) or not all(_named_entity(tag) for tag in tags):
+        raise ValueError("tags")
+    status = data.get("status", "available")
+    if status not in PET_STATUSES:
+        raise ValueError("status")
+    return {
+        "id": data.get("id") or 0,
+        "category": {"id": category.get("id", 0), "name": category.get("name", "")},
+        "name": data["name"],
+        "photoUrls": list(photo_urls),
+        "tags": [{"id": tag.get("id", 0), "name": tag.get("name", "")} for tag in tags],
+        "status": status,
+    }
+
+
+def validate_order(data):
+    if not isinstance(data, dict):
+        raise ValueError("body")
+    for field in ("id", "petId", "quantity"):
+        if field in data and not _is_int(data[field]):
+            raise ValueError(field)
+    if "shipDate" in data and not isinstance(data["shipDate"], str):
+        raise ValueError("shipDate")
+    if data.get("status", "placed") not in ORDER_STATUSES:
+        raise ValueError("status")
+    if not isinstance(data.get("complete", False), bool):
+        raise ValueError("complete")
+    return {
+        "id": data.get("id", 0),
+        "petId": data.get("petId", 0),
+        "quantity": data.get("quantity", 0),
+        "shipDate": data.get("shipDate", "1970-01-01T00:00:00.000+0000"),
+        "status": data.get("status", "placed"),
+        "complete": data.get("complete", False),
+    }
+
+
+def validate_user(data):
+    if not isinstance(data, dict):
+        raise ValueError("body")
+    if "id" in data and not _is_int(data["id"]):
+        raise ValueError("id")
+    if not isinstance(data.get("username"), str) or not data["username"]:
+        raise ValueError("username")
+    for field in ("firstName", "lastName", "email", "password", "phone"):
+        if field in data and not isinstance(data[field], str):
+            raise ValueError(field)
+    if "userStatus" in data and not _is_int(data["userStatus"]):
+        raise ValueError("userStatus")
+    user = {"id": data.get("id", 0), "username": data["username"]}
+    for field in ("firstName", "lastName", "email", "password", "phone"):
+        if field in data:
+            user[field] = data[field]
+    user["userStatus"] = data.get("userStatus", 0)
+    return user
+
+
+class PetStore:
+    """In-memory Petstore data with secondary indexes for the list endpoints.
+
+    Pets are kept by id, with a status index backing ``findByStatus`` and
+    ``/store/inventory`` and a tag index backing ``findByTags``, so list
+    queries never scan the whole store.
+    """
+
+    def __init__(self, seed=True):
+        self.pets = {}
+        self.orders = {}
+        self.users = {}
+        self._pets_by_status = {}
+        self._pets_by_tag = {}
+        self._next_id = 9_000_000_000
+        if seed:
+            self.seed()
+
+    def seed(self):
+        """Load the sample pet the public store is usually queried for in the get tests."""
+        self.put_pet({
+            "id": 1,
+            "category": {"id": 1, "name": "dog"},
+            "name": "doggie",
+            "photoUrls": ["string"],
+            "tags": [{"id": 0, "name": "string"}],
+            "status": "available",
+        })
+
+    def reset(self):
+        self.__init__(seed=True)
+
+    def new_id(self):
+        self._next_id += 1
+        return self._next_id
+
+    def put_pet(self, pet):
+        self.delete_pet(pet["id"])
+        self.pets[pet["id"]] = pet
+        self._pets_by_status.setdefault(pet["status"], {})[pet["id"]] = None
+        for tag in pet["tags"]:
+            self._pets_by_tag.setdefault(tag["name"], {})[pet["id"]] = None
+        return pet
+
+    def delete_pet(self, pet_id):
+        pet = self.pets.pop(pet_id, None)
+        if pet is None:
+            return None
+        self._pets_by_status[pet["status"]].pop(pet_id, None)
+        for tag in pet["tags"]:
+            self._pets_by_tag[tag["name"]].pop(pet_id, None)
+        return pet
+
+    def pets_by_status(self, statuses):
+        # Ids are copied up front so pets can change while a response is streaming.
+        for status in statuses:
+            for pet_id in list(self._pets_by_status.get(status, ())):
+                pet = self.pets.get(pet_id)
+                if pet is not None and pet["status"] == status:
+                    yield pet
+
+    def pets_by_tags(self, tags):
+        seen = set()
+        for tag in tags:
+            for pet_id in self._pets_by_tag.get(tag, ()):
+                if pet_id not in seen:
+                    seen.add(pet_id)
+                    yield self.pets[pet_id]
+
+    def inventory(self):
+        return {status: len(ids) for status, ids in self._pets_by_status.items() if ids}
+
+
+class Request:
+    """Minimal request view handed to route handlers."""
+
+    def __init__(self, method, path, query=b"", body=b"", headers=None):
+        self.method = method
+        self.path = path
+        self.query = parse_qs(query.decode("latin-1") if isinstance(query, bytes) else query)
+        self.body = body
+        self.headers = headers or {}
+
+    def json(self):
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            raise PetStoreError(400, "bad input")
+
+    def form(self):
+        return {key: values[-1] for key, values in parse_qs(self.body.decode("utf-8")).items()}
+
+
+def json_array_chunks(items, batch=STREAM_BATCH):
+    """Encode an iterable as a JSON array, `batch` items per chunk."""
+    items = iter(items)
+    separator = b"["
+    while True:
+        chunk = list(islice(items, batch))
+        if not chunk:
+            break
+        yield separator + b",".join(json.dumps(item, separators=(",", ":")).encode() for item in chunk)
+        separator = b","
+    yield b"]" if separator == b"," else b"[]"
+
+
+class PetStoreApp:
+    """ASGI implementation of the Swagger Petstore v2 API.
+
+    The routes answer with the status codes and ``{"code","type","message"}``
+    bodies of petstore.swagger.io, validating payloads against the published
+    schema. ``handle`` is the synchronous core and can be driven directly
+    without any HTTP machinery.
+
+    Args:
+        store (PetStore): The backing store, a freshly seeded one by default.
+        base_path (str): The path prefix the API is mounted under.
+    """
+
+    def __init__(self, store=None, base_path=BASE_PATH):
+        self.store = PetStore() if store is None else store
+        self.base_path = base_path.rstrip("/")
+        self._compiled = [(method, re.compile(pattern + "$"), getattr(self, name)) for method, pattern, name in ROUTES]
+
+    def match(self, method, path):
+        """Return ``(handler, path_params)`` for a request, raising ``PetStoreError`` when unrouted."""
+        if not path.startswith(self.base_path + "/"):
+            raise PetStoreError(404, "not found")
+        path = path[len(self.base_path):].rstrip("/") or "/"
+        allowed = False
+        for route_method, pattern, handler in self._compiled:
+            found = pattern.match(path)
+            if found is None:
+                continue
+            if route_method == method:
+                return handler, found.groupdict()
+            allowed = True
+        if allowed:
+            raise PetStoreError(405, "method not allowed")
+        raise PetStoreError(404, "not found")
+
+    def handle(self, request):
+        """
+        Dispatch a ``Request`` and return ``(status, body, headers)``.
+
+        List endpoints return their body as a generator of items, which ``__call__`` streams
+        as a chunked JSON array.
+        """
+        try:
+            handler, params = self.match(request.method, request.path)
+            result = handler(request, **params)
+        except PetStoreError as error:
+            return error.status, error.body(), {}
+        if isinstance(result, tuple):
+            return 200, result[0], result[1]
+        return 200, result, {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while (await receive())["type"] != "lifespan.shutdown":
+                pass
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+        # Streamed request bodies arrive in many messages; joining them into a bytes object one
+        # at a time would copy the body so far on every message.
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+        body = bytes(body)
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        request = Request(scope["method"], scope["path"], scope.get("query_string", b""), body, headers)
+        status, payload, extra_headers = self.handle(request)
+        response_headers = [(b"content-type", b"application/json")]
+        response_headers += [(key.encode(), str(value).encode()) for key, value in extra_headers.items()]
+        if isinstance(payload, types.GeneratorType):
+            await send({"type": "http.response.start", "status": status, "headers": response_headers})
+            for chunk in json_array_chunks(payload):
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        content = json.dumps(payload, separators=(",", ":")).encode()
+        response_headers.append((b"content-length", str(len(content)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": response_headers})
+        await send({"type": "http.response.body", "body": content})
+
+    # pet
+
+    def add_pet(self, request):
+        try:
+            pet = validate_pet(request.json())
+        except ValueError:
+            raise PetStoreError(405, "Invalid input")
+        if pet["id"] <= 0:
+            pet["id"] = self.store.new_id()
+        elif pet["id"] in self.store.pets:
+            raise PetStoreError(405, "Invalid input")
+        return self.store.put_pet(pet)
+
+    def update_pet(self, request):
+        data = request.json()
+        if not isinstance(data, dict) or not _is_int(data.get("id")) or data["id"] <= 0:
+            raise PetStoreError(400, "Invalid ID supplied")
+        try:
+            pet = validate_pet(data)
+        except ValueError:
+            raise PetStoreError(405, "Validation exception")
+        if pet["id"] not in self.store.pets:
+            raise PetStoreError(404, "Pet not found", code=1, type="error")
+        return self.store.put_pet(pet)
+
+    def find_pets_by_status(self, request):
+        statuses = [status for value in request.query.get("status", []) for status in value.split(",")]
+        if not statuses or any(status not in PET_STATUSES for status in statuses):
+            raise PetStoreError(400, "Invalid status value")
+        return self.store.pets_by_status(statuses)
+
+    def find_pets_by_tags(self, request):
+        tags = [tag for value in request.query.get("tags", []) for tag in value.split(",")]
+        if not tags:
+            raise PetStoreError(400, "Invalid tag value")
+        return list(self.store.pets_by_tags(tags))
+
+    def get_pet(self, request, petId):
+        pet = self.store.pets.get(_path_id(petId))
+        if pet is None:
+            raise PetStoreError(404, "Pet not found", code=1, type="error")
+        return pet
+
+    def update_pet_with_form(self, request, petId):
+        pet = self.store.pets.get(_path_id(petId))
+        if pet is None:
+            raise PetStoreError(404, "Pet not found", code=1, type="error")
+        form = request.form()
+        if form.get("status", pet["status"]) not in PET_STATUSES:
+            raise PetStoreError(405, "Invalid input")
+        self.store.put_pet(dict(pet, name=form.get("name", pet["name"]), status=form.get("status", pet["status"])))
+        return api_message(pet["id"])
+
+    def delete_pet(self, request, petId):
+        pet_id = _strict_path_id(petId)
+        if self.store.delete_pet(pet_id) is None:
+            raise PetStoreError(404, "Pet not found", code=1, type="error")
+        return api_message(pet_id)
+
+    def upload_image(self, request, petId):
+        pet_id = _path_id(petId)
+        if pet_id not in self.store.pets:
+            raise PetStoreError(404, "Pet not found", code=1, type="error")
+        fields = parse_multipart(request.headers.get("content-type", ""), request.body)
+        if "file" not in fields:
+            raise PetStoreError(400, "bad input")
+        filename, content = fields["file"]
+        metadata = fields.get("additionalMetadata", (None, b""))[1].decode("utf-8", "replace")
+        return api_message(f"additionalMetadata: {metadata}\nFile uploaded to ./{filename}, {len(content)} bytes")
+
+    # store
+
+    def get_inventory(self, request):
+        return self.store.inventory()
+
+    def place_order(self, request):
+        try:
+            order = validate_order(request.json())
+        except ValueError:
+            raise PetStoreError(400, "Invalid Order")
+        if order["id"] <= 0:
+            order["id"] = self.store.new_id()
+        self.store.orders[order["id"]] = order
+        return order
+
+    def get_order(self, request, orderId):
+        order = self.store.orders.get(_strict_path_id(orderId))
+        if order is None:
+            raise PetStoreError(404, "Order not found", code=1, type="error")
+        return order
+
+    def delete_order(self, request, orderId):
+        order_id = _strict_path_id(orderId)
+        if self.store.orders.pop(order_id, None) is None:
+            raise PetStoreError(404, "Order Not Found", code=404)
+        return api_message(order_id)
+
+    # user
+
+    def create_user(self, request):
+        try:
+            user = validate_user(request.json())
+        except ValueError:
+            raise PetStoreError(400, "bad input")
+        self.store.users[user["username"]] = user
+        return api_message(user["id"])
+
+    def create_users(self, request):
+        data = request.json()
+        if not isinstance(data, list):
+            raise PetStoreError(400, "bad input")
+        try:
+            users = [validate_user(item) for item in data]
+        except ValueError:
+            raise PetStoreError(400, "bad input")
+        for user in users:
+            self.store.users[user["username"]] = user
+        return api_message("ok")
+
+    def login_user(self, request):
+        username = request.query.get("username", [""])[-1]
+        password = request.query.get("password", [""])[-1]
+        if not username or not password:
+            raise PetStoreError(400, "Invalid username/password supplied")
+        return api_message("logged in user session:1"), {"X-Rate-Limit": 5000, "X-Expires-After": "Thu Jan 01 01:00:00 UTC 2099"}
+
+    def logout_user(self, request):
+        return api_message("ok")
+
+    def get_user(self, request, username):
+        user = self.store.users.get(username)
+        if user is None:
+            raise PetStoreError(404, "User not found", code=1, type="error")
+        return user
+
+    def update_user(self, request, username):
+        if username not in self.store.users:
+            raise PetStoreError(404, "User not found", code=1, type="error")
+        try:
+            user = validate_user(request.json())
+        except ValueError:
+            raise PetStoreError(400, "Invalid user supplied")
+        del self.store.users[username]
+        self.store.users[user["username"]] = user
+        return api_message(user["id"])
+
+    def delete_user(self, request, username):
+        if self.store.users.pop(username, None) is None:
+            raise PetStoreError(404, "User not found", code=1, type="error")
+        return api_message(username)
+
+
+def parse_multipart(content_type, body):
+    """Split a ``multipart/form-data`` body into ``{name: (filename, content)}``."""
+    found = re.search(r'boundary="?([^";]+)"?', content_type)
+    if found is None:
+        return {}
+    fields = {}
+    for part in body.split(b"--" + found.group(1).encode())[1:-1]:
+        # Only the line break after the boundary and the one before the next belong to the
+        # framing; the content itself may start or end with CR or LF bytes.
+        head, _, content = part.removeprefix(b"\r\n").removesuffix(b"\r\n").partition(b"\r\n\r\n")
+        disposition = head.decode("latin-1")
+        name = re.search(r'name="([^"]*)"', disposition)
+        filename = re.search(r'filename="([^"]*)"', disposition)
+        if name is not None:
+            fields[name.group(1)] = (filename.group(1) if filename else None, content)
+    return fields
@@ -0,0 +1,190 @@
+"""
+Function fixtures of the Petstore tests, registered once for the whole suite as a pytest plugin
+through `pytest_plugins` in conftest.py; test modules use them without importing anything.
+
+httpx, the client pool and the pydantic models are only imported by the fixtures that need them,
+so loading the plugin costs nothing for tests that never touch them.
+"""
+import pytest
+
+from petPayloads import order_payload, pet_payload, pet_payload_without, pet_reference, user_batch, user_payload
+
+
+"""
+Fixture to provide a default HTTP client for testing.
+
+This fixture creates an instance of `httpx.AsyncClient` against the configured Petstore target,
+`BASE_URL` by default or the in-process stand-in when `--petstore-target=local` is given.
+The client is built on the session-wide `petstore_transport`, so it reuses pooled connections
+while keeping its own headers and cookies, and the timing of every request it sends is recorded.
+Every request carries the bearer token of `petstore_auth`.
+It is closed after the test completes, leaving the shared pool open.
+
+Yields:
+    httpx.AsyncClient: An asynchronous HTTP client configured with the base URL.
+"""
+@pytest.fixture
+async def default_client(request, petstore_transport, client_event_hooks, petstore_auth):
+    import httpx
+    from clientPool import petstore_base_url
+
+    base_url = petstore_base_url(request.config.getoption("petstore_target"))
+    async with httpx.AsyncClient(base_url=base_url, transport=petstore_transport, event_hooks=client_event_hooks,
+                                 auth=petstore_auth) as client:
+        yield client
+
+@pytest.fixture
+def fake_jwt_token(petstore_auth):
+    """Fixture to provide the fake JWT token the test's clients send, from the session's token cache."""
+    return petstore_auth.token
+
+"""
+Fixture to provide the fault profile of a test on the socket-served Petstore stand-in.
+
+Every `@pytest.mark.faults(...)` marker of the test, its class and module adds one fault rule,
+with the keyword arguments of `faultServer.FaultRule`; more can be added with `faults.add(...)`.
+The decisions are seeded with the test node id, so a test sees the same faults on every run.
+The server answers without faults again once the test is done.
+
+Yields:
+    faultServer.FaultProfile: The profile installed on `petstore_server` for the test.
+"""
+@pytest.fixture
+def faults(request, petstore_server):
+    import zlib
+    from faultServer import FaultProfile
+
+    profile = FaultProfile(seed=zlib.crc32(request.node.nodeid.encode()))
+    for marker in reversed(list(request.node.iter_markers("faults"))):
+        profile.add(**marker.kwargs)
+    petstore_server.profile = profile
+    yield profile
+    petstore_server.profile = FaultProfile()
+
+"""
+Fixture to provide the compiled response validators of the contract cases, cached on disk.
+
+Returns:
+    contractSpec.ValidatorCache: The cache under `.contract_cache/` of the rootdir.
+"""
+@pytest.fixture
+def contract_cache(request):
+    return request.config.pluginmanager.get_plugin("petstore-contract").cache
+
+"""
+Fixture to provide an image file of --upload-size bytes for the upload tests, written to the
+test's temporary directory.
+
+Returns:
+    pathlib.Path: The path of the file.
+"""
+@pytest.fixture
+def image_file(tmp_path, pytestconfig):
+    from imageUpload import parse_size, write_image
+
+    return write_image(tmp_path / "image.png", parse_size(pytestconfig.getoption("upload_size")))
+
+"""
+Fixture to provide the pet ids of a test.
+
+Each test draws from its own block of ids, disjoint from every other test and worker, and
+every id handed out is tracked by the allocator.
+
+Returns:
+    idAllocator.IdBlock: The id source of the test, `pet_ids.next()` gives a fresh id.
+"""
+@pytest.fixture
+def pet_ids(request, id_allocator):
+    return id_allocator.ids_for(request.node.nodeid)
+
+"""
+Fixture to provide the id of the pet a test creates.
+"""
+@pytest.fixture
+def pet_id(pet_ids):
+    return pet_ids.next()
+
+"""
+Fixture to provide the generator of valid and invalid pet payloads for property-based tests.
+
+The generator is seeded with --payload-seed, so a run gives the same cases every time.
+
+Returns:
+    petGenerator.PayloadGenerator: The pet payload generator of the run.
+"""
+@pytest.fixture
+def pet_payload_generator(pytestconfig):
+    from petGenerator import PayloadGenerator
+
+    return PayloadGenerator(seed=pytestconfig.getoption("payload_seed"))
+
+"""
+Fixture to define pet data values for get test validations
+"""
+@pytest.fixture
+async def mock_get_pet():
+    return pet_reference()
+
+"""
+Fixture to define pet data values for post test validations
+"""
+@pytest.fixture
+async def mock_post_pet(pet_id):
+    return pet_payload(pet_id)
+
+"""
+Fixture to define pet data values for post test validations without the mandatory field name
+"""
+@pytest.fixture
+async def mock_post_pet_no_name(pet_id):
+    return pet_payload_without("name", pet_id)
+
+"""
+Fixture to define pet data values for post test validations with invalid status 
+"""
+@pytest.fixture
+async def mock_post_pet_invalid_status(pet_id):
+    return pet_payload(pet_id, status="vendido")
+
+"""
+Fixture to define pet data values for post test validations with id as a string
+"""
+@pytest.fixture
+async def mock_post_pet_string_id(pet_id):
+    return pet_payload(str(pet_id))
+
+"""
+Fixture to define pet data values for post test validations with name as integer
+"""
+@pytest.fixture
+async def mock_post_pet_name_int(pet_id):
+    return pet_payload(str(pet_id), name=13)
+
+"""
+Fixture to define order data values for store test validations, for an order id and a pet id
+of the test's own
+"""
+@pytest.fixture
+async def mock_order(pet_ids):
+    return order_payload(pet_ids.next(), pet_ids.next())
+
+"""
+Fixture to define user data values for user test validations, with an id and username of the test's own
+"""
+@pytest.fixture
+async def mock_user(pet_ids):
+    user_id = pet_ids.next()
+    return user_payload(f"user_{user_id}", user_id)
+
+"""
+Fixture to build batches of users for the bulk user endpoints.
+
+Every batch gets usernames of its own, so the batches of a test never overwrite each other, and
+its users get ids from the test's block, as the pets and orders do.
+
+Returns:
+    callable: `mock_user_batch(size)` gives a list of `size` user payloads.
+"""
+@pytest.fixture
+def mock_user_batch(pet_ids):
+    return lambda size: user_batch(size, prefix=f"user_{pet_ids.next()}", ids=pet_ids)
@@ -0,0 +1,227 @@
+import json
+import math
+import time
+
+import httpx
+
+from petStoreServer import route_template
+
+PHASES = ("dns_ms", "connect_ms", "tls_ms", "ttfb_ms", "total_ms")
+
+
+def percentile(sorted_values, percent):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(percent / 100 * len(sorted_values)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class RequestTiming:
+    """
+    Phase timings of one request, filled from httpcore trace events and httpx event hooks.
+
+    httpcore resolves the host inside `connect_tcp`, so `dns_ms` is reported as part of
+    `connect_ms` and left as None. Connection phases are None when a pooled connection was
+    reused or the request was served in-process.
+    """
+
+    def __init__(self, nodeid, markers, method, url):
+        self.nodeid = nodeid
+        self.markers = markers
+        self.method = method
+        self.route = route_template(method, url.path)
+        self.url = str(url)
+        self.status = None
+        self.started = time.perf_counter()
+        self.marks = {}
+        self.dns_ms = None
+        self.connect_ms = None
+        self.tls_ms = None
+        self.ttfb_ms = None
+        self.total_ms = None
+
+    async def trace(self, event_name, info):
+        self.marks[event_name] = time.perf_counter()
+
+    def _span(self, name):
+        started = self.marks.get(f"{name}.started")
+        completed = self.marks.get(f"{name}.complete")
+        if started is None or completed is None:
+            return None
+        return (completed - started) * 1000
+
+    def headers_received(self, status):
+        self.status = status
+        self.connect_ms = self._span("connection.connect_tcp")
+        self.tls_ms = self._span("connection.start_tls")
+        headers_at = (
+            self.marks.get("http11.receive_response_headers.complete")
+            or self.marks.get("http2.receive_response_headers.complete")
+            or time.perf_counter()
+        )
+        self.ttfb_ms = (headers_at - self.started) * 1000
+
+    def body_received(self):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+
+    def as_dict(self):
+        return {
+            "nodeid": self.nodeid,
+            "markers": self.markers,
+            "method": self.method,
+            "route": self.route,
+            "url": self.url,
+            "status": self.status,
+            **{phase: getattr(self, phase) for phase in PHASES},
+        }
+
+    def describe(self):
+        return f"{self.method} {self.route} {self.status} ttfb {self.ttfb_ms:.1f}ms total {self.total_ms:.1f}ms"
+
+
+class TimedStream(httpx.AsyncByteStream):
+    """
+    Response stream calling `on_done` once the body has been read or the response closed.
+
+    Timing the body this way leaves streamed responses streaming, where reading the body in
+    the response hook would load it whole into memory.
+    """
+
+    def __init__(self, stream, on_done):
+        self.stream = stream
+        self.on_done = on_done
+
+    def _done(self):
+        if self.on_done is not None:
+            self.on_done()
+            self.on_done = None
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            yield chunk
+        self._done()
+
+    async def aclose(self):
+        await self.stream.aclose()
+        self._done()
+
+
+class TimingLog:
+    """
+    Per-request timings of a test session and the latency budgets they are checked against.
+
+    Budgets come from the `latency_budget(p95_ms=...)` marker on a test, checked against
+    the p95 of that test's requests, and from the `latency_budgets` ini setting
+    (`<marker> = <p95 ms>` lines), checked against the p95 of every request made by tests
+    carrying that marker.
+    """
+
+    def __init__(self, marker_budgets=None):
+        self.records = []
+        self.by_test = {}
+        self.test_budgets = {}
+        self.marker_budgets = dict(marker_budgets or {})
+
+    def event_hooks(self, nodeid, markers):
+        """Return httpx event hooks recording every request of the test `nodeid`."""
+
+        async def on_request(request):
+            timing = RequestTiming(nodeid, markers, request.method, request.url)
+            request.extensions["request_timing"] = timing
+            request.extensions["trace"] = timing.trace
+
+        async def on_response(response):
+            timing = response.request.extensions["request_timing"]
+            timing.headers_received(response.status_code)
+
+            def body_received():
+                timing.body_received()
+                self.records.append(timing)
+                self.by_test.setdefault(nodeid, []).append(timing)
+
+            response.stream = TimedStream(response.stream, body_received)
+
+        return {"request": [on_request], "response": [on_response]}
+
+    def for_test(self, nodeid):
+        # Indexed by test: it is looked up after every test, scanning all records would be quadratic.
+        return list(self.by_test.get(nodeid, ()))
+
+    @staticmethod
+    def p95(timings):
+        return percentile(sorted(timing.total_ms for timing in timings), 95)
+
+    def budget_violations(self):
+        """Return a line for every budget whose measured p95 is over it."""
+        violations = []
+        for nodeid, budget in self.test_budgets.items():
+            timings = self.for_test(nodeid)
+            if timings and self.p95(timings) > budget:
+                violations.append(f"{nodeid}: p95 {self.p95(timings):.1f}ms over budget {budget:g}ms")
+        for marker, budget in self.marker_budgets.items():
+            timings = [timing for timing in self.records if marker in timing.markers]
+            if timings and self.p95(timings) > budget:
+                violations.append(f"@{marker} requests: p95 {self.p95(timings):.1f}ms over budget {budget:g}ms")
+        return violations
+
+    def endpoint_summary(self):
+        grouped = {}
+        for timing in self.records:
+            grouped.setdefault((timing.method, timing.route), []).append(timing.total_ms)
+        rows = []
+        for (method, route), totals in sorted(grouped.items()):
+            totals.sort()
+            rows.append(f"{method} {route}: {len(totals)} requests, "
+                        f"p50 {percentile(totals, 50):.1f}ms p95 {percentile(totals, 95):.1f}ms")
+        return rows
+
+    def write_json(self, path):
+        with open(path, "w") as file:
+            json.dump({
+                "requests": [timing.as_dict() for timing in self.records],
+                "budgets": {"tests": self.test_budgets, "markers": self.marker_budgets},
+                "violations": self.budget_violations(),
+            }, file, indent=2)
+
+
+def marker_budget(marker):
+    """
+    Return the p95 budget in ms of a `latency_budget` marker, given as `p95_ms=` or positionally.
+
+    Raises:
+        ValueError: If the marker has no budget, more than one, or one that is not a number.
+    """
+    values = list(marker.args) + ([marker.kwargs["p95_ms"]] if "p95_ms" in marker.kwargs else [])
+    if len(values) != 1 or set(marker.kwargs) - {"p95_ms"}:
+        raise ValueError(f"latency_budget takes one p95 budget in ms, e.g. latency_budget(p95_ms=500), "
+                         f"got args {marker.args} kwargs {marker.kwargs}")
+    try:
+        return float(values[0])
+    except (TypeError, ValueError):
+        raise ValueError(f"latency_budget p95_ms must be a number of ms, got {values[0]!r}") from None
+
+
+def parse_marker_budgets(lines):
+    """Parse `latency_budgets` ini lines such as `get = 500` into `{"get": 500.0}`."""
+    budgets = {}
+    for line in lines:
+        marker, _, budget = line.partition("=")
+        if marker.strip():
+            budgets[marker.strip()] = float(budget)
+    return budgets
+
+
+def annotate_html_report(timings):
+    """
+    Add the request timings of the finishing test to its pytest-html-reporter row.
+
+    pytest-html-reporter builds the row from its module level message when the test is torn
+    down, so the timings are appended there before its own teardown hook runs.
+    """
+    try:
+        from pytest_html_reporter import plugin
+    except ImportError:
+        return
+    lines = [timing.describe() for timing in timings]
+    plugin._current_error = "\n".join(filter(None, [plugin._current_error.rstrip("\n")] + lines))
@@ -0,0 +1,228 @@
+"""
+Transport layer keeping a flaky or overloaded target from failing the run test by test.
+
+`ResilientTransport` sits under the session's shared transport and, for every request:
+
+- waits for a token of the `TokenBucket` shared by all concurrent tests, if rate limited;
+- fails at once with `TargetUnhealthy` while the `CircuitBreaker` is open;
+- retries connection errors and 429/5xx answers with backoff, idempotent methods only (a POST
+  is only retried when it was surely not processed: connect errors and 429), waiting what a
+  `Retry-After` header asks for.
+"""
+import asyncio
+import email.utils
+import time
+
+import httpx
+
+from waitUntil import Backoff
+
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Errors raised before the request reached the target, safe to retry for any method.
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+RETRY_ERRORS = (httpx.TransportError,)
+
+
+class TargetUnhealthy(httpx.TransportError):
+    """Raised without sending the request while the circuit breaker is open."""
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every client of the session: `rate` requests a second on average,
+    bursts of up to `burst`.
+    """
+
+    def __init__(self, rate, burst=10):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Take a token, waiting for one if needed, and return the seconds waited."""
+        async with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            wait = -self.tokens / self.rate
+            await asyncio.sleep(wait)
+            return wait
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive failed requests, then fails every request at once for
+    `cooldown` seconds. The first request after the cooldown goes through as a probe: its
+    success closes the breaker, a failure opens it again.
+    """
+
+    def __init__(self, threshold=5, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.trips = 0
+        self.last_error = None
+
+    @property
+    def open(self):
+        return self.opened_at is not None
+
+    def check(self, request):
+        """Let `request` through, or raise `TargetUnhealthy`; return whether it goes as the probe."""
+        if self.opened_at is None:
+            return False
+        if time.monotonic() - self.opened_at >= self.cooldown and not self.probing:
+            self.probing = True
+            return True
+        raise TargetUnhealthy(
+            f"target unhealthy: {self.failures} consecutive failures, last {self.last_error}; "
+            f"failing fast for {self.cooldown:g}s", request=request,
+        )
+
+    def record(self, failure=None):
+        if failure is None:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+            return
+        self.failures += 1
+        self.last_error = failure
+        if self.probing or (self.opened_at is None and self.failures >= self.threshold):
+            self.trips += 1
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+
+class ResilienceStats:
+    """Retries per reason, time spent throttled and requests failed fast, for the session summary."""
+
+    def __init__(self):
+        self.retries = {}
+        self.throttled = 0.0
+        self.failed_fast = 0
+        self.breaker = None
+
+    def retried(self, reason):
+        self.retries[reason] = self.retries.get(reason, 0) + 1
+
+    def summary(self):
+        retries = sum(self.retries.values())
+        reasons = ", ".join(f"{count} {reason}" for reason, count in sorted(self.retries.items()))
+        trips = self.breaker.trips if self.breaker is not None else 0
+        return (f"{retries} retries" + (f" ({reasons})" if reasons else "")
+                + f", throttled {self.throttled:.2f}s, circuit breaker tripped {trips} times, "
+                f"{self.failed_fast} requests failed fast")
+
+    @property
+    def eventful(self):
+        return bool(self.retries or self.throttled or self.failed_fast)
+
+
+def retry_after(response, now=None):
+    """Return the seconds a `Retry-After` header asks to wait, or None without a usable one."""
+    value = response.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(moment.timestamp() - (time.time() if now is None else now), 0.0)
+
+
+class ResilientTransport(httpx.AsyncBaseTransport):
+    """
+    Retrying, rate limited, circuit broken transport, see the module docstring.
+
+    Args:
+        transport (httpx.AsyncBaseTransport): The transport to the target.
+        retries (int): Retries per request on top of the first attempt.
+        backoff (Backoff): The delays between attempts without `Retry-After`.
+        bucket (TokenBucket or None): The shared rate limit, None for unlimited.
+        breaker (CircuitBreaker or None): The circuit breaker, None to never fail fast.
+        max_retry_after (float): Longest `Retry-After` honored; a longer one is not retried.
+        stats (ResilienceStats): Where retries, throttling and fast failures are counted.
+    """
+
+    def __init__(self, transport, retries=2, backoff=None, bucket=None, breaker=None, max_retry_after=30.0,
+                 stats=None):
+        self.transport = transport
+        self.retries = retries
+        self.backoff = backoff or Backoff(initial=0.2, maximum=5.0)
+        self.bucket = bucket
+        self.breaker = breaker
+        self.max_retry_after = max_retry_after
+        self.stats = stats or ResilienceStats()
+        self.stats.breaker = breaker
+
+    def _replayable(self, request):
+        return isinstance(request.stream, httpx.ByteStream)
+
+    async def handle_async_request(self, request):
+        attempt = 0
+        while True:
+            probe = False
+            if self.breaker is not None:
+                try:
+                    probe = self.breaker.check(request)
+                except TargetUnhealthy:
+                    self.stats.failed_fast += 1
+                    raise
+            try:
+                if self.bucket is not None:
+                    self.stats.throttled += await self.bucket.acquire()
+                response = await self.transport.handle_async_request(request)
+            except RETRY_ERRORS as error:
+                if self.breaker is not None:
+                    self.breaker.record(type(error).__name__)
+                retryable = isinstance(error, UNSENT_ERRORS) or request.method in IDEMPOTENT_METHODS
+                if attempt >= self.retries or not retryable or not self._replayable(request):
+                    raise
+                self.stats.retried(type(error).__name__)
+                await asyncio.sleep(self.backoff.delay(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                # A probe cancelled or failing outside RETRY_ERRORS is not recorded; the next
+                # request probes instead, rather than the breaker failing fast for good.
+                if probe:
+                    self.breaker.probing = False
+                raise
+
+            status = response.status_code
+            # A 429 says nothing of the target's health: it neither opens nor closes the breaker,
+            # and a probe answered with one leaves the probing to the next request.
+            if self.breaker is not None and status != 429:
+                self.breaker.record(f"status {status}" if status >= 500 else None)
+            elif probe:
+                self.breaker.probing = False
+            retryable = status == 429 or request.method in IDEMPOTENT_METHODS
+            if status not in RETRY_STATUSES or attempt >= self.retries or not retryable \
+                    or not self._replayable(request):
+                return response
+            wait = retry_after(response)
+            if wait is not None and wait > self.max_retry_after:
+                return response
+            await response.aclose()
+            self.stats.retried(f"status {status}")
+            if wait is None:
+                wait = self.backoff.delay(attempt)
+            else:
+                self.stats.throttled += wait
+            await asyncio.sleep(wait)
+            attempt += 1
+
+    async def aclose(self):
+        await self.transport.aclose()
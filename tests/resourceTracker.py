@@ -0,0 +1,122 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+from clientPool import Pacer
+from petStoreServer import route_template
+
+# Route of a successful request to the kind of resource it creates or deletes.
+CREATE_ROUTES = {
+    ("POST", "/pet"): "pet",
+    ("POST", "/store/order"): "order",
+    ("POST", "/user"): "user",
+    ("POST", "/user/createWithArray"): "user",
+    ("POST", "/user/createWithList"): "user",
+}
+DELETE_ROUTES = {
+    ("DELETE", "/pet/{petId}"): "pet",
+    ("DELETE", "/store/order/{orderId}"): "order",
+    ("DELETE", "/user/{username}"): "user",
+}
+DELETE_PATHS = {"pet": "/pet/{}", "order": "/store/order/{}", "user": "/user/{}"}
+# The scope cleanup requests are tagged with, so cassettes record and replay them too.
+CLEANUP_SCOPE = "<cleanup>"
+
+
+class ResourceTracker:
+    """
+    Records the pets, orders and users created during a run and deletes them in one batch.
+
+    Creations are seen through httpx event hooks on the test clients; a resource a test deletes
+    itself is forgotten again. `cleanup` then removes the rest concurrently, at most
+    `concurrency` requests in flight and `rate` started per second, instead of one blocking
+    teardown per test.
+
+    Args:
+        concurrency (int): Maximum number of delete requests in flight.
+        rate (float): Maximum delete requests started per second, 0 for unlimited.
+    """
+
+    def __init__(self, concurrency=8, rate=0):
+        self.concurrency = concurrency
+        self.rate = rate
+        self.resources = {}
+        self.removed = 0
+        self.failures = []
+        self.elapsed = 0.0
+
+    def track(self, kind, key, nodeid):
+        self.resources[(kind, str(key))] = nodeid
+
+    def forget(self, kind, key):
+        self.resources.pop((kind, str(key)), None)
+
+    def event_hooks(self, nodeid):
+        """Return httpx event hooks tracking the resources created by the test `nodeid`."""
+
+        async def on_response(response):
+            if not response.is_success:
+                return
+            request = response.request
+            route = (request.method, route_template(request.method, request.url.path))
+            if route in DELETE_ROUTES:
+                self.forget(DELETE_ROUTES[route], request.url.path.rstrip("/").rsplit("/", 1)[-1])
+            elif route in CREATE_ROUTES:
+                kind = CREATE_ROUTES[route]
+                # A creation whose key cannot be read is left untracked rather than failing the
+                # test from inside the hook.
+                if kind == "user":
+                    # User creation answers with a message, the usernames are in the request.
+                    try:
+                        body = json.loads(request.content)
+                    except (httpx.RequestNotRead, ValueError):
+                        return
+                    for user in body if isinstance(body, list) else [body]:
+                        if isinstance(user, dict) and "username" in user:
+                            self.track(kind, user["username"], nodeid)
+                else:
+                    await response.aread()
+                    try:
+                        key = response.json()["id"]
+                    except (ValueError, KeyError, TypeError):
+                        return
+                    self.track(kind, key, nodeid)
+
+        return {"request": [], "response": [on_response]}
+
+    async def _delete(self, client, semaphore, pacer, kind, key, nodeid):
+        async with semaphore:
+            await pacer.wait()
+            try:
+                response = await client.delete(DELETE_PATHS[kind].format(key),
+                                               extensions={"test_nodeid": CLEANUP_SCOPE})
+            except httpx.HTTPError as error:
+                self.failures.append((kind, key, nodeid, f"{type(error).__name__}: {error}"))
+                return
+        # Already gone is as good as removed.
+        if response.is_success or response.status_code == 404:
+            self.removed += 1
+        else:
+            self.failures.append((kind, key, nodeid, f"status {response.status_code}"))
+
+    async def cleanup(self, client):
+        """
+        Delete every tracked resource through `client`.
+
+        Returns:
+            list: `(kind, key, nodeid, reason)` of every resource that could not be removed.
+        """
+        started = time.perf_counter()
+        resources, self.resources = self.resources, {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pacer = Pacer(self.rate)
+        await asyncio.gather(*(self._delete(client, semaphore, pacer, kind, key, nodeid)
+                               for (kind, key), nodeid in resources.items()))
+        self.elapsed = time.perf_counter() - started
+        return self.failures
+
+    def summary(self):
+        return (f"removed {self.removed} of {self.removed + len(self.failures)} resources created by the tests "
+                f"in {self.elapsed:.2f}s")
@@ -0,0 +1,373 @@
+"""
+Streaming result log: every test result is appended to an NDJSON file as soon as the test
+finishes, with the requests it made, and the JUnit XML and HTML reports are rendered from that
+file as a stream.
+
+Nothing is held in memory until the end of the session, so a run of tens of thousands of cases
+costs the same per result as a run of ten, and a crashed or cancelled run still leaves every
+result written so far. The log starts with a "session" record and ends with a "summary" record;
+a log without the summary is from a run that did not finish and renders as a partial report.
+
+    pytest --result-log results.ndjson
+    python tests/resultLog.py junit results.ndjson -o report.xml
+    python tests/resultLog.py html results.ndjson -o report.html
+"""
+import argparse
+import datetime
+import html
+import json
+import os
+import re
+import sys
+import time
+from xml.sax.saxutils import escape, quoteattr
+
+import pytest
+
+OUTCOMES = ("passed", "failed", "error", "skipped", "xfailed", "xpassed", "interrupted")
+# Characters XML 1.0 does not allow, which tracebacks and captured output may contain anyway.
+_ILLEGAL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]")
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+
+
+class ResultLogWriter:
+    """
+    Appends records to an NDJSON file, one `os.write` per line.
+
+    The file is opened in append mode and never buffered, so every record is on disk as soon
+    as it is written, and records of several processes appending to the same log, such as
+    shard workers, do not interleave within a line.
+
+    Args:
+        path (str): The log file.
+        truncate (bool): Whether to start the log afresh rather than appending to it.
+    """
+
+    def __init__(self, path, truncate=True):
+        flags = os.O_WRONLY | os.O_CREAT | os.O_APPEND | (os.O_TRUNC if truncate else 0)
+        self.fd = os.open(path, flags, 0o644)
+
+    def write(self, record):
+        line = json.dumps(record, separators=(",", ":"), default=str).encode() + b"\n"
+        written = os.write(self.fd, line)
+        while written < len(line):
+            written += os.write(self.fd, line[written:])
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+def _longrepr(report):
+    if isinstance(report.longrepr, tuple):
+        # (path, line, reason) of a skip.
+        return report.longrepr[2]
+    return str(report.longrepr) if report.longrepr else None
+
+
+def outcome_of(phases):
+    """The outcome of a test from the reports of its setup, call and teardown, as pytest counts it."""
+    for when in ("setup", "call", "teardown"):
+        report = phases.get(when)
+        if report is not None and report.failed:
+            return "failed" if when == "call" else "error"
+    call = phases.get("call")
+    for report in (phases.get("setup"), call):
+        if report is not None and report.skipped:
+            return "xfailed" if hasattr(report, "wasxfail") else "skipped"
+    if call is None or "teardown" not in phases:
+        return "interrupted"
+    return "xpassed" if hasattr(call, "wasxfail") else "passed"
+
+
+def session_record(args, worker=None):
+    return {"type": "session", "started": _now(), "worker": worker, "args": list(args),
+            "python": sys.version.split()[0]}
+
+
+def summary_record(exitstatus, duration, counts, worker=None):
+    return {"type": "summary", "finished": _now(), "worker": worker, "exitstatus": int(exitstatus),
+            "duration": duration, "counts": counts}
+
+
+class ResultLog:
+    """
+    Plugin writing one record per test to the result log when its teardown is reported.
+
+    Shard workers share the log of their run: the coordinator writes its session and summary
+    records, and only the first worker the collection errors, which every worker runs into.
+
+    Args:
+        writer (ResultLogWriter): Where the records go.
+        worker (str or None): Name of the worker process, for logs shared by shard workers.
+        session_records (bool): Whether to write the session and summary records.
+        collect_errors (bool): Whether to write the collection errors.
+    """
+
+    def __init__(self, writer, worker=None, session_records=True, collect_errors=True):
+        self.writer = writer
+        self.worker = worker
+        self.session_records = session_records
+        self.collect_errors = collect_errors
+        self.pending = {}
+        self.counts = dict.fromkeys(OUTCOMES, 0)
+        self.started = time.perf_counter()
+
+    def pytest_sessionstart(self, session):
+        if self.session_records:
+            self.writer.write(session_record(session.config.invocation_params.args, self.worker))
+
+    def pytest_collectreport(self, report):
+        if report.failed and self.collect_errors:
+            self.counts["error"] += 1
+            self.writer.write({"type": "collect", "nodeid": report.nodeid, "outcome": "error",
+                               "longrepr": _longrepr(report), "worker": self.worker})
+
+    def pytest_runtest_logreport(self, report):
+        phases = self.pending.setdefault(report.nodeid, {})
+        phases[report.when] = report
+        if report.when == "teardown":
+            self.write_test(report.nodeid, self.pending.pop(report.nodeid))
+
+    def write_test(self, nodeid, phases):
+        outcome = outcome_of(phases)
+        self.counts[outcome] += 1
+        last = phases.get("teardown") or phases.get("call") or phases["setup"]
+        record = {
+            "type": "test",
+            "nodeid": nodeid,
+            "outcome": outcome,
+            "duration": sum(report.duration for report in phases.values()),
+            "phases": {when: report.outcome for when, report in phases.items()},
+            "worker": self.worker,
+        }
+        details = [_longrepr(report) for report in phases.values() if report.failed or report.skipped]
+        if any(details):
+            record["longrepr"] = "\n\n".join(detail for detail in details if detail)
+        properties = dict(last.user_properties)
+        if "requests" in properties:
+            record["requests"] = properties.pop("requests")
+        if properties:
+            record["properties"] = properties
+        self.writer.write(record)
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        # Tests cut short, by a Ctrl-C or -x, never reported their teardown.
+        for nodeid, phases in self.pending.items():
+            self.write_test(nodeid, phases)
+        self.pending.clear()
+        if self.session_records:
+            self.writer.write(summary_record(exitstatus, time.perf_counter() - self.started, self.counts, self.worker))
+
+    def pytest_unconfigure(self, config):
+        self.writer.close()
+
+
+class LogReader:
+    """
+    Reads the records of one or more result logs, one line at a time.
+
+    A line cut short by a crash is skipped and counted in `damaged`; `finished` tells whether
+    every log ended with its summary record.
+
+    Args:
+        paths (list): The log files, e.g. one per machine of a run.
+    """
+
+    def __init__(self, paths):
+        self.paths = list(paths)
+        self.damaged = 0
+        self.finished = False
+
+    def __iter__(self):
+        self.damaged = 0
+        summaries = 0
+        sessions = 0
+        for path in self.paths:
+            with open(path, "rb") as file:
+                for line in file:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        self.damaged += 1
+                        continue
+                    sessions += record.get("type") == "session"
+                    summaries += record.get("type") == "summary"
+                    yield record
+        self.finished = sessions > 0 and summaries >= sessions
+
+    def results(self):
+        """The test and collection error records."""
+        return (record for record in self if record.get("type") in ("test", "collect"))
+
+
+class Totals:
+    """Counts and time over the results of a log, gathered in one pass before the report is written."""
+
+    def __init__(self, reader):
+        self.counts = dict.fromkeys(OUTCOMES, 0)
+        self.duration = 0.0
+        for record in reader.results():
+            self.counts[record["outcome"]] += 1
+            self.duration += record.get("duration", 0.0)
+        self.finished = reader.finished
+        self.damaged = reader.damaged
+
+    @property
+    def tests(self):
+        return sum(self.counts.values())
+
+
+def _xml_text(text):
+    return _ILLEGAL_XML.sub("\ufffd", text or "")
+
+
+def _split_nodeid(nodeid):
+    path, _, name = nodeid.partition("::")
+    classname = path[:-3] if path.endswith(".py") else path
+    classname = classname.replace("/", ".")
+    if "::" in name:
+        owner, _, name = name.rpartition("::")
+        classname = f"{classname}.{owner.replace('::', '.')}"
+    return classname, name or path
+
+
+def _request_line(request):
+    return f"{request['method']} {request['route']} {request['status']} {request['total_ms']:.1f}ms"
+
+
+def render_junit(paths, output):
+    """
+    Render the logs at `paths` as JUnit XML to the open text file `output`.
+
+    Two passes over the logs, one for the totals of the `testsuite` element and one writing
+    each test case as it is read, so time is linear and memory constant in the number of results.
+    """
+    reader = LogReader(paths)
+    totals = Totals(reader)
+    counts = totals.counts
+    name = "pytest" if totals.finished else "pytest (partial)"
+    output.write('<?xml version="1.0" encoding="utf-8"?>\n<testsuites>\n')
+    output.write(
+        f"<testsuite name={quoteattr(name)} tests=\"{totals.tests}\" "
+        f"failures=\"{counts['failed'] + counts['xpassed']}\" errors=\"{counts['error'] + counts['interrupted']}\" "
+        f"skipped=\"{counts['skipped'] + counts['xfailed']}\" time=\"{totals.duration:.3f}\">\n"
+    )
+    for record in reader.results():
+        classname, test = _split_nodeid(record["nodeid"])
+        output.write(f'  <testcase classname={quoteattr(classname)} name={quoteattr(test)} '
+                     f'time="{record.get("duration", 0.0):.3f}"')
+        outcome = record["outcome"]
+        message = _xml_text(record.get("longrepr"))
+        requests = record.get("requests")
+        if outcome == "passed" and not requests:
+            output.write("/>\n")
+            continue
+        output.write(">\n")
+        if outcome in ("failed", "xpassed"):
+            first = message.splitlines()[-1] if message else outcome
+            output.write(f"    <failure message={quoteattr(first)}>{escape(message)}</failure>\n")
+        elif outcome in ("error", "interrupted"):
+            output.write(f"    <error message={quoteattr(outcome)}>{escape(message)}</error>\n")
+        elif outcome in ("skipped", "xfailed"):
+            output.write(f"    <skipped message={quoteattr(message or outcome)}/>\n")
+        if requests:
+            lines = "\n".join(_request_line(request) for request in requests)
+            output.write(f"    <system-out>{escape(_xml_text(lines))}</system-out>\n")
+        output.write("  </testcase>\n")
+    output.write("</testsuite>\n</testsuites>\n")
+    return totals
+
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: sans-serif; margin: 1.5em; }}
+table {{ border-collapse: collapse; width: 100%; }}
+td, th {{ border-bottom: 1px solid #ddd; padding: 0.2em 0.5em; text-align: left; vertical-align: top; }}
+pre {{ margin: 0.3em 0; white-space: pre-wrap; }}
+.passed {{ color: #2a7d2a; }} .failed, .error, .xpassed, .interrupted {{ color: #b52a2a; }}
+.skipped, .xfailed {{ color: #8a6d00; }}
+.partial {{ background: #fde8e8; border: 1px solid #b52a2a; padding: 0.5em; }}
+</style></head><body>
+<h1>{title}</h1>
+"""
+
+
+def render_html(paths, output):
+    """Render the logs at `paths` as a single HTML page to the open text file `output`, see `render_junit`."""
+    reader = LogReader(paths)
+    totals = Totals(reader)
+    output.write(_HTML_HEAD.format(title="Petstore test report"))
+    if not totals.finished:
+        output.write('<p class="partial">Partial report: the run did not finish, it crashed or was cancelled. '
+                     'The results below are those written before it stopped.</p>\n')
+    if totals.damaged:
+        output.write(f'<p class="partial">{totals.damaged} damaged line(s) of the log were skipped.</p>\n')
+    summary = ", ".join(f'<span class="{outcome}">{count} {outcome}</span>'
+                        for outcome, count in totals.counts.items() if count)
+    output.write(f"<p>{totals.tests} tests in {totals.duration:.2f}s: {summary or 'none'}</p>\n")
+    output.write("<table>\n<tr><th>Test</th><th>Outcome</th><th>Duration</th><th>Requests</th></tr>\n")
+    for record in reader.results():
+        outcome = record["outcome"]
+        requests = record.get("requests") or []
+        output.write(f'<tr><td>{html.escape(record["nodeid"])}')
+        if record.get("longrepr"):
+            output.write(f'<details><summary>details</summary><pre>{html.escape(record["longrepr"])}</pre></details>')
+        if requests:
+            lines = "\n".join(_request_line(request) for request in requests)
+            output.write(f"<details><summary>requests</summary><pre>{html.escape(lines)}</pre></details>")
+        output.write(f'</td><td class="{outcome}">{outcome}</td>'
+                     f'<td>{record.get("duration", 0.0):.3f}s</td><td>{len(requests)}</td></tr>\n')
+    output.write("</table>\n</body></html>\n")
+    return totals
+
+
+def pytest_addoption(parser):
+    parser.getgroup("petstore").addoption(
+        "--result-log",
+        action="store",
+        dest="result_log",
+        default=None,
+        metavar="PATH",
+        help="append every test result, with its request timings, to PATH as NDJSON as soon as it "
+             "finishes; render it with `python tests/resultLog.py junit|html`.",
+    )
+
+
+def pytest_configure(config):
+    path = config.getoption("result_log")
+    if path is None or hasattr(config, "workerinput"):
+        return
+    # Shard workers append to the log their coordinator started, anything else starts it afresh.
+    if config.getoption("shard_worker", None):
+        index = os.environ.get("PETSTORE_WORKER_INDEX", "0")
+        plugin = ResultLog(ResultLogWriter(path, truncate=False), f"worker-{index}", session_records=False,
+                           collect_errors=index == "0")
+    else:
+        plugin = ResultLog(ResultLogWriter(path))
+    config.pluginmanager.register(plugin, "petstore-result-log")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the petstore result log as a JUnit XML or HTML report.")
+    parser.add_argument("format", choices=("junit", "html"))
+    parser.add_argument("logs", nargs="+", help="result logs written with --result-log")
+    parser.add_argument("-o", "--output", required=True, help="the report file")
+    args = parser.parse_args(argv)
+    render = render_junit if args.format == "junit" else render_html
+    with open(args.output, "w", encoding="utf-8") as output:
+        totals = render(args.logs, output)
+    state = "" if totals.finished else " (partial: the run did not finish)"
+    print(f"{totals.tests} results written to {args.output}{state}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
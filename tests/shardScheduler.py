@@ -0,0 +1,384 @@
+"""
+Duration-aware sharding of the suite across machines and local worker processes.
+
+Every run records how long each test took (setup, call and teardown) and merges it into a
+small JSON history, `.test_durations.json` at the root by default. Tests are scheduled in
+units of one test function, so all parametrized cases of a function (and a concurrent case
+group) always run together.
+
+Across machines, `--shard-count=N --shard-index=I` keeps only shard I of N, planned from the
+history longest unit first onto the least loaded shard, so every shard takes about as long.
+
+Across processes, the coordinator
+
+    python tests/shardScheduler.py run --workers 4 -- --petstore-target=local
+
+serves the units over a local socket to four pytest workers, longest first, each worker
+pulling its next unit when the previous one is done; the history is merged once all workers
+finish. The two combine: pass `--shard-count/--shard-index` after `--` on each machine. The
+histories of several machines are folded together with
+
+    python tests/shardScheduler.py merge machine-1.json machine-2.json
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+DURATIONS_FILE = ".test_durations.json"
+DEFAULT_DURATION = 1.0
+# Weight of the newest measurement when merged into the history.
+MERGE_WEIGHT = 0.5
+recorder_key = pytest.StashKey["DurationRecorder"]()
+
+
+def unit_of(nodeid):
+    """Return the scheduling unit of a test: its node id without the parametrization."""
+    return nodeid.split("[", 1)[0]
+
+
+def load_durations(path):
+    """Return the `{nodeid: seconds}` history at `path`, empty when missing or unreadable."""
+    try:
+        with open(path) as file:
+            durations = json.load(file)
+    except (OSError, ValueError):
+        return {}
+    return {nodeid: float(seconds) for nodeid, seconds in durations.items()} if isinstance(durations, dict) else {}
+
+
+def merge_durations(history, measured, weight=MERGE_WEIGHT):
+    """Return `history` updated with `measured`, blending each known test's old and new duration."""
+    merged = dict(history)
+    for nodeid, seconds in measured.items():
+        merged[nodeid] = seconds if nodeid not in merged else (1 - weight) * merged[nodeid] + weight * seconds
+    return merged
+
+
+def save_durations(path, durations):
+    """Write the history to `path` atomically, so a concurrent reader never sees half a file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    with os.fdopen(descriptor, "w") as file:
+        json.dump({nodeid: round(seconds, 6) for nodeid, seconds in sorted(durations.items())}, file, indent=1)
+    os.replace(temporary, path)
+
+
+def estimate_units(nodeids, durations):
+    """
+    Return `{unit: estimated seconds}` for the tests `nodeids`.
+
+    Tests without history count as the median known test, or `DEFAULT_DURATION` without any.
+    """
+    known = [durations[nodeid] for nodeid in nodeids if nodeid in durations]
+    fallback = statistics.median(known) if known else DEFAULT_DURATION
+    units = {}
+    for nodeid in nodeids:
+        unit = unit_of(nodeid)
+        units[unit] = units.get(unit, 0.0) + durations.get(nodeid, fallback)
+    return units
+
+
+def plan_shards(units, count):
+    """
+    Split `{unit: seconds}` into `count` shards of about equal total time.
+
+    Longest processing time first: each unit, longest first, goes to the shard with the least
+    time so far. Ties are broken by name, so every machine plans the same shards.
+
+    Returns:
+        list: `(total seconds, [units])` per shard.
+    """
+    shards = [(0.0, index, []) for index in range(count)]
+    heapq.heapify(shards)
+    for unit, seconds in sorted(units.items(), key=lambda entry: (-entry[1], entry[0])):
+        total, index, members = heapq.heappop(shards)
+        members.append(unit)
+        heapq.heappush(shards, (total + seconds, index, members))
+    return [(total, members) for total, _, members in sorted(shards, key=lambda shard: shard[1])]
+
+
+def durations_path(config):
+    return Path(config.getoption("durations_path") or config.rootpath / DURATIONS_FILE)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("petstore")
+    group.addoption(
+        "--shard-count",
+        action="store",
+        dest="shard_count",
+        type=int,
+        default=1,
+        metavar="N",
+        help="split the suite into N shards of about equal duration, see --shard-index.",
+    )
+    group.addoption(
+        "--shard-index",
+        action="store",
+        dest="shard_index",
+        type=int,
+        default=0,
+        metavar="I",
+        help="run only shard I (0 based) of --shard-count.",
+    )
+    group.addoption(
+        "--durations-path",
+        action="store",
+        dest="durations_path",
+        metavar="PATH",
+        default=os.environ.get("PETSTORE_DURATIONS"),
+        help=f"test duration history used to plan shards and merged after the run. "
+             f"Defaults to $PETSTORE_DURATIONS or {DURATIONS_FILE} in the root directory.",
+    )
+    group.addoption(
+        "--shard-worker",
+        action="store",
+        dest="shard_worker",
+        default=None,
+        help=argparse.SUPPRESS,
+    )
+
+
+def pytest_configure(config):
+    count, index = config.getoption("shard_count"), config.getoption("shard_index")
+    if count < 1 or not 0 <= index < count:
+        raise pytest.UsageError(f"--shard-index must be between 0 and {count - 1}, got {index}")
+    config.stash[recorder_key] = DurationRecorder()
+    config.pluginmanager.register(config.stash[recorder_key], "shard-durations")
+
+
+def pytest_collection_modifyitems(config, items):
+    count = config.getoption("shard_count")
+    if count == 1:
+        return
+    history = load_durations(durations_path(config))
+    units = estimate_units([item.nodeid for item in items], history)
+    _, selected = plan_shards(units, count)[config.getoption("shard_index")]
+    selected = set(selected)
+    deselected = [item for item in items if unit_of(item.nodeid) not in selected]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = [item for item in items if unit_of(item.nodeid) in selected]
+
+
+class DurationRecorder:
+    """Sums the setup, call and teardown time of every test; in a worker, reports each finished test."""
+
+    def __init__(self):
+        self.measured = {}
+        self.failed = set()
+        self.connection = None
+
+    def pytest_runtest_logreport(self, report):
+        self.measured[report.nodeid] = self.measured.get(report.nodeid, 0.0) + report.duration
+        if report.failed:
+            self.failed.add(report.nodeid)
+        if self.connection is not None and report.when == "teardown":
+            self.connection.send({"type": "result", "nodeid": report.nodeid,
+                                  "duration": self.measured[report.nodeid], "failed": report.nodeid in self.failed})
+
+
+def pytest_sessionfinish(session):
+    config = session.config
+    measured = config.stash[recorder_key].measured
+    if not measured or config.getoption("shard_worker") or config.getoption("collectonly"):
+        return
+    path = durations_path(config)
+    save_durations(path, merge_durations(load_durations(path), measured))
+
+
+class WorkerConnection:
+    """A worker's line-delimited JSON connection to the coordinator."""
+
+    def __init__(self, address):
+        host, _, port = address.rpartition(":")
+        self.socket = socket.create_connection((host, int(port)))
+        self.file = self.socket.makefile("rwb")
+
+    def send(self, message):
+        self.file.write(json.dumps(message).encode() + b"\n")
+        self.file.flush()
+
+    def request(self, message):
+        self.send(message)
+        return json.loads(self.file.readline())
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtestloop(session):
+    address = session.config.getoption("shard_worker")
+    if address is None or session.config.getoption("collectonly"):
+        return None
+    units = {}
+    for item in session.items:
+        units.setdefault(unit_of(item.nodeid), []).append(item)
+    connection = WorkerConnection(address)
+    session.config.stash[recorder_key].connection = connection
+    try:
+        connection.send({"type": "hello", "pid": os.getpid(), "tests": [item.nodeid for item in session.items]})
+        pending = []
+        more = True
+        while pending or more:
+            # One unit is fetched ahead, so the item after the current one is known and fixtures
+            # shared with it are kept rather than torn down.
+            while more and len(pending) < 2:
+                unit = connection.request({"type": "next"})["unit"]
+                more = unit is not None
+                pending.extend(units.get(unit, ()) if more else ())
+            if not pending:
+                break
+            item = pending.pop(0)
+            item.config.hook.pytest_runtest_protocol(item=item, nextitem=pending[0] if pending else None)
+            if session.shouldfail or session.shouldstop:
+                break
+        connection.send({"type": "bye"})
+    finally:
+        connection.close()
+    return True
+
+
+class Coordinator:
+    """
+    Serves test units to the workers, longest first, and gathers their measured durations.
+
+    Args:
+        history (dict): The `{nodeid: seconds}` history the units are ordered by.
+    """
+
+    def __init__(self, history):
+        self.history = history
+        self.queue = None
+        self.measured = {}
+        self.failed = []
+        self.busy = {}
+
+    async def serve(self, reader, writer):
+        pid = None
+        async for line in reader:
+            message = json.loads(line)
+            if message["type"] == "hello":
+                pid = message["pid"]
+                self.busy.setdefault(pid, 0.0)
+                if self.queue is None:
+                    units = estimate_units(message["tests"], self.history)
+                    self.queue = sorted(units, key=lambda unit: (-units[unit], unit))
+            elif message["type"] == "next":
+                unit = self.queue.pop(0) if self.queue else None
+                writer.write(json.dumps({"unit": unit}).encode() + b"\n")
+                await writer.drain()
+            elif message["type"] == "result":
+                self.measured[message["nodeid"]] = message["duration"]
+                self.busy[pid] += message["duration"]
+                if message["failed"]:
+                    self.failed.append(message["nodeid"])
+            elif message["type"] == "bye":
+                break
+        writer.close()
+
+
+def result_log_path(pytest_args):
+    """Return the `--result-log` path given in `pytest_args`, None without one."""
+    path = None
+    for index, argument in enumerate(pytest_args):
+        if argument == "--result-log" and index + 1 < len(pytest_args):
+            path = pytest_args[index + 1]
+        elif argument.startswith("--result-log="):
+            path = argument.partition("=")[2]
+    return path
+
+
+async def coordinate(workers, pytest_args, history_path, log_dir):
+    """
+    Run the suite on `workers` local pytest processes fed by a coordinator.
+
+    With a `--result-log` among `pytest_args`, the log is started afresh before the workers
+    append their results to it, and the coordinator writes its session and summary records.
+
+    Returns:
+        int: The worst exit code of the workers.
+    """
+    coordinator = Coordinator(load_durations(history_path))
+    result_log = result_log_path(pytest_args)
+    if result_log is not None:
+        from resultLog import ResultLogWriter, session_record
+
+        run_log = ResultLogWriter(result_log)
+        run_log.write(session_record(pytest_args))
+    server = await asyncio.start_server(coordinator.serve, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    log_dir.mkdir(parents=True, exist_ok=True)
+    started = time.perf_counter()
+    processes = []
+    for index in range(workers):
+        log = open(log_dir / f"worker-{index}.log", "wb")
+        environment = {**os.environ, "PETSTORE_WORKER_INDEX": str(index)}
+        processes.append((log, await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "pytest", *pytest_args, "-p", "no:reporter", f"--durations-path={history_path}",
+            f"--shard-worker=127.0.0.1:{port}", stdout=log, stderr=asyncio.subprocess.STDOUT, env=environment,
+        )))
+    codes = []
+    for log, process in processes:
+        codes.append(await process.wait())
+        log.close()
+    server.close()
+    await server.wait_closed()
+    elapsed = time.perf_counter() - started
+    if result_log is not None:
+        from resultLog import LogReader, Totals, summary_record
+
+        run_log.write(summary_record(max(codes, default=0), elapsed, Totals(LogReader([result_log])).counts))
+        run_log.close()
+
+    if coordinator.measured:
+        save_durations(history_path, merge_durations(load_durations(history_path), coordinator.measured))
+    print(f"{len(coordinator.measured)} tests on {workers} workers in {elapsed:.2f}s")
+    for index, busy in enumerate(coordinator.busy.values()):
+        print(f"  worker {index}: {busy:.2f}s of tests")
+    for nodeid in coordinator.failed:
+        print(f"FAILED {nodeid}")
+    if coordinator.failed or any(codes):
+        print(f"worker output: {log_dir}")
+    return max(codes, default=0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Duration-aware parallel runs of the petstore suite.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the suite on local worker processes")
+    run.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    run.add_argument("--durations", type=Path, default=Path(DURATIONS_FILE))
+    run.add_argument("--log-dir", type=Path, default=Path(tempfile.gettempdir()) / "petstore-workers")
+    run.add_argument("pytest_args", nargs=argparse.REMAINDER, help="arguments for pytest, after --")
+    merge = commands.add_parser("merge", help="merge duration histories, for example of several machines")
+    merge.add_argument("histories", nargs="+", type=Path)
+    merge.add_argument("--durations", type=Path, default=Path(DURATIONS_FILE))
+    args = parser.parse_args(argv)
+
+    if args.command == "merge":
+        durations = load_durations(args.durations)
+        for history in args.histories:
+            durations = merge_durations(durations, load_durations(history))
+        save_durations(args.durations, durations)
+        print(f"{len(durations)} test durations in {args.durations}")
+        return 0
+    pytest_args = args.pytest_args[1:] if args.pytest_args[:1] == ["--"] else args.pytest_args
+    return asyncio.run(coordinate(args.workers, pytest_args, args.durations, args.log_dir))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+"""
+Soak mode: loop the pet test scenarios for a long time and watch the client side for leaks.
+
+The scenarios of the load mode run in a loop, each with a client opened and closed around it
+the way the `default_client` fixture does, on one shared transport. Every `--interval` seconds
+a sample of the process is taken: traced Python memory (tracemalloc), open file descriptors,
+connections held by the pool, clients not closed yet, asyncio tasks and the worst event loop
+lag since the previous sample. The samples are appended to an NDJSON time series as they are
+taken, and at the end every metric that kept growing after the warm-up is flagged.
+
+The default "server" target is the stand-in of `faultServer.py` in a child process: requests
+go over real connections, and the memory of this process is the client side's alone, which it
+would not be with the in-process "local" stand-in, whose store grows with every pet posted.
+
+    python tests/soakRunner.py --users 10 --duration 3600 --interval 10 --series soak.ndjson
+"""
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import weakref
+from pathlib import Path
+
+import httpx
+
+from clientPool import Pacer, PoolStats, build_transport, petstore_base_url
+from loadRunner import SCENARIOS, Workload
+from petAuth import BearerAuth, IdentityPool, TokenCache
+
+# Growth below these is noise, whatever its trend.
+MIN_GROWTH = {
+    "memory_bytes": 1024 * 1024,
+    "fds": 5,
+    "pool_connections": 2,
+    "open_clients": 2,
+    "tasks": 5,
+    "loop_lag_ms": 20.0,
+}
+# Kendall's tau of a metric against time above which it counts as growing.
+TREND_THRESHOLD = 0.6
+EXCLUDED_TRACES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+)
+TARGETS = ("server", "local", "remote")
+
+
+def open_fds():
+    """Number of open file descriptors of the process, None where /proc is not available."""
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def pool_connections(transport):
+    """Connections held by the httpcore pool under `transport`, following the wrapper transports down."""
+    seen = set()
+    while transport is not None and id(transport) not in seen:
+        seen.add(id(transport))
+        pool = getattr(transport, "_pool", None)
+        if pool is not None and hasattr(pool, "connections"):
+            return len(pool.connections)
+        transport = getattr(transport, "transport", None)
+    return 0
+
+
+class LoopLagMonitor:
+    """Measures how late a periodic `asyncio.sleep` wakes up, the lag every other task sees too."""
+
+    def __init__(self, period=0.05):
+        self.period = period
+        self.worst = 0.0
+        self.task = None
+        self.discarding = False
+
+    async def run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.period)
+            if self.discarding:
+                self.discarding = False
+                continue
+            self.worst = max(self.worst, time.perf_counter() - started - self.period)
+
+    def discard(self):
+        """Leave the current measurement out, when the monitor itself blocked the loop."""
+        self.discarding = True
+
+    def start(self):
+        self.task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+    def take(self):
+        """Return the worst lag in seconds since the last call."""
+        worst, self.worst = self.worst, 0.0
+        return worst
+
+
+class Sampler:
+    """
+    Takes the samples of a soak run, see the module docstring.
+
+    Args:
+        transport (httpx.AsyncBaseTransport or None): The transport whose pool is sampled.
+        clients (weakref.WeakSet or None): The clients of the run, the open ones are counted.
+        top (int): Number of allocation sites reported with each sample, by growth since the first.
+    """
+
+    def __init__(self, transport=None, clients=None, top=3):
+        self.transport = transport
+        self.clients = clients if clients is not None else weakref.WeakSet()
+        self.top = top
+        self.lag = LoopLagMonitor()
+        self.started = time.perf_counter()
+        self.baseline = None
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.lag.start()
+
+    async def stop(self):
+        await self.lag.stop()
+        tracemalloc.stop()
+
+    def sample(self, **extra):
+        # Garbage that is only waiting for a collection is not a leak.
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot().filter_traces(EXCLUDED_TRACES)
+        _, peak = tracemalloc.get_traced_memory()
+        if self.baseline is None:
+            self.baseline = snapshot
+        growth = [stat for stat in snapshot.compare_to(self.baseline, "lineno") if stat.size_diff > 0][:self.top]
+        lag = self.lag.take()
+        # Taking the snapshot blocks the loop, which is not lag of the run.
+        self.lag.discard()
+        return {
+            "t": round(time.perf_counter() - self.started, 3),
+            "memory_bytes": sum(trace.size for trace in snapshot.traces),
+            "memory_peak_bytes": peak,
+            "fds": open_fds(),
+            "pool_connections": pool_connections(self.transport),
+            "open_clients": sum(1 for client in list(self.clients) if not client.is_closed),
+            "tasks": len(asyncio.all_tasks()),
+            "loop_lag_ms": round(lag * 1000, 3),
+            "top_growth": [f"{stat.traceback[0].filename}:{stat.traceback[0].lineno} +{stat.size_diff}B"
+                           for stat in growth],
+            **extra,
+        }
+
+
+def kendall_tau(values):
+    """Kendall's rank correlation of `values` with their order: 1 always rising, -1 always falling, 0 no trend."""
+    count = len(values)
+    if count < 2:
+        return 0.0
+    score = 0
+    for i in range(count - 1):
+        for j in range(i + 1, count):
+            score += (values[j] > values[i]) - (values[j] < values[i])
+    return score / (count * (count - 1) / 2)
+
+
+def detect_growth(samples, warmup=0.0, metrics=None, threshold=TREND_THRESHOLD):
+    """
+    Flag the metrics that keep growing over the samples taken after `warmup` seconds.
+
+    A metric is flagged when its trend (Kendall's tau against time) is above `threshold` and it
+    grew by at least its `MIN_GROWTH` from the first to the last sample, so a steady upward
+    creep is caught while a flat but noisy metric is not.
+
+    Returns:
+        dict: Metric name to `{"tau", "first", "last", "growth"}` of each flagged metric.
+    """
+    metrics = MIN_GROWTH if metrics is None else metrics
+    steady = [sample for sample in samples if sample["t"] >= warmup]
+    flagged = {}
+    for metric, minimum in metrics.items():
+        values = [sample[metric] for sample in steady if sample.get(metric) is not None]
+        if len(values) < 4:
+            continue
+        tau = kendall_tau(values)
+        growth = values[-1] - values[0]
+        if tau > threshold and growth >= minimum:
+            flagged[metric] = {"tau": round(tau, 3), "first": values[0], "last": values[-1], "growth": growth}
+    return flagged
+
+
+async def soak_user(base_url, transport, workload, pacer, deadline, auth, clients, counts):
+    while time.perf_counter() < deadline:
+        await pacer.wait()
+        await asyncio.sleep(0)
+        if time.perf_counter() >= deadline:
+            break
+        name = workload.pick()
+        scenario = SCENARIOS[name]
+        # A client per scenario on the shared transport, as the default_client fixture opens one per test.
+        async with httpx.AsyncClient(base_url=base_url, transport=transport, auth=auth) as client:
+            clients.add(client)
+            try:
+                await scenario(**workload.arguments(scenario, client))
+                outcome = "passed"
+            except (AssertionError, httpx.HTTPError, ValueError, KeyError, TypeError) as error:
+                outcome = f"failed: {type(error).__name__}"
+        scenario_counts = counts.setdefault(name, {})
+        scenario_counts[outcome] = scenario_counts.get(outcome, 0) + 1
+
+
+@contextlib.asynccontextmanager
+async def stand_in_process():
+    """Run `faultServer.py` in a child process on a free port and yield its base URL."""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, str(Path(__file__).with_name("faultServer.py")), "--port", "0",
+        stdout=asyncio.subprocess.PIPE,
+    )
+    try:
+        # "Petstore serving on <base url> with ..."
+        line = (await process.stdout.readline()).decode()
+        if not line.startswith("Petstore serving on "):
+            raise RuntimeError(f"the stand-in did not start: {line!r}")
+        yield line.split()[3]
+    finally:
+        process.terminate()
+        await process.wait()
+
+
+async def run_soak(target="server", users=10, rate=0, duration=60.0, interval=5.0, warmup=None, weights=None,
+                   seed=None, series=None):
+    """
+    Loop the scenarios with `users` concurrent virtual users for `duration` seconds, sampling the process.
+
+    Args:
+        target (str): "server" for the stand-in in a child process, or "remote" or "local" as
+            for `--petstore-target`.
+        users (int): Number of concurrent virtual users.
+        rate (float): Target scenario starts per second across all users, 0 for as fast as possible.
+        duration (float): Seconds to keep starting new scenarios.
+        interval (float): Seconds between samples.
+        warmup (float or None): Seconds of samples left out of the growth detection, 10% of the
+            duration by default, while pools fill and caches warm up.
+        weights (dict): Scenario name to relative weight, `loadRunner.DEFAULT_WEIGHTS` by default.
+        seed (int or None): Seed making scenario selection reproducible.
+        series (str or None): Path the samples are appended to as NDJSON while the run goes.
+
+    Returns:
+        dict: The samples, the scenario outcomes and the flagged metrics.
+    """
+    workload = Workload(weights, seed)
+    stats = PoolStats()
+    async with contextlib.AsyncExitStack() as stack:
+        if target == "server":
+            base_url = await stack.enter_async_context(stand_in_process())
+        else:
+            base_url = petstore_base_url(target)
+        # The child process stand-in is reached over the network, like the remote target.
+        transport = build_transport(stats, target="local" if target == "local" else "remote", max_connections=users,
+                                    max_keepalive=users)
+        auth = BearerAuth(TokenCache(), IdentityPool().next())
+        clients = weakref.WeakSet()
+        sampler = Sampler(transport, clients)
+        counts = {}
+        samples = []
+        output = open(series, "w") if series else None
+        warmup = duration * 0.1 if warmup is None else warmup
+
+        def record():
+            sample = sampler.sample(iterations=sum(sum(outcomes.values()) for outcomes in counts.values()),
+                                    requests=stats.requests)
+            samples.append(sample)
+            if output is not None:
+                output.write(json.dumps(sample) + "\n")
+                output.flush()
+
+        async def sample_periodically():
+            while True:
+                await asyncio.sleep(interval)
+                record()
+
+        sampler.start()
+        record()
+        sampling = asyncio.ensure_future(sample_periodically())
+        pacer = Pacer(rate)
+        deadline = time.perf_counter() + duration
+        try:
+            await asyncio.gather(*(soak_user(base_url, transport, workload, pacer, deadline, auth, clients, counts)
+                                   for _ in range(users)))
+        finally:
+            sampling.cancel()
+            try:
+                await sampling
+            except asyncio.CancelledError:
+                pass
+            record()
+            await sampler.stop()
+            await transport.aclose_shared()
+            if output is not None:
+                output.close()
+    return {
+        "target": target,
+        "users": users,
+        "duration_s": samples[-1]["t"],
+        "scenarios": counts,
+        "samples": samples,
+        "flagged": detect_growth(samples, warmup),
+    }
+
+
+def format_report(report):
+    first, last = report["samples"][0], report["samples"][-1]
+    lines = [
+        f"target: {report['target']}  users: {report['users']}  duration: {report['duration_s']:.1f}s  "
+        f"samples: {len(report['samples'])}  iterations: {last['iterations']}",
+        "",
+        "scenario outcomes:",
+    ]
+    for name, counts in sorted(report["scenarios"].items()):
+        lines.append(f"  {name:<8} " + "  ".join(f"{outcome}={count}" for outcome, count in sorted(counts.items())))
+    lines += ["", f"  {'metric':<20}{'first':>14}{'last':>14}"]
+    for metric in MIN_GROWTH:
+        lines.append(f"  {metric:<20}{first[metric]!s:>14}{last[metric]!s:>14}")
+    lines.append("")
+    if report["flagged"]:
+        lines.append("GROWTH DETECTED:")
+        for metric, trend in report["flagged"].items():
+            lines.append(f"  {metric}: {trend['first']} -> {trend['last']} (+{trend['growth']}, tau {trend['tau']})")
+        lines += ["  largest allocation growth since the first sample:"] + [f"    {site}" for site in last["top_growth"]]
+    else:
+        lines.append("no steady growth detected")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Loop the petstore test scenarios and watch for leaks.")
+    parser.add_argument("--target", choices=TARGETS, default="server")
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--rate", type=float, default=0, help="scenario starts per second, 0 for unpaced")
+    parser.add_argument("--duration", type=float, default=600.0, help="seconds to run")
+    parser.add_argument("--interval", type=float, default=10.0, help="seconds between samples")
+    parser.add_argument("--warmup", type=float, default=None, help="seconds ignored by the growth detection")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--series", metavar="PATH", help="append the samples to PATH as NDJSON")
+    args = parser.parse_args(argv)
+    report = asyncio.run(run_soak(args.target, args.users, args.rate, args.duration, args.interval, args.warmup,
+                                  seed=args.seed, series=args.series))
+    print(format_report(report))
+    return 1 if report["flagged"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""
+Startup profile of a test run: where the time before the first test goes.
+
+With `--profile-startup`, every module imported between `pytest_configure` and the end of
+collection is timed, self and cumulative like `python -X importtime`, as is the collection of
+every test module. The slowest of both are printed with the time from process start to the
+plugins being loaded and from there to the end of collection.
+"""
+import os
+import sys
+import time
+
+import pytest
+
+# When conftest.py loaded the plugins, the earliest the suite's own code runs.
+LOADED = time.perf_counter()
+
+
+def process_age():
+    """Seconds since this process started, None where /proc is not available."""
+    try:
+        with open("/proc/self/stat") as file:
+            # Fields after the parenthesized command name, the start time is field 22.
+            fields = file.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as file:
+            uptime = float(file.read().split()[0])
+        return uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class _TimedLoader:
+    """Wraps the loader of one module to time its execution, nested imports included."""
+
+    def __init__(self, loader, timer, name):
+        self.loader = loader
+        self.timer = timer
+        self.name = name
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        create_module = getattr(self.loader, "create_module", None)
+        return create_module(spec) if create_module is not None else None
+
+    def exec_module(self, module):
+        # The module only ever sees its real loader.
+        module.__loader__ = module.__spec__.loader = self.loader
+        self.timer.enter()
+        started = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.timer.leave(self.name, time.perf_counter() - started)
+
+
+class ImportTimer:
+    """
+    Meta path finder timing every module imported while it is installed.
+
+    `records` maps a module name to `(cumulative, self)` seconds, self excluding the modules
+    it imported in turn.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.stack = []
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            find_spec = getattr(finder, "find_spec", None)
+            if finder is self or find_spec is None:
+                continue
+            spec = find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self, name)
+        return spec
+
+    def enter(self):
+        self.stack.append(0.0)
+
+    def leave(self, name, elapsed):
+        children = self.stack.pop()
+        if self.stack:
+            self.stack[-1] += elapsed
+        self.records[name] = (elapsed, elapsed - children)
+
+    def slowest(self, count):
+        return sorted(self.records.items(), key=lambda record: record[1][0], reverse=True)[:count]
+
+
+class StartupProfiler:
+    """
+    Plugin timing the imports and the test module collection of the run.
+
+    Args:
+        top (int): Number of modules listed in each part of the report.
+    """
+
+    def __init__(self, top=15):
+        self.top = top
+        self.configured = time.perf_counter()
+        self.age = process_age()
+        self.imports = ImportTimer()
+        self.modules = {}
+        self.collected = None
+        self.items = 0
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_make_collect_report(self, collector):
+        if not isinstance(collector, pytest.Module):
+            yield
+            return
+        started = time.perf_counter()
+        yield
+        self.modules[collector.nodeid] = time.perf_counter() - started
+
+    def pytest_collection_finish(self, session):
+        self.collected = time.perf_counter()
+        self.items = len(session.items)
+        self.imports.uninstall()
+
+    def report(self):
+        lines = []
+        if self.age is not None:
+            lines.append(f"process start to plugins loaded: {self.age - (self.configured - LOADED):.3f}s")
+        if self.collected is not None:
+            lines.append(f"plugins loaded to collected: {self.collected - LOADED:.3f}s, "
+                         f"{self.items} tests from {len(self.modules)} modules")
+        if self.modules:
+            lines.append("slowest test modules to collect:")
+            slowest = sorted(self.modules.items(), key=lambda module: module[1], reverse=True)[:self.top]
+            lines += [f"  {elapsed:8.3f}s  {nodeid}" for nodeid, elapsed in slowest]
+        if self.imports.records:
+            lines.append("slowest imports, cumulative (self):")
+            lines += [f"  {cumulative:8.3f}s ({own:.3f}s)  {name}"
+                      for name, (cumulative, own) in self.imports.slowest(self.top)]
+        return lines
+
+    def pytest_terminal_summary(self, terminalreporter):
+        terminalreporter.write_sep("-", "petstore startup profile")
+        for line in self.report():
+            terminalreporter.write_line(line)
+
+
+def pytest_addoption(parser):
+    parser.getgroup("petstore").addoption(
+        "--profile-startup",
+        action="store",
+        dest="profile_startup",
+        type=int,
+        nargs="?",
+        const=15,
+        default=None,
+        metavar="N",
+        help="report the time to start up and collect, the N slowest test modules to collect and "
+             "the N slowest imports (15 by default).",
+    )
+
+
+def pytest_configure(config):
+    top = config.getoption("profile_startup")
+    if top is not None:
+        profiler = StartupProfiler(top)
+        profiler.imports.install()
+        config.pluginmanager.register(profiler, "petstore-startup-profiler")
+
+
+def pytest_unconfigure(config):
+    profiler = config.pluginmanager.get_plugin("petstore-startup-profiler")
+    if profiler is not None:
+        profiler.imports.uninstall()
@@ -0,0 +1,122 @@
+import contextlib
+import json
+import pytest
+from benchSuite import (BENCHMARKS, DEFAULT_MIN_GAIN, Benchmark, batch_costs, batch_gain, compare, load_baselines,
+                        machine, machine_key, main, measure, record_baseline, run, select)
+
+
+def counting_benchmark(asynchronous):
+    calls = []
+
+    async def operation():
+        calls.append(None)
+
+    @contextlib.asynccontextmanager
+    async def setup():
+        yield operation if asynchronous else lambda: calls.append(None)
+
+    return Benchmark("counting", setup, number=10), calls
+
+
+def results(description=None, **minimums):
+    return {"machine": description or machine(), "benchmarks": {name: {"min": best, "median": best} for name, best in minimums.items()}}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("asynchronous", [False, True])
+async def test_measure_warms_up_and_repeats(asynchronous):
+    """
+    Test sync and async operations are called once to probe them, then for the warm-up and every timed run.
+    """
+    bench, calls = counting_benchmark(asynchronous)
+    result = await measure(bench, repeat=3, warmup=2)
+    assert len(calls) == 1 + (2 + 3) * 10
+    assert len(result["times"]) == 3
+    assert result["min"] <= result["median"] <= result["max"]
+
+
+def test_compare_gates_on_threshold():
+    """
+    Test a benchmark slower than the threshold allows regresses, one within it passes, and the
+    benchmark's own threshold overrides the default.
+    """
+    baseline = results(jwt_mint=10.0, decode_pet_model=10.0, round_trip_get=100.0, gone=1.0)
+    current = results(jwt_mint=13.0, decode_pet_model=7.0, round_trip_get=140.0, added=1.0)
+    statuses = {comparison.name: comparison.status for comparison in compare(baseline, current, threshold=0.25)}
+    assert statuses == {"jwt_mint": "regressed", "decode_pet_model": "improved", "round_trip_get": "ok",
+                        "gone": "missing", "added": "new"}
+
+
+def test_compare_exit_status(tmp_path, capsys):
+    """
+    Test `compare` on stored results exits with 1 on a regression and 0 otherwise.
+    """
+    baseline, current = tmp_path / "baseline.json", tmp_path / "current.json"
+    baseline.write_text(json.dumps(results(jwt_mint=10.0)))
+    current.write_text(json.dumps(results(jwt_mint=20.0)))
+    assert main(["compare", "--baseline", str(baseline), "--results", str(current)]) == 1
+    assert main(["compare", "--baseline", str(baseline), "--results", str(current), "--threshold", "1.5"]) == 0
+    assert "1 benchmarks regressed: jwt_mint" in capsys.readouterr().out
+
+
+def test_baselines_are_kept_by_machine(tmp_path, capsys):
+    """
+    Test recording keeps the baselines of other machines, and `compare` only gates against the
+    baseline of its own machine and does not gate without one.
+    """
+    path, current = tmp_path / "baseline.json", tmp_path / "current.json"
+    other = dict(machine(), python="2.7.18", cpus=64)
+    path.write_text(json.dumps(results(other, jwt_mint=100.0)))
+    current.write_text(json.dumps(results(jwt_mint=20.0)))
+    assert main(["compare", "--baseline", str(path), "--results", str(current)]) == 0
+    assert f"no baseline for {machine_key(machine())}" in capsys.readouterr().out
+
+    record_baseline(results(jwt_mint=10.0), path)
+    baselines = load_baselines(path)
+    assert set(baselines) == {machine_key(other), machine_key(machine())}
+    assert machine_key(other).startswith("CPython-2.7-") and machine_key(other).endswith("-64cpu")
+    assert main(["compare", "--baseline", str(path), "--results", str(current)]) == 1
+    assert "1 benchmarks regressed: jwt_mint" in capsys.readouterr().out
+    patched = ".".join(machine()["python"].split(".")[:2]) + ".99"
+    assert machine_key(dict(machine(), python=patched, processor="other")) == machine_key(machine())
+
+
+@pytest.mark.asyncio
+async def test_every_benchmark_runs():
+    """
+    Test every registered benchmark sets up, runs and tears down, scaled down to a few calls.
+    """
+    document = await run(select(), repeat=1, warmup=0, scale=0.001, report=lambda line: None)
+    assert set(document["benchmarks"]) == {bench.name for bench in select()}
+    assert set(select(["decode_pet_*"])) <= set(BENCHMARKS.values())
+
+
+def test_batches_flag_bulk_endpoints_degraded_to_per_item_cost(tmp_path, capsys):
+    """
+    Test `batches` charts the cost per item by batch size and fails on an endpoint whose large
+    batches cost about as much per item as a batch of one.
+    """
+    path = tmp_path / "current.json"
+    path.write_text(json.dumps(results(users_array_batch_1=400.0, users_array_batch_100=1200.0,
+                                       users_array_batch_10000=100000.0, users_list_batch_1=400.0,
+                                       users_list_batch_100=30000.0, users_list_batch_10000=3000000.0,
+                                       jwt_mint=10.0)))
+    costs = batch_costs(json.loads(path.read_text()))
+    assert costs == {"users_array": [(1, 400.0), (100, 12.0), (10000, 10.0)],
+                     "users_list": [(1, 400.0), (100, 300.0), (10000, 300.0)]}
+    assert main(["batches", "--results", str(path)]) == 1
+    output = capsys.readouterr().out
+    assert "users_array: 40.0x cheaper per item at 10000 than at 1  ok" in output
+    assert "users_list: 1.3x cheaper per item at 10000 than at 1  DEGRADED" in output
+    assert main(["batches", "--results", str(path), "--min-gain", "1.2"]) == 0
+
+
+@pytest.mark.asyncio
+async def test_bulk_user_endpoints_amortize_batches():
+    """
+    Test a batch of a thousand users costs the local Petstore far less per user than a batch of one.
+    """
+    document = await run(select(["users_*_batch_1", "users_*_batch_1000"]), repeat=1, warmup=0, scale=0.1,
+                         report=lambda line: None)
+    for endpoint, points in batch_costs(document).items():
+        assert batch_gain(points) >= DEFAULT_MIN_GAIN, f"{endpoint}: {points}"
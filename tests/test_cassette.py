@@ -0,0 +1,64 @@
+import httpx
+import pytest
+from cassette import CassetteMiss, CassetteStore, CassetteTransport
+from clientPool import LOCAL_BASE_URL
+from petPayloads import pet_payload
+from petStoreServer import PetStoreApp
+
+
+async def run_flow(transport):
+    """Post, fetch, delete and fetch again one pet, returning the status codes."""
+    async with httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=transport) as client:
+        statuses = [(await client.post("/pet/", json=pet_payload(4242))).status_code]
+        statuses.append((await client.get("/pet/4242")).status_code)
+        statuses.append((await client.delete("/pet/4242")).status_code)
+        statuses.append((await client.get("/pet/4242")).status_code)
+    return statuses
+
+
+@pytest.mark.asyncio
+async def test_cassette_record_then_replay(tmp_path):
+    """
+    Test a flow recorded against the stand-in replays with the same results and no target.
+
+    Asserts:
+        The replayed status codes match the recorded ones, repeated GETs included.
+        A request that was never recorded raises CassetteMiss in replay mode.
+    """
+    path = tmp_path / "petstore.sqlite3"
+    recorder = CassetteTransport(httpx.ASGITransport(app=PetStoreApp()), CassetteStore(path), "record")
+    recorded = await run_flow(recorder)
+    assert recorded == [200, 200, 200, 404]
+    assert recorder.recorded == 4
+
+    replayer = CassetteTransport(httpx.MockTransport(lambda request: httpx.Response(599)), CassetteStore(path), "replay")
+    assert await run_flow(replayer) == recorded
+    assert replayer.hits == 4
+
+    async with httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=replayer) as client:
+        with pytest.raises(CassetteMiss):
+            await client.get("/pet/1")
+
+
+@pytest.mark.asyncio
+async def test_replay_never_serves_another_tests_exchange(tmp_path):
+    """
+    Test a request is only replayed from the exchanges of its own test, the latest of them when
+    it is repeated more often than recorded, and is a miss when only another test recorded it.
+    """
+    path = tmp_path / "petstore.sqlite3"
+    recorder = CassetteTransport(httpx.ASGITransport(app=PetStoreApp()), CassetteStore(path), "record")
+    async with httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=recorder) as client:
+        await client.post("/pet/", json=pet_payload(4242), extensions={"test_nodeid": "t::test_a"})
+        assert (await client.get("/pet/4242", extensions={"test_nodeid": "t::test_a"})).status_code == 200
+        await client.delete("/pet/4242", extensions={"test_nodeid": "t::test_b"})
+        assert (await client.get("/pet/4242", extensions={"test_nodeid": "t::test_b"})).status_code == 404
+    recorder.store.close()
+
+    replayer = CassetteTransport(httpx.MockTransport(lambda request: httpx.Response(599)), CassetteStore(path), "replay")
+    async with httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=replayer) as client:
+        for _ in range(2):
+            assert (await client.get("/pet/4242", extensions={"test_nodeid": "t::test_a"})).status_code == 200
+        with pytest.raises(CassetteMiss):
+            await client.get("/pet/4242", extensions={"test_nodeid": "t::test_c"})
+    assert (replayer.hits, replayer.misses) == (2, 1)
@@ -0,0 +1,66 @@
+import time
+import httpx
+from cassette import CassetteTransport
+from clientPool import Pacer, PoolStats, SharedTransport, build_transport
+from petStoreServer import PetStoreApp
+from resilientTransport import ResilientTransport
+
+
+async def test_clients_share_one_pool(petstore_server):
+    """
+    Test the clients of a shared transport reuse one connection, which closing a client leaves
+    open until `aclose_shared`.
+    """
+    stats = PoolStats()
+    transport = build_transport(stats)
+    pool = transport.transport._pool
+    async with httpx.AsyncClient(base_url=petstore_server.base_url, transport=transport) as first:
+        async with httpx.AsyncClient(base_url=petstore_server.base_url, transport=transport) as second:
+            assert (await first.get("/store/inventory")).status_code == 200
+            assert (await second.get("/store/inventory")).status_code == 200
+    assert (stats.requests, stats.connections, stats.reused) == (2, 1, 1)
+    assert len(pool.connections) == 1, "closing the clients must not close the shared pool"
+
+    async with httpx.AsyncClient(base_url=petstore_server.base_url, transport=transport) as third:
+        assert (await third.get("/store/inventory")).status_code == 200
+    assert (stats.requests, stats.connections) == (3, 1)
+    assert stats.summary() == "3 requests over 1 connections (2 reused), 0 TLS handshakes, HTTP/1.1: 3"
+
+    await transport.aclose_shared()
+    assert pool.connections == []
+
+
+async def test_build_transport_layers(tmp_path):
+    """
+    Test the cassette wraps the resilience wrapper, which wraps the transport to the target.
+    """
+    transport = build_transport(PoolStats(), target="local", cassette_mode="record",
+                                cassette_path=tmp_path / "petstore.sqlite3", resilience=ResilientTransport)
+    assert isinstance(transport, SharedTransport)
+    assert isinstance(transport.app, PetStoreApp)
+    assert isinstance(transport.transport, CassetteTransport)
+    assert isinstance(transport.transport.transport, ResilientTransport)
+    assert isinstance(transport.transport.transport.transport, httpx.ASGITransport)
+    await transport.aclose_shared()
+
+    transport = build_transport(PoolStats(), target="local")
+    assert isinstance(transport.transport, httpx.ASGITransport)
+    async with httpx.AsyncClient(base_url="http://petstore.local/v2", transport=transport) as client:
+        assert (await client.get("/store/inventory")).status_code == 200
+    assert transport.stats.summary() == "1 requests served in-process, no connections opened"
+
+
+async def test_pacer_spaces_task_starts():
+    """
+    Test a paced rate spaces consecutive starts by its interval and a rate of 0 does not wait.
+    """
+    started = time.perf_counter()
+    for _ in range(5):
+        await Pacer(0).wait()
+    assert time.perf_counter() - started < 0.01
+
+    pacer = Pacer(100)
+    started = time.perf_counter()
+    for _ in range(5):
+        await pacer.wait()
+    assert time.perf_counter() - started >= 0.04
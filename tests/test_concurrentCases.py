@@ -0,0 +1,144 @@
+import os
+import re
+import subprocess
+import sys
+import pytest
+from pathlib import Path
+from concurrentCases import DEFAULT_LIMIT, concurrency_limit
+
+TESTS = Path(__file__).parent
+SAMPLE = """
+import asyncio
+import pytest
+
+RUNNING = []
+
+
+@pytest.mark.concurrent(limit=3)
+@pytest.mark.parametrize("case", [*range(6), pytest.param(6, marks=pytest.mark.skip(reason="not today")),
+                                  pytest.param(7, marks=pytest.mark.xfail(reason="known", strict=True))])
+async def test_cases(case, tmp_path):
+    RUNNING.append(case)
+    print(f"case {case} started with {len(RUNNING)} running")
+    await asyncio.sleep(0.05)
+    RUNNING.remove(case)
+    assert case != 7
+"""
+
+FIXTURES_SAMPLE = """
+import asyncio
+import pytest
+
+EVENTS = []
+RUNNING = []
+
+
+@pytest.fixture(autouse=True)
+def autoused(request):
+    EVENTS.append(("autouse", request.node.name))
+
+
+@pytest.fixture
+def base(base):
+    return base + 1
+
+
+@pytest.fixture
+async def resource(request, base):
+    name = request.node.name
+    EVENTS.append(("setup", name))
+    request.addfinalizer(lambda: EVENTS.append(("finalizer", name)))
+    yield (request.param, base)
+    EVENTS.append(("teardown", name))
+
+
+@pytest.fixture
+def broken(request):
+    if request.node.callspec.params["resource"] == 3:
+        raise RuntimeError("no resource 3")
+
+
+@pytest.mark.concurrent(limit=4)
+@pytest.mark.parametrize("resource", range(4), indirect=True)
+async def test_cases(resource, broken, request):
+    RUNNING.append(resource)
+    EVENTS.append(("running", request.node.name, len(RUNNING)))
+    await asyncio.sleep(0.05)
+    RUNNING.remove(resource)
+    assert resource == (int(request.node.name[-2]), 11)
+
+
+def test_every_fixture_ran_once_per_case():
+    for case in range(4):
+        name = f"test_cases[{case}]"
+        kinds = [event[0] for event in EVENTS if event[1] == name]
+        print(name, " ".join(kinds))
+"""
+CONFTEST_SAMPLE = """
+import pytest
+
+
+@pytest.fixture
+def base():
+    return 10
+"""
+
+
+def run_sample(tmp_path, sample=SAMPLE):
+    (tmp_path / "test_sample.py").write_text(sample)
+    environment = {**os.environ, "PYTHONPATH": str(TESTS)}
+    return subprocess.run(
+        [sys.executable, "-m", "pytest", "-s", "-p", "concurrentCases", "-p", "no:cacheprovider",
+         "-o", "asyncio_mode=auto", "-o", "asyncio_default_fixture_loop_scope=session",
+         str(tmp_path / "test_sample.py")],
+        cwd=tmp_path, env=environment, capture_output=True, text=True,
+    )
+
+
+def test_cases_run_concurrently_within_the_limit(tmp_path):
+    """
+    Test the cases of a concurrent test overlap, never more than the marker limit at a time,
+    while a skipped case never runs and an xfail case is run and reported by pytest on its own.
+    """
+    result = run_sample(tmp_path)
+    assert "6 passed, 1 skipped, 1 xfailed" in result.stdout, result.stdout + result.stderr
+    started = {int(case): int(running) for case, running in
+               re.findall(r"case (\d+) started with (\d+) running", result.stdout)}
+    assert sorted(started) == [0, 1, 2, 3, 4, 5, 7]
+    assert max(started[case] for case in range(6)) == 3
+    assert started[7] == 1
+
+
+def test_fixtures_are_set_up_once_per_case(tmp_path):
+    """
+    Test every case of a group gets its fixtures once, through pytest: indirect params, autouse
+    and overriding fixtures included, torn down with the case, and a case whose fixture fails
+    is reported by pytest as a setup error.
+    """
+    (tmp_path / "conftest.py").write_text(CONFTEST_SAMPLE)
+    result = run_sample(tmp_path, FIXTURES_SAMPLE)
+    assert re.search(r"4 passed, .*1 error in", result.stdout), result.stdout + result.stderr
+    assert "no resource 3" in result.stdout
+    events = dict(re.findall(r"(test_cases\[\d\]) ([a-z ]+)\n", result.stdout))
+    for case in range(3):
+        assert events[f"test_cases[{case}]"] == "autouse setup running teardown finalizer"
+    # Set up by the group, then set up again and reported by pytest.
+    assert events["test_cases[3]"] == "autouse setup teardown finalizer autouse setup teardown finalizer"
+
+
+def test_bare_marker_uses_concurrent_cases_option():
+    """
+    Test a marker without a limit takes --concurrent-cases when given, `DEFAULT_LIMIT` otherwise.
+    """
+
+    class Item:
+        def __init__(self, *args, **kwargs):
+            self.marker = pytest.mark.concurrent(*args, **kwargs).mark
+
+        def get_closest_marker(self, name):
+            return self.marker
+
+    assert concurrency_limit(Item(), 0) == DEFAULT_LIMIT
+    assert concurrency_limit(Item(), 3) == 3
+    assert concurrency_limit(Item(2), 3) == 2
+    assert concurrency_limit(Item(limit=5), 3) == 5
@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import pytest
+from contractSpec import (CREATORS, KNOWN_DEVIATIONS, ContractPlugin, ValidatorCache, build_request, check_response,
+                          load_spec, operations, request_values)
+from petDecoding import ResponseValidationError
+
+OPERATIONS = operations(load_spec())
+
+
+def contract_cases():
+    for operation_id, operation in OPERATIONS.items():
+        marks = [pytest.mark.xfail(reason=KNOWN_DEVIATIONS[operation_id], raises=ResponseValidationError, strict=True)
+                 ] if operation_id in KNOWN_DEVIATIONS else []
+        yield pytest.param(operation, id=operation_id, marks=marks)
+
+
+@pytest.mark.parametrize("operation", contract_cases())
+async def test_contract(operation, default_client, contract_cache, pet_ids):
+    """
+    Test an operation of the spec answers its happy path with a documented status and body.
+
+    The pet, order or user the operation refers to is created first, through the operation
+    of the spec that creates it.
+    """
+    ids = {"petId": pet_ids.next(), "orderId": pet_ids.next(), "username": f"contract_{pet_ids.next()}"}
+    for name in operation.requires(OPERATIONS):
+        creator = OPERATIONS[CREATORS[name]]
+        created = await default_client.request(**build_request(creator, request_values(creator, OPERATIONS, ids)))
+        assert created.is_success, f"{creator.operation_id} answered {created.status_code}: {created.text}"
+
+    response = await default_client.request(**build_request(operation, request_values(operation, OPERATIONS, ids)))
+    check_response(operation, response, contract_cache.validators(operation))
+    assert response.is_success, f"{operation.operation_id} answered {response.status_code}: {response.text}"
+
+
+def test_validators_are_cached_by_fingerprint(tmp_path):
+    """
+    Test validators are compiled once per operation fingerprint, and a spec change only recompiles
+    the operations it touches.
+    """
+    spec = load_spec()
+    cache = ValidatorCache(tmp_path)
+    for operation in operations(spec).values():
+        cache.validators(operation)
+    assert cache.compiled == len(OPERATIONS)
+
+    cache = ValidatorCache(tmp_path)
+    for operation in operations(spec).values():
+        cache.validators(operation)
+    assert cache.compiled == 0
+
+    spec["definitions"]["Order"]["properties"]["quantity"]["format"] = "int64"
+    changed = operations(spec)
+    cache = ValidatorCache(tmp_path)
+    for operation in changed.values():
+        cache.validators(operation)
+    assert cache.compiled == 2
+    assert len(list(tmp_path.glob("placeOrder-*.py"))) == 1
+    assert {operation_id for operation_id, operation in changed.items()
+            if operation.fingerprint != OPERATIONS[operation_id].fingerprint} == {"placeOrder", "getOrderById"}
+
+
+def test_compiled_validator_reports_mismatches(tmp_path):
+    """
+    Test a compiled validator reports each field that does not match the schema, with its location.
+    """
+    operation = OPERATIONS["findPetsByStatus"]
+    validate = ValidatorCache(tmp_path).validators(operation)["200"]
+    errors = []
+    validate([{"id": 1, "name": "doggie", "photoUrls": []},
+              {"id": "1", "photoUrls": ["a", 2], "status": "lost", "tags": [{"id": 2**63}]}], (), errors)
+    assert sorted((error["loc"], error["type"]) for error in errors) == [
+        ((1, "id"), "int_type"),
+        ((1, "name"), "missing"),
+        ((1, "photoUrls", 1), "string_type"),
+        ((1, "status"), "enum"),
+        ((1, "tags", 0, "id"), "int_range"),
+    ]
+
+
+def test_only_passed_cases_vouch_for_their_fingerprint(tmp_path):
+    """
+    Test the manifest `--contract-changed` deselects from only gets the operations whose call
+    passed, not the skipped or xfailed ones, and loses those that failed.
+    """
+    cache = ValidatorCache(tmp_path)
+    cache.save_manifest({"deletePet": "old", "getPetById": OPERATIONS["getPetById"].fingerprint})
+    plugin = ContractPlugin(cache)
+    outcomes = {"addPet": "passed", "loginUser": "xfailed", "logoutUser": "skipped", "getPetById": "failed",
+                "deleteUser": "teardown failed"}
+    plugin.items = {operation_id: OPERATIONS[operation_id] for operation_id in outcomes}
+
+    def report(nodeid, when, outcome, **extra):
+        return SimpleNamespace(nodeid=nodeid, when=when, passed=outcome == "passed", failed=outcome == "failed",
+                               skipped=outcome == "skipped", **extra)
+
+    for nodeid, outcome in outcomes.items():
+        plugin.pytest_runtest_logreport(report(nodeid, "setup", "skipped" if outcome == "skipped" else "passed"))
+        if outcome == "xfailed":
+            plugin.pytest_runtest_logreport(report(nodeid, "call", "skipped", wasxfail="known"))
+        elif outcome != "skipped":
+            plugin.pytest_runtest_logreport(report(nodeid, "call", "failed" if outcome == "failed" else "passed"))
+        plugin.pytest_runtest_logreport(report(nodeid, "teardown", "failed" if outcome == "teardown failed" else "passed"))
+    plugin.pytest_sessionfinish(None)
+    assert cache.manifest() == {"addPet": OPERATIONS["addPet"].fingerprint, "deletePet": "old"}
@@ -0,0 +1,135 @@
+import asyncio
+import time
+import httpx
+import pytest
+from faultServer import FaultProfile
+from resilientTransport import CircuitBreaker, ResilienceStats, ResilientTransport, TargetUnhealthy
+from waitUntil import Backoff
+
+FAST = Backoff(initial=0.001, maximum=0.001)
+
+
+def server_client(server, resilient=False, timeout=5.0, **options):
+    transport = httpx.AsyncHTTPTransport()
+    if resilient:
+        transport = ResilientTransport(transport, backoff=FAST, **options)
+    return httpx.AsyncClient(base_url=server.base_url, transport=transport, timeout=timeout)
+
+
+def test_profile_decisions_are_seeded():
+    """
+    Test the same seed gives the same faults, and `times` caps how often a rule fires.
+    """
+    def decisions(seed):
+        profile = FaultProfile(seed=seed)
+        profile.add(route="/pet/{petId}", status=503, rate=0.5)
+        capped = profile.add(route="/pet/{petId}", status=500, times=2)
+        plans = [profile.plan("GET", "/pet/{petId}").rule for _ in range(20)]
+        return [rule.status if rule else 200 for rule in plans], capped.fired
+
+    first, fired = decisions(7)
+    assert first == decisions(7)[0]
+    assert fired == 2 and 503 in first and 200 in first
+    assert FaultProfile().plan("GET", "/pet/{petId}").rule is None
+
+
+async def test_server_answers_without_faults(petstore_server, faults):
+    """
+    Test the stand-in serves the Petstore API over HTTP when no fault is declared.
+    """
+    async with server_client(petstore_server) as client:
+        response = await client.get("/pet/1")
+        missing = await client.get("/pet/987654321")
+    assert response.status_code == 200 and response.json()["name"] == "doggie"
+    assert missing.status_code == 404
+
+
+@pytest.mark.faults(route="/pet/{petId}", status=503, times=2)
+async def test_retries_ride_out_server_errors(petstore_server, faults):
+    """
+    Test the resilient transport retries the injected 503s of a GET until the real answer.
+    """
+    stats = ResilienceStats()
+    async with server_client(petstore_server, resilient=True, retries=2, stats=stats) as client:
+        response = await client.get("/pet/1")
+    assert response.status_code == 200
+    assert stats.retries == {"status 503": 2}
+
+
+@pytest.mark.faults(method="POST", route="/pet", status=429, retry_after=0.2, times=1)
+async def test_retry_after_of_429_is_followed(petstore_server, faults, mock_post_pet):
+    """
+    Test a POST throttled with 429 and Retry-After is sent again after the wait it asks for.
+    """
+    async with server_client(petstore_server, resilient=True, retries=1) as client:
+        started = time.perf_counter()
+        response = await client.post("/pet", json=mock_post_pet)
+    assert response.status_code == 200
+    assert time.perf_counter() - started >= 0.2
+
+
+@pytest.mark.faults(route="/pet/{petId}", latency=(0.3, 0.4))
+async def test_latency_trips_client_timeout(petstore_server, faults):
+    """
+    Test a client timeout shorter than the injected latency fails with a read timeout.
+    """
+    async with server_client(petstore_server, timeout=0.1) as client:
+        with pytest.raises(httpx.ReadTimeout):
+            await client.get("/pet/1")
+
+
+@pytest.mark.parametrize("fault", ["drop", "reset"])
+async def test_broken_connections_are_retried(petstore_server, faults, fault):
+    """
+    Test a dropped or reset connection fails a plain client and is retried by the resilient one.
+    """
+    faults.add(route="/pet/{petId}", times=1, **{fault: True})
+    async with server_client(petstore_server) as client:
+        with pytest.raises(httpx.TransportError):
+            await client.get("/pet/1")
+    faults.add(route="/pet/{petId}", times=1, **{fault: True})
+    async with server_client(petstore_server, resilient=True, retries=1) as client:
+        response = await client.get("/pet/1")
+    assert response.status_code == 200
+
+
+@pytest.mark.faults(route="/pet/{petId}", drip=(16, 0.02))
+async def test_slow_drip_body(petstore_server, faults):
+    """
+    Test a dripped body arrives in small chunks over time and still decodes.
+    """
+    async with server_client(petstore_server) as client:
+        started = time.perf_counter()
+        async with client.stream("GET", "/pet/1") as response:
+            chunks = [chunk async for chunk in response.aiter_raw()]
+        elapsed = time.perf_counter() - started
+    body = b"".join(chunks)
+    assert len(chunks) > 3 and max(len(chunk) for chunk in chunks) <= 32
+    assert elapsed >= (len(body) // 16 - 1) * 0.02
+    assert httpx.Response(200, content=body).json()["id"] == 1
+
+
+@pytest.mark.faults(route="/pet/{petId}", max_rps=20)
+async def test_throughput_cap(petstore_server, faults):
+    """
+    Test concurrent requests beyond the capped rate wait for their turn.
+    """
+    async with server_client(petstore_server) as client:
+        started = time.perf_counter()
+        responses = await asyncio.gather(*(client.get("/pet/1") for _ in range(5)))
+    assert all(response.status_code == 200 for response in responses)
+    assert time.perf_counter() - started >= 4 / 20 * 0.9
+
+
+@pytest.mark.faults(status=500)
+async def test_breaker_opens_on_failing_server(petstore_server, faults):
+    """
+    Test the circuit breaker stops sending requests once the server keeps failing.
+    """
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    async with server_client(petstore_server, resilient=True, retries=0, breaker=breaker) as client:
+        for _ in range(2):
+            assert (await client.get("/pet/1")).status_code == 500
+        with pytest.raises(TargetUnhealthy):
+            await client.get("/pet/1")
+    assert faults.rules[0].fired == 2
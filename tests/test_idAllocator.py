@@ -0,0 +1,46 @@
+from idAllocator import BLOCK_SIZE, IdAllocator, worker_index
+
+
+def test_ids_are_disjoint_across_tests_and_workers():
+    """
+    Test two workers handing out blocks to many tests never issue the same id twice.
+    """
+    seen = set()
+    for worker in (0, 1):
+        allocator = IdAllocator(namespace=1, worker=worker)
+        for test in range(200):
+            ids = allocator.ids_for(f"tests/test_x.py::test_{test}")
+            issued = [ids.next() for _ in range(3)]
+            assert seen.isdisjoint(issued), "an id was issued twice"
+            seen.update(issued)
+
+
+def test_ids_are_stable_for_a_test():
+    """
+    Test a test gets the same ids whichever other tests ran before it.
+    """
+    alone = IdAllocator().ids_for("tests/test_x.py::test_a").next()
+    crowded = IdAllocator()
+    for test in range(50):
+        crowded.ids_for(f"tests/test_x.py::test_{test}").next()
+    assert crowded.ids_for("tests/test_x.py::test_a").next() == alone
+
+
+def test_block_rollover_and_tracking():
+    """
+    Test an owner gets a fresh block when its block runs out and every id is tracked.
+    """
+    allocator = IdAllocator()
+    ids = allocator.ids_for("loadRunner")
+    issued = [ids.next() for _ in range(BLOCK_SIZE + 1)]
+    assert len(set(issued)) == BLOCK_SIZE + 1
+    assert allocator.issued() == {"loadRunner": issued}
+
+
+def test_worker_index_from_environment():
+    """
+    Test the worker index is read from PETSTORE_WORKER_INDEX or the pytest-xdist worker id.
+    """
+    assert worker_index({}) == 0
+    assert worker_index({"PYTEST_XDIST_WORKER": "gw3"}) == 3
+    assert worker_index({"PETSTORE_WORKER_INDEX": "5", "PYTEST_XDIST_WORKER": "gw3"}) == 5
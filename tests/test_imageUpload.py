@@ -0,0 +1,61 @@
+import zlib
+import pytest
+from imageUpload import CHUNK_SIZE, PNG_SIGNATURE, MultipartFileStream, parse_size, run_uploads, upload_image, uploaded_size, write_image
+from petStoreServer import parse_multipart
+
+
+async def test_multipart_stream_round_trips(tmp_path):
+    """
+    Test the streamed body is a multipart body the stand-in parses back into the fields and file.
+    """
+    path = write_image(tmp_path / "cat.png", 300_000)
+    stream = MultipartFileStream(path, fields={"additionalMetadata": "a cat"}, chunk_size=64 * 1024)
+    chunks = [bytes(chunk) async for chunk in stream]
+    body = b"".join(chunks)
+    assert len(chunks) == 2 + 5
+    assert len(body) == int(stream.headers["Content-Length"])
+    assert [bytes(chunk) async for chunk in stream] == chunks, "the body must be sendable more than once"
+    fields = parse_multipart(stream.headers["Content-Type"], body)
+    assert fields["additionalMetadata"] == (None, b"a cat")
+    assert fields["file"] == ("cat.png", path.read_bytes())
+    assert parse_size("1.5MB") == 1572864 and parse_size("512kb") == 524288
+
+
+def test_image_content_does_not_repeat(tmp_path):
+    """
+    Test the image written is the same for a seed, starts with a single PNG signature and has
+    content no block of which repeats, so it does not compress.
+    """
+    content = write_image(tmp_path / "a.png", 3 * CHUNK_SIZE + 100, seed=7).read_bytes()
+    assert len(content) == 3 * CHUNK_SIZE + 100
+    assert content == write_image(tmp_path / "b.png", 3 * CHUNK_SIZE + 100, seed=7).read_bytes()
+    assert content.startswith(PNG_SIGNATURE) and content.count(PNG_SIGNATURE) == 1
+    assert content[:CHUNK_SIZE] != content[CHUNK_SIZE:2 * CHUNK_SIZE]
+    assert len(zlib.compress(content)) > len(content)
+    assert write_image(tmp_path / "c.png", 4).read_bytes() == PNG_SIGNATURE[:4]
+
+
+async def test_upload_image(default_client, mock_post_pet, image_file):
+    """
+    Test POST /pet/{petId}/uploadImage receives the whole file streamed from disk.
+    """
+    response = await default_client.post("/pet", json=mock_post_pet)
+    assert response.status_code == 200
+    response = await upload_image(default_client, mock_post_pet["id"], image_file, metadata="profile picture")
+    assert response.status_code == 200, response.text
+    assert uploaded_size(response) == image_file.stat().st_size
+
+
+async def test_concurrent_uploads_stream_without_copying_files(pytestconfig, tmp_path):
+    """
+    Test concurrent uploads to the stand-in in a child process all arrive, with a throughput
+    reported and a client memory peak far below the bytes sent.
+    """
+    size = parse_size(pytestconfig.getoption("upload_size"))
+    concurrency = pytestconfig.getoption("upload_concurrency")
+    report = await run_uploads(size=size, files=concurrency * 2, concurrency=concurrency, directory=tmp_path)
+    assert report["failures"] == []
+    assert report["bytes_sent"] == size * concurrency * 2
+    assert report["mb_per_s"] > 0
+    # Each upload in flight holds at most a chunk, some transport buffers and its response.
+    assert report["peak_traced_bytes"] < concurrency * (report["chunk_size"] + 256 * 1024) + 1024 * 1024
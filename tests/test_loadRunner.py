@@ -0,0 +1,43 @@
+import pytest
+from loadRunner import format_report, percentile, run_load
+
+
+def test_percentile_nearest_rank():
+    """
+    Test the nearest-rank percentile used for the load report latencies.
+    """
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
+
+
+@pytest.mark.asyncio
+async def test_run_load_replays_scenarios():
+    """
+    Test a short load run against the local stand-in replays every weighted scenario.
+
+    Asserts:
+        Every scenario ran and passed, and each endpoint has latency percentiles.
+    """
+    report = await run_load(target="local", users=4, duration=0.3, seed=7)
+    assert set(report["scenarios"]) == {"get", "post", "put", "delete"}
+    for name, counts in report["scenarios"].items():
+        assert set(counts) == {"passed"}, f"scenario {name} had failures: {counts}"
+    assert report["requests"] > 0
+    for row in report["endpoints"]:
+        assert row["p50_ms"] <= row["p95_ms"] <= row["p99_ms"]
+
+
+@pytest.mark.asyncio
+async def test_rate_paces_requests():
+    """
+    Test `rate` caps the requests per second, not the scenario starts, and the report shows the
+    achieved rate against it.
+    """
+    report = await run_load(target="local", users=4, rate=50, duration=0.6, seed=7)
+    assert report["target_rps"] == 50
+    assert report["requests"] > sum(sum(counts.values()) for counts in report["scenarios"].values())
+    assert 25 <= report["throughput_rps"] <= 55
+    assert "req/s of 50 req/s targeted" in format_report(report)
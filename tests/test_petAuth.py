@@ -0,0 +1,69 @@
+import httpx
+import jwt
+import pytest
+from petAuth import SECRET, BearerAuth, Identity, IdentityPool, TokenCache
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.filterwarnings("ignore:The HMAC key")
+def test_tokens_cached_until_near_expiry():
+    """
+    Test a token is signed once per identity and scope, and signed again within the refresh margin of its exp.
+    """
+    clock = FakeClock()
+    cache = TokenCache(lifetime=600, refresh_margin=60, clock=clock)
+    token = cache.token("alice")
+    assert cache.token("alice") == token
+    assert cache.token("alice", ("read:pets",)) != token
+    assert cache.token("bob") != token
+    claims = jwt.decode(token, SECRET, algorithms=["HS256"], options={"verify_exp": False})
+    assert claims["username"] == "alice" and claims["exp"] - claims["iat"] == 600
+    clock.now += 539
+    assert cache.token("alice") == token
+    clock.now += 2
+    refreshed = cache.token("alice")
+    assert refreshed != token
+    assert (cache.minted, cache.hits) == (4, 2)
+
+
+def test_refresh_margin_shorter_than_lifetime():
+    """
+    Test a cache that would re-sign every token right away is refused.
+    """
+    with pytest.raises(ValueError, match="shorter than the token lifetime"):
+        TokenCache(lifetime=30, refresh_margin=60)
+
+
+@pytest.mark.asyncio
+async def test_bearer_auth_attaches_token():
+    """
+    Test every request gets the bearer token of the identity, unquoted, unless it sets its own.
+    """
+    seen = []
+    transport = httpx.MockTransport(lambda request: seen.append(request.headers["Authorization"]) or httpx.Response(200))
+    auth = BearerAuth(TokenCache(), Identity("alice"))
+    async with httpx.AsyncClient(transport=transport, auth=auth) as client:
+        await client.delete("http://petstore.local/v2/pet/1")
+        await client.get("http://petstore.local/v2/pet/1", headers={"Authorization": "Bearer other"})
+    assert seen == [f"Bearer {auth.token}", "Bearer other"]
+    assert auth.cache.minted == 1
+
+
+def test_identity_pool():
+    """
+    Test a pool of one keeps the default user, and a larger one hands out distinct users in turn
+    and the same one to the same owner.
+    """
+    assert [identity.username for identity in IdentityPool(1).identities] == ["test_user"]
+    pool = IdentityPool(3)
+    assert [pool.next().username for _ in range(4)] == ["test_user_0", "test_user_1", "test_user_2", "test_user_0"]
+    owner = "tests/test_swPetStore_delete.py::test_delete_pet"
+    assert pool.for_owner(owner) is pool.for_owner(owner)
+    assert len({pool.for_owner(f"test_{index}").username for index in range(30)}) == 3
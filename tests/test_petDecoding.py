@@ -0,0 +1,87 @@
+import json
+import httpx
+import pytest
+from petDecoding import JsonArraySplitter, ResponseValidationError, decode_pet, orjson_available, validate_stream
+from petPayloads import pet_payload, pet_payload_without
+
+BACKENDS = ["pydantic"] + (["orjson"] if orjson_available() else [])
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_decode_pet(backend):
+    """
+    Test a valid pet body decodes into a PetResponse on every JSON backend.
+    """
+    pet = decode_pet(json.dumps(pet_payload(7)).encode(), backend)
+    assert pet.id == 7
+    assert pet.tags[0].name == "good"
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_decode_pet_structured_errors(backend):
+    """
+    Test a pet body missing its name and with a string id reports both fields.
+    """
+    body = json.dumps(pet_payload_without("name", "seven")).encode()
+    with pytest.raises(ResponseValidationError) as error:
+        decode_pet(body, backend)
+    assert {item["loc"] for item in error.value.errors} == {("id",), ("name",)}
+    assert "name: Field required" in str(error.value)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_decode_pet_invalid_json(backend):
+    """
+    Test a body that is not JSON fails with a json_invalid error.
+    """
+    with pytest.raises(ResponseValidationError) as error:
+        decode_pet(b"<html>", backend)
+    assert error.value.errors[0]["type"] == "json_invalid"
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64])
+def test_splitter_chunk_boundaries(chunk_size):
+    """
+    Test array elements come out whole wherever the chunks split strings, escapes and nesting.
+    """
+    items = [pet_payload(1, name='say "hi" \\ [or] {not}, ok'), {"nested": [[], {}, [1, [2]]]}, 3, None]
+    body = json.dumps(items).encode()
+    splitter = JsonArraySplitter()
+    elements = []
+    for start in range(0, len(body), chunk_size):
+        elements += splitter.feed(body[start:start + chunk_size])
+    splitter.close()
+    assert [json.loads(element) for element in elements] == items
+
+
+def test_splitter_rejects_non_arrays():
+    """
+    Test an object body and a truncated array are both reported.
+    """
+    with pytest.raises(ValueError):
+        JsonArraySplitter().feed(b'{"id": 1}')
+    splitter = JsonArraySplitter()
+    splitter.feed(b'[{"id": 1}, {"id"')
+    with pytest.raises(ValueError):
+        splitter.close()
+
+
+@pytest.mark.asyncio
+async def test_validate_stream_aggregates():
+    """
+    Test a streamed list is counted per status with invalid items reported by index.
+    """
+    items = [pet_payload(i, status="pending") for i in range(5)] + [pet_payload_without("name", 9), pet_payload(10)]
+    body = json.dumps(items).encode()
+    chunks = [body[start:start + 50] for start in range(0, len(body), 50)]
+    response = httpx.Response(200, content=iter_chunks(chunks))
+    stats = await validate_stream(response, max_errors=1)
+    assert (stats.count, stats.invalid) == (7, 1)
+    assert stats.by_status == {"pending": 5, "sold": 1}
+    assert stats.errors[0][0] == 5
+    assert stats.errors[0][1].errors[0]["loc"] == ("name",)
+
+
+async def iter_chunks(chunks):
+    for chunk in chunks:
+        yield chunk
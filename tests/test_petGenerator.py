@@ -0,0 +1,68 @@
+from itertools import islice
+import pytest
+from petGenerator import PayloadGenerator, PropertyFailure, check_property, shrink
+from petModel import PetResponse
+from petStoreServer import validate_pet
+
+
+def test_same_seed_same_cases():
+    """
+    Test a seed reproduces its cases, in a stream or one at a time, and another seed differs.
+    """
+    first = [case.payload for case in PayloadGenerator(seed=7).invalid_cases(20)]
+    assert first == [case.payload for case in PayloadGenerator(seed=7).invalid_cases(20)]
+    assert first[13] == PayloadGenerator(seed=7).case(13, valid=False).payload
+    assert first != [case.payload for case in PayloadGenerator(seed=8).invalid_cases(20)]
+
+
+def test_cases_are_lazy():
+    """
+    Test an unbounded stream only builds the cases that are consumed.
+    """
+    cases = list(islice(PayloadGenerator().valid_cases(), 5))
+    assert [case.index for case in cases] == [0, 1, 2, 3, 4]
+
+
+def test_valid_and_invalid_cases_match_the_models():
+    """
+    Test valid cases pass the model and the Petstore validation and invalid ones fail the latter.
+    """
+    generator = PayloadGenerator(seed="models")
+    for case in generator.valid_cases(500):
+        PetResponse.model_validate(case.payload)
+        validate_pet(case.payload)
+    for case in generator.invalid_cases(500):
+        assert not generator.conforms(case.payload), case
+        with pytest.raises(ValueError):
+            validate_pet(case.payload)
+    kinds = {mutation[0] for mutation in generator.mutations}
+    assert kinds == {"missing", "type", "choice"}
+
+
+@pytest.mark.asyncio
+async def test_shrink_to_minimal_example():
+    """
+    Test a failing payload shrinks to the smallest one that still fails.
+    """
+    payload = PayloadGenerator(seed=1).case(0).payload
+    payload["tags"] = [{"id": 40, "name": "long tag name"}, {"id": 3, "name": "x"}]
+    minimal = await shrink(payload, lambda candidate: any(tag.get("id", 0) > 2 for tag in candidate.get("tags", [])))
+    assert minimal == {"tags": [{"id": 3}]}
+
+
+@pytest.mark.asyncio
+async def test_check_property_reports_shrunk_failure():
+    """
+    Test a failing property reports the seed, the case and a minimal payload that is still valid.
+    """
+    generator = PayloadGenerator(seed=5)
+
+    async def short_names(case):
+        assert len(case.payload["name"]) < 3, "name too long"
+
+    with pytest.raises(PropertyFailure) as failure:
+        await check_property(generator, generator.valid_cases(), short_names)
+    assert failure.value.seed == 5
+    assert len(failure.value.minimal["name"]) == 3
+    assert set(failure.value.minimal) == {"name", "photoUrls"}
+    assert "minimal payload" in str(failure.value)
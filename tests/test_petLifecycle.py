@@ -0,0 +1,54 @@
+import httpx
+import pytest
+from petLifecycle import ALL_OPERATIONS, AppDriver, ClientDriver, LifecycleEngine, SequenceFailure
+from petStoreServer import PetStore
+
+
+class ForgetfulStore(PetStore):
+    """Store with a planted bug: deleting a sold pet leaves it in place."""
+
+    def delete_pet(self, pet_id):
+        pet = self.pets.get(pet_id)
+        if pet is not None and pet["status"] == "sold":
+            return pet
+        return super().delete_pet(pet_id)
+
+
+@pytest.mark.asyncio
+async def test_lifecycle_sequences(pytestconfig):
+    """
+    Test random post/put/get/delete/findByStatus interleavings keep the stand-in consistent with the model.
+    """
+    engine = LifecycleEngine(AppDriver(), seed=pytestconfig.getoption("payload_seed"), operations=ALL_OPERATIONS)
+    assert await engine.check(500) == 500 * engine.length
+
+
+@pytest.mark.asyncio
+async def test_failing_sequence_is_shrunk():
+    """
+    Test a consistency bug is reported with the shortest sequence reproducing it.
+    """
+    engine = LifecycleEngine(AppDriver(lambda: ForgetfulStore(seed=False)), seed=0)
+    with pytest.raises(SequenceFailure) as failure:
+        await engine.check(100)
+    minimal = failure.value.minimal
+    assert len(minimal) < len(failure.value.steps)
+    assert "delete" in [step.operation for step in minimal]
+    assert await engine.run(minimal) is not None
+    for index in range(len(minimal)):
+        assert await engine.run(minimal[:index] + minimal[index + 1:]) is None, "a step could still be removed"
+    assert f"minimal sequence of {len(minimal)} steps" in str(failure.value)
+
+
+@pytest.mark.asyncio
+async def test_lifecycle_over_http(petstore_server, pet_ids):
+    """
+    Test a few lifecycle sequences over real HTTP connections to the socket-served stand-in,
+    with new pet ids every run.
+
+    The sequences create, update and delete sixty times; they go to the stand-in rather than
+    the configured target so a plain run does not put them on the public Petstore.
+    """
+    async with httpx.AsyncClient(base_url=petstore_server.base_url) as client:
+        engine = LifecycleEngine(ClientDriver(client, pet_ids), seed="http", length=12)
+        assert await engine.check(5) == 60
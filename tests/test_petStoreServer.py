@@ -0,0 +1,32 @@
+from petPayloads import order_payload, pet_payload
+from petStoreServer import PetStore, parse_multipart
+
+
+def test_multipart_content_keeps_its_line_breaks():
+    """
+    Test the content of a part keeps the CR and LF bytes at its edges, only the framing is removed.
+    """
+    body = (b"--b0undary\r\n"
+            b'Content-Disposition: form-data; name="additionalMetadata"\r\n\r\n'
+            b"notes\r\n"
+            b"--b0undary\r\n"
+            b'Content-Disposition: form-data; name="file"; filename="image.bin"\r\n'
+            b"Content-Type: application/octet-stream\r\n\r\n"
+            b"\r\nabc\n\r\n"
+            b"--b0undary--\r\n")
+    fields = parse_multipart("multipart/form-data; boundary=b0undary", body)
+    assert fields["additionalMetadata"] == (None, b"notes")
+    assert fields["file"] == ("image.bin", b"\r\nabc\n")
+
+
+def test_inventory_counts_pets_by_status_only():
+    """
+    Test the inventory counts the pets of every status, and placed orders add nothing to it.
+    """
+    store = PetStore(seed=False)
+    for pet_id, status in enumerate(["available", "available", "sold"], start=1):
+        store.put_pet(pet_payload(pet_id, status=status))
+    store.orders[1] = order_payload(1, pet_id=1, quantity=5)
+    assert store.inventory() == {"available": 2, "sold": 1}
+    store.delete_pet(3)
+    assert store.inventory() == {"available": 2}
@@ -0,0 +1,88 @@
+import httpx
+import pytest
+from requestTiming import TimingLog, annotate_html_report, marker_budget, parse_marker_budgets, percentile
+
+
+def timed_client(log, nodeid, markers=()):
+    # Streamed like the body of a real response, which the timing waits for.
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=httpx.ByteStream(b'{"id": 1}')))
+    return httpx.AsyncClient(base_url="http://petstore.local/v2", transport=transport,
+                             event_hooks=log.event_hooks(nodeid, list(markers)))
+
+
+def set_totals(timings, *totals_ms):
+    for timing, total_ms in zip(timings, totals_ms):
+        timing.total_ms = total_ms
+
+
+@pytest.mark.asyncio
+async def test_requests_are_attributed_to_their_test():
+    """
+    Test every request is recorded once, under the test whose client sent it, with its route.
+    """
+    log = TimingLog()
+    async with timed_client(log, "t.py::test_a", ["get"]) as first, timed_client(log, "t.py::test_b") as second:
+        await first.get("/pet/1")
+        await second.post("/pet", json={"id": 1})
+        await first.get("/pet/2")
+    assert [timing.route for timing in log.for_test("t.py::test_a")] == ["/pet/{petId}", "/pet/{petId}"]
+    assert [timing.method for timing in log.for_test("t.py::test_b")] == ["POST"]
+    assert log.for_test("t.py::test_c") == []
+    assert len(log.records) == 3
+    assert all(timing.status == 200 and timing.total_ms >= timing.ttfb_ms for timing in log.records)
+    assert log.records[0].markers == ["get"]
+
+
+@pytest.mark.asyncio
+async def test_p95_budgets_pass_and_fail():
+    """
+    Test a test or marker budget is only violated when the p95 of its requests is over it.
+    """
+    log = TimingLog(parse_marker_budgets(["get = 50", " ", "post=5"]))
+    async with timed_client(log, "t.py::test_a", ["get"]) as client:
+        for _ in range(20):
+            await client.get("/pet/1")
+    async with timed_client(log, "t.py::test_b", ["post"]) as client:
+        await client.post("/pet", json={"id": 1})
+    set_totals(log.for_test("t.py::test_a"), *[10.0] * 19, 200.0)
+    set_totals(log.for_test("t.py::test_b"), 8.0)
+    log.test_budgets = {"t.py::test_a": 20.0, "t.py::test_b": 10.0}
+    assert log.p95(log.for_test("t.py::test_a")) == 10.0
+    assert log.budget_violations() == ["@post requests: p95 8.0ms over budget 5ms"]
+
+    set_totals(log.for_test("t.py::test_a"), *[10.0] * 18, 200.0, 200.0)
+    assert log.budget_violations() == [
+        "t.py::test_a: p95 200.0ms over budget 20ms",
+        "@get requests: p95 200.0ms over budget 50ms",
+        "@post requests: p95 8.0ms over budget 5ms",
+    ]
+    assert percentile([], 95) == 0.0
+
+
+def test_marker_budget_is_validated():
+    """
+    Test the budget of a `latency_budget` marker is read by keyword or position, and a missing
+    or non-numeric one is refused.
+    """
+    assert marker_budget(pytest.mark.latency_budget(p95_ms=500).mark) == 500.0
+    assert marker_budget(pytest.mark.latency_budget("250").mark) == 250.0
+    for marker in (pytest.mark.latency_budget, pytest.mark.latency_budget(p95_ms="fast"),
+                   pytest.mark.latency_budget(1, p95_ms=2), pytest.mark.latency_budget(p95=2)):
+        with pytest.raises(ValueError, match="latency_budget"):
+            marker_budget(marker.mark)
+
+
+@pytest.mark.asyncio
+async def test_timings_are_added_to_the_html_report_row(monkeypatch):
+    """
+    Test the timings of a test are appended to the message pytest-html-reporter shows in its row.
+    """
+    plugin = pytest.importorskip("pytest_html_reporter.plugin")
+    log = TimingLog()
+    async with timed_client(log, "t.py::test_a") as client:
+        await client.get("/pet/1")
+    monkeypatch.setattr(plugin, "_current_error", "AssertionError\n", raising=False)
+    annotate_html_report(log.for_test("t.py::test_a"))
+    first, second = plugin._current_error.split("\n")
+    assert first == "AssertionError"
+    assert second.startswith("GET /pet/{petId} 200 ttfb ")
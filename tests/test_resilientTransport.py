@@ -0,0 +1,185 @@
+import asyncio
+import email.utils
+import time
+import httpx
+import pytest
+from resilientTransport import (CircuitBreaker, ResilienceStats, ResilientTransport, TargetUnhealthy, TokenBucket,
+                                retry_after)
+from waitUntil import Backoff
+
+FAST = Backoff(initial=0.001, maximum=0.001)
+
+
+def scripted(*answers):
+    """Mock target answering the scripted statuses or raising the scripted errors, in order."""
+    calls = []
+
+    def handler(request):
+        answer = answers[min(len(calls), len(answers) - 1)]
+        calls.append(request.method)
+        if isinstance(answer, Exception):
+            raise answer
+        status, headers = answer if isinstance(answer, tuple) else (answer, {})
+        return httpx.Response(status, headers=headers, json={})
+
+    return httpx.MockTransport(handler), calls
+
+
+def resilient_client(transport, **options):
+    return httpx.AsyncClient(base_url="http://petstore.local/v2",
+                             transport=ResilientTransport(transport, backoff=FAST, **options))
+
+
+@pytest.mark.asyncio
+async def test_idempotent_requests_are_retried():
+    """
+    Test a GET is retried through a 503 and a reset connection, and the retries are counted.
+    """
+    transport, calls = scripted(503, httpx.ReadError("reset"), 200)
+    stats = ResilienceStats()
+    async with resilient_client(transport, retries=2, stats=stats) as client:
+        response = await client.get("/pet/1")
+    assert response.status_code == 200
+    assert len(calls) == 3
+    assert stats.retries == {"status 503": 1, "ReadError": 1}
+
+
+@pytest.mark.asyncio
+async def test_post_only_retried_when_not_processed():
+    """
+    Test a POST is not retried after a 503 or a read error, but is after a 429 and a connect error.
+    """
+    for answers, expected_calls in [((503, 200), 1), ((429, 200), 2), ((httpx.ConnectError("refused"), 200), 2)]:
+        transport, calls = scripted(*answers)
+        async with resilient_client(transport, retries=2) as client:
+            await client.post("/pet", json={"id": 1})
+        assert len(calls) == expected_calls, answers
+    transport, calls = scripted(httpx.ReadError("reset"), 200)
+    async with resilient_client(transport, retries=2) as client:
+        with pytest.raises(httpx.ReadError):
+            await client.post("/pet", json={"id": 1})
+
+
+@pytest.mark.asyncio
+async def test_retry_after_is_followed():
+    """
+    Test a 429 with Retry-After waits as asked and counts it as throttled time, while a too long
+    Retry-After is handed back to the test.
+    """
+    transport, calls = scripted((429, {"Retry-After": "0.05"}), 200)
+    stats = ResilienceStats()
+    async with resilient_client(transport, stats=stats) as client:
+        started = time.perf_counter()
+        assert (await client.get("/store/inventory")).status_code == 200
+    assert time.perf_counter() - started >= 0.05
+    assert stats.throttled == pytest.approx(0.05)
+
+    transport, calls = scripted((429, {"Retry-After": "120"}), 200)
+    async with resilient_client(transport, max_retry_after=30) as client:
+        assert (await client.get("/store/inventory")).status_code == 429
+    date = email.utils.formatdate(1000 + 7, usegmt=True)
+    assert retry_after(httpx.Response(429, headers={"Retry-After": date}), now=1000) == 7
+
+
+@pytest.mark.asyncio
+async def test_breaker_fails_fast_and_recovers():
+    """
+    Test consecutive failures open the breaker, requests then fail without reaching the target,
+    and a successful probe after the cooldown closes it.
+    """
+    transport, calls = scripted(httpx.ConnectError("down"), httpx.ConnectError("down"), 200)
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+    stats = ResilienceStats()
+    async with resilient_client(transport, retries=0, breaker=breaker, stats=stats) as client:
+        for _ in range(2):
+            with pytest.raises(httpx.ConnectError):
+                await client.get("/pet/1")
+        with pytest.raises(TargetUnhealthy, match="target unhealthy"):
+            await client.get("/pet/1")
+        assert len(calls) == 2
+        time.sleep(0.06)
+        assert (await client.get("/pet/1")).status_code == 200
+    assert not breaker.open
+    assert (breaker.trips, stats.failed_fast) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_breaker_probe_answered_with_a_server_error_reopens_it():
+    """
+    Test a probe answered with a 5xx opens the breaker again, so the requests after it fail fast
+    instead of reaching the target, and one answered with a 429 leaves the probing to the next.
+    """
+    transport, calls = scripted(503, 503, 503)
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    stats = ResilienceStats()
+    async with resilient_client(transport, retries=0, breaker=breaker, stats=stats) as client:
+        assert (await client.get("/pet/1")).status_code == 503
+        time.sleep(0.06)
+        assert (await client.get("/pet/1")).status_code == 503
+        for _ in range(5):
+            with pytest.raises(TargetUnhealthy):
+                await client.get("/pet/1")
+    assert breaker.open and not breaker.probing
+    assert (len(calls), breaker.trips, stats.failed_fast) == (2, 2, 5)
+
+    transport, calls = scripted(429, 200)
+    async with resilient_client(transport, retries=0, breaker=breaker) as client:
+        time.sleep(0.06)
+        assert (await client.get("/pet/1")).status_code == 429
+        assert breaker.open and not breaker.probing
+        assert (await client.get("/pet/1")).status_code == 200
+    assert not breaker.open
+
+
+@pytest.mark.asyncio
+async def test_breaker_probe_cancelled_or_broken_lets_the_next_request_probe():
+    """
+    Test a probe that is cancelled, or fails with an error the breaker does not count, does not
+    leave the breaker failing fast: the next request after the cooldown probes again.
+    """
+    gate = asyncio.Event()
+
+    async def hanging(request):
+        await gate.wait()
+        return httpx.Response(200)
+
+    breaker = CircuitBreaker(threshold=1, cooldown=0.0)
+    breaker.record("ConnectError")
+    async with resilient_client(httpx.MockTransport(hanging), retries=0, breaker=breaker) as client:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.get("/pet/1"), 0.01)
+    assert breaker.open and not breaker.probing
+
+    transport, calls = scripted(RuntimeError("bug"), 200)
+    async with resilient_client(transport, retries=0, breaker=breaker) as client:
+        with pytest.raises(RuntimeError):
+            await client.get("/pet/1")
+        assert not breaker.probing
+        assert (await client.get("/pet/1")).status_code == 200
+    assert not breaker.open
+
+
+@pytest.mark.asyncio
+async def test_throttling_does_not_reset_the_breaker():
+    """
+    Test a 429 between failures neither counts as a failure nor resets the consecutive failures.
+    """
+    transport, calls = scripted(503, 429, 503, 200)
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    async with resilient_client(transport, retries=0, breaker=breaker) as client:
+        for expected in (503, 429, 503):
+            assert (await client.get("/pet/1")).status_code == expected
+        with pytest.raises(TargetUnhealthy):
+            await client.get("/pet/1")
+    assert breaker.trips == 1
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_spaces_requests():
+    """
+    Test requests beyond the burst wait for tokens at the bucket's rate.
+    """
+    bucket = TokenBucket(rate=100, burst=2)
+    waited = [await bucket.acquire() for _ in range(6)]
+    assert waited[:2] == [0.0, 0.0]
+    assert sum(waited) == pytest.approx(0.04, abs=0.015)
@@ -0,0 +1,93 @@
+import httpx
+import pytest
+from clientPool import LOCAL_BASE_URL
+from petPayloads import pet_payload
+from petStoreServer import PetStoreApp
+from resourceTracker import ResourceTracker
+
+
+def tracked_client(app, tracker, nodeid="test"):
+    return httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=httpx.ASGITransport(app),
+                             event_hooks=tracker.event_hooks(nodeid))
+
+
+@pytest.mark.asyncio
+async def test_created_resources_are_removed_in_one_batch():
+    """
+    Test pets, orders and users created through a tracked client are all deleted by the cleanup,
+    except those the test already deleted itself.
+    """
+    app = PetStoreApp()
+    tracker = ResourceTracker(concurrency=4, rate=0)
+    async with tracked_client(app, tracker) as client:
+        for pet_id in range(500, 510):
+            await client.post("/pet", json=pet_payload(pet_id))
+        await client.delete("/pet/500")
+        await client.post("/pet", json=pet_payload(510, status="vendido"))
+        order = await client.post("/store/order", json={"id": 7, "petId": 501, "quantity": 1, "status": "placed"})
+        await client.post("/user/createWithList", json=[{"username": "ann"}, {"username": "bob"}])
+        assert order.status_code == 200
+        assert len(tracker.resources) == 9 + 1 + 2
+
+        assert await tracker.cleanup(client) == []
+    assert tracker.removed == 12
+    assert set(app.store.pets) == {1}
+    assert not app.store.orders and not app.store.users
+
+
+class Unread(httpx.AsyncBaseTransport):
+    """Answers in order without reading the request body, as a transport streaming it to the target."""
+
+    def __init__(self, *answers):
+        self.answers = iter(answers)
+
+    async def handle_async_request(self, request):
+        return next(self.answers)
+
+
+@pytest.mark.asyncio
+async def test_creations_answered_without_an_id_are_not_tracked():
+    """
+    Test a successful creation answering without an id, or without JSON, passes through the hook
+    untracked instead of failing the request.
+    """
+    tracker = ResourceTracker()
+    transport = Unread(httpx.Response(200, json={"message": "ok"}), httpx.Response(200, text="created"))
+    async with httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=transport,
+                                 event_hooks=tracker.event_hooks("test")) as client:
+        assert (await client.post("/pet", json=pet_payload(1))).status_code == 200
+        assert (await client.post("/store/order", json={"id": 1})).status_code == 200
+    assert tracker.resources == {}
+
+
+@pytest.mark.asyncio
+async def test_streamed_user_creations_are_not_tracked():
+    """
+    Test a user creation whose body was streamed, and so cannot be read back, is left untracked.
+    """
+    tracker = ResourceTracker()
+
+    async def streamed():
+        yield b'[{"username": "ann"}]'
+
+    async with httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=Unread(httpx.Response(200, json={"message": "ok"})),
+                                 event_hooks=tracker.event_hooks("test")) as client:
+        assert (await client.post("/user/createWithArray", content=streamed())).status_code == 200
+    assert tracker.resources == {}
+
+
+@pytest.mark.asyncio
+async def test_cleanup_reports_what_it_could_not_remove():
+    """
+    Test a resource whose delete fails is reported with the test that created it.
+    """
+    tracker = ResourceTracker()
+    tracker.track("pet", 77, "tests/test_x.py::test_y")
+
+    def refuse(request):
+        return httpx.Response(500, json={"message": "busy"})
+
+    async with httpx.AsyncClient(base_url=LOCAL_BASE_URL, transport=httpx.MockTransport(refuse)) as client:
+        failures = await tracker.cleanup(client)
+    assert failures == [("pet", "77", "tests/test_x.py::test_y", "status 500")]
+    assert "removed 0 of 1" in tracker.summary()
@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+import sys
+import xml.etree.ElementTree as ElementTree
+from io import StringIO
+from pathlib import Path
+from resultLog import LogReader, render_html, render_junit
+
+TESTS = Path(__file__).parent
+SAMPLE = """
+import pytest
+
+@pytest.fixture
+def broken():
+    raise RuntimeError("setup failed")
+
+def test_passes(record_property):
+    record_property("requests", [{"method": "GET", "route": "/pet/{petId}", "status": 200, "total_ms": 1.5}])
+
+def test_fails():
+    assert 1 == 2
+
+def test_errors(broken):
+    pass
+
+@pytest.mark.skip(reason="not today")
+def test_skipped():
+    pass
+
+@pytest.mark.xfail(reason="known")
+def test_xfails():
+    assert False
+"""
+
+
+def run_sample(tmp_path, log):
+    (tmp_path / "test_sample.py").write_text(SAMPLE)
+    environment = {**os.environ, "PYTHONPATH": str(TESTS)}
+    return subprocess.run(
+        [sys.executable, "-m", "pytest", "-q", "-p", "resultLog", "-p", "no:cacheprovider", "-p", "no:reporter",
+         f"--result-log={log}", str(tmp_path / "test_sample.py")],
+        cwd=tmp_path, env=environment, capture_output=True, text=True,
+    )
+
+
+def test_results_are_logged_and_rendered(tmp_path):
+    """
+    Test every test gets one record with its outcome and requests, and the JUnit report counts them.
+    """
+    log = tmp_path / "results.ndjson"
+    run_sample(tmp_path, log)
+    records = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [record["type"] for record in records] == ["session"] + ["test"] * 5 + ["summary"]
+    outcomes = {record["nodeid"].rpartition("::")[2]: record for record in records[1:-1]}
+    assert {name: record["outcome"] for name, record in outcomes.items()} == {
+        "test_passes": "passed", "test_fails": "failed", "test_errors": "error",
+        "test_skipped": "skipped", "test_xfails": "xfailed",
+    }
+    assert outcomes["test_passes"]["requests"][0]["route"] == "/pet/{petId}"
+    assert "assert 1 == 2" in outcomes["test_fails"]["longrepr"]
+    assert records[-1]["counts"]["passed"] == 1
+
+    output = StringIO()
+    render_junit([log], output)
+    suite = ElementTree.fromstring(output.getvalue())[0]
+    assert suite.attrib["name"] == "pytest"
+    assert (suite.attrib["tests"], suite.attrib["failures"], suite.attrib["errors"], suite.attrib["skipped"]) == (
+        "5", "1", "1", "2")
+    passed = suite.find("testcase[@name='test_passes']")
+    assert "GET /pet/{petId} 200 1.5ms" in passed.find("system-out").text
+
+
+def test_partial_log_renders(tmp_path):
+    """
+    Test a log cut short by a crash, without its summary and with a torn last line, still renders as partial.
+    """
+    log = tmp_path / "results.ndjson"
+    run_sample(tmp_path, log)
+    lines = log.read_text().splitlines()
+    log.write_text("\n".join(lines[:3]) + "\n" + lines[3][:20])
+    reader = LogReader([log])
+    assert len(list(reader.results())) == 2
+    assert reader.damaged == 1 and not reader.finished
+
+    output = StringIO()
+    render_html([log], output)
+    assert "Partial report" in output.getvalue()
+    assert "1 damaged line(s)" in output.getvalue()
+    output = StringIO()
+    render_junit([log], output)
+    assert ElementTree.fromstring(output.getvalue())[0].attrib["name"] == "pytest (partial)"
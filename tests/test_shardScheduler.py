@@ -0,0 +1,95 @@
+import subprocess
+import sys
+from io import StringIO
+from pathlib import Path
+from resultLog import LogReader, Totals, render_junit
+from shardScheduler import coordinate, estimate_units, load_durations, merge_durations, plan_shards, save_durations
+
+ROOT = Path(__file__).parent.parent
+SAMPLE = """
+import pytest
+
+@pytest.mark.parametrize("case", range(4))
+def test_passes(case):
+    pass
+
+def test_fails():
+    assert False
+"""
+
+
+def test_plan_shards_balances_durations():
+    """
+    Test shards planned longest first end up within one unit of each other and keep every unit.
+    """
+    units = {f"tests/test_a.py::test_{n}": seconds for n, seconds in enumerate([8, 7, 6, 5, 4, 3, 2, 2, 1, 1])}
+    shards = plan_shards(units, 3)
+    assert sorted(unit for _, members in shards for unit in members) == sorted(units)
+    totals = [total for total, _ in shards]
+    assert max(totals) - min(totals) <= 1
+    assert plan_shards(dict(reversed(list(units.items()))), 3) == shards, "plans differ by input order"
+
+
+def test_parametrized_cases_stay_in_one_unit():
+    """
+    Test the cases of a parametrized test are estimated together, unknown ones at the median.
+    """
+    history = {"t.py::test_a[1]": 1.0, "t.py::test_a[2]": 3.0, "t.py::test_b": 2.0}
+    units = estimate_units(["t.py::test_a[1]", "t.py::test_a[2]", "t.py::test_a[3]", "t.py::test_b"], history)
+    assert units == {"t.py::test_a": 6.0, "t.py::test_b": 2.0}
+
+
+def test_history_merge_and_round_trip(tmp_path):
+    """
+    Test measurements blend into the history and survive a save and load, a broken file reads as empty.
+    """
+    path = tmp_path / "durations.json"
+    save_durations(path, merge_durations({"t::a": 2.0}, {"t::a": 4.0, "t::b": 1.0}))
+    assert load_durations(path) == {"t::a": 3.0, "t::b": 1.0}
+    path.write_text("{not json")
+    assert load_durations(path) == {}
+
+
+async def test_coordinator_runs_workers(tmp_path):
+    """
+    Test two workers pulling from the coordinator run every test once and the history is merged.
+    """
+    history = tmp_path / "durations.json"
+    code = await coordinate(2, [str(ROOT / "tests" / "test_idAllocator.py"), "-p", "no:cacheprovider"], history, tmp_path)
+    assert code == 0
+    durations = load_durations(history)
+    assert len(durations) == 4
+    assert all(nodeid.startswith("tests/test_idAllocator.py::") for nodeid in durations)
+    logs = [(tmp_path / f"worker-{index}.log").read_text() for index in range(2)]
+    assert sum(log.count(" PASSED") for log in logs) == 4
+
+
+async def test_sharded_runs_log_each_result_once(tmp_path, monkeypatch):
+    """
+    Test the result log of a sharded run is started afresh and holds each result and collection
+    error once, so a second run renders the same totals as a single unsharded one.
+    """
+    (tmp_path / "test_sample.py").write_text(SAMPLE)
+    (tmp_path / "test_broken.py").write_text("import missing_module\n")
+    monkeypatch.setenv("PYTHONPATH", str(ROOT / "tests"))
+    arguments = [str(tmp_path / "test_sample.py"), str(tmp_path / "test_broken.py"), "-p", "shardScheduler",
+                 "-p", "resultLog", "-p", "no:cacheprovider", "--continue-on-collection-errors"]
+    single = tmp_path / "single.ndjson"
+    subprocess.run([sys.executable, "-m", "pytest", *arguments, "-p", "no:reporter", f"--result-log={single}"],
+                   cwd=tmp_path, capture_output=True, check=False)
+    expected = Totals(LogReader([single])).counts
+    assert (expected["passed"], expected["failed"], expected["error"]) == (4, 1, 1)
+
+    sharded = tmp_path / "sharded.ndjson"
+    for _ in range(2):
+        code = await coordinate(2, [*arguments, f"--result-log={sharded}"], tmp_path / "durations.json",
+                                tmp_path / "workers")
+        assert code == 1
+    reader = LogReader([sharded])
+    assert Totals(reader).counts == expected and reader.finished
+    records = list(reader)
+    assert [record["type"] for record in records].count("session") == 1
+    assert records[-1]["counts"] == expected and records[-1]["exitstatus"] == 1
+    output = StringIO()
+    render_junit([sharded], output)
+    assert 'tests="6" failures="1" errors="1"' in output.getvalue()
@@ -0,0 +1,96 @@
+import json
+import tracemalloc
+import pytest
+import loadRunner
+from soakRunner import Sampler, detect_growth, kendall_tau, run_soak
+
+
+async def post_and_wait(mock_post_pet, eventually):
+    """A scenario's bookkeeping without its requests: an id drawn and a wait recorded."""
+
+    async def probe():
+        return mock_post_pet["id"]
+
+    await eventually(probe, lambda value: value > 0, label="posted")
+
+
+def series(metric, values, step=1.0):
+    return [{"t": index * step, metric: value} for index, value in enumerate(values)]
+
+
+def test_growth_detection():
+    """
+    Test steady growth is flagged while noise, small growth and the warm-up are not.
+    """
+    assert kendall_tau([1, 2, 3, 4]) == 1.0
+    assert kendall_tau([4, 3, 2, 1]) == -1.0
+    creeping = series("fds", [10, 11, 11, 13, 14, 14, 16, 18])
+    assert detect_growth(creeping)["fds"]["growth"] == 8
+    noisy = series("fds", [10, 16, 9, 15, 11, 16, 10, 14])
+    assert detect_growth(noisy) == {}
+    small = series("fds", [10, 11, 12, 13])
+    assert detect_growth(small) == {}
+    warming_up = series("fds", [0, 10, 20, 30, 30, 31, 30, 30, 31])
+    assert "fds" in detect_growth(warming_up)
+    assert detect_growth(warming_up, warmup=3) == {}
+
+
+@pytest.mark.asyncio
+async def test_sampler_catches_leaked_file_descriptors(tmp_path):
+    """
+    Test files opened and never closed between samples show up as steady fd growth.
+    """
+    sampler = Sampler()
+    sampler.start()
+    leaked = []
+    samples = []
+    try:
+        for index in range(6):
+            leaked += [open(tmp_path / f"leak-{index}-{count}", "w") for count in range(3)]
+            samples.append(sampler.sample())
+    finally:
+        await sampler.stop()
+        for file in leaked:
+            file.close()
+    assert samples[-1]["fds"] - samples[0]["fds"] == 15
+    assert set(detect_growth(samples)) == {"fds"}
+
+
+@pytest.mark.asyncio
+async def test_workload_bookkeeping_stays_flat(monkeypatch):
+    """
+    Test the ids and waits a soak loop draws from its workload do not add up, so the harness's
+    own bookkeeping never shows as memory growth.
+    """
+    monkeypatch.setattr(loadRunner, "WAITS_KEPT", 1000)
+    workload = loadRunner.Workload(seed=1)
+
+    async def iterate(times):
+        for _ in range(times):
+            await post_and_wait(**workload.arguments(post_and_wait, None))
+
+    tracemalloc.start()
+    try:
+        await iterate(1000)
+        before, _ = tracemalloc.get_traced_memory()
+        await iterate(10_000)
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert after - before < 64 * 1024, f"{(after - before) / 10_000:.1f}B per iteration"
+    assert workload.ids.issued == [] and len(workload.convergence.records) == 1000
+
+
+@pytest.mark.asyncio
+async def test_soak_run_against_stand_in_process(tmp_path):
+    """
+    Test a short soak run loops the scenarios over real connections and writes its time series.
+    """
+    path = tmp_path / "soak.ndjson"
+    report = await run_soak(users=2, duration=1.0, interval=0.2, seed=3, series=str(path))
+    for name, counts in report["scenarios"].items():
+        assert set(counts) == {"passed"}, f"scenario {name} had failures: {counts}"
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == len(report["samples"]) >= 3
+    assert lines[-1]["iterations"] > 0 and lines[-1]["open_clients"] == 0
+    assert max(sample["pool_connections"] for sample in lines) >= 1
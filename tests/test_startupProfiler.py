@@ -0,0 +1,60 @@
+import subprocess
+import sys
+from pathlib import Path
+from startupProfiler import ImportTimer, StartupProfiler
+
+TESTS = Path(__file__).parent
+# Modules the plugins must only import once a hook or fixture needs them.
+LAZY_MODULES = ("httpx", "jwt", "pydantic", "cassette", "petAuth", "petStoreServer", "clientPool", "requestTiming",
+                "resourceTracker")
+
+
+def test_import_timer_splits_self_and_cumulative(tmp_path, monkeypatch):
+    """
+    Test a module's cumulative import time includes the modules it imports and its self time does not.
+    """
+    (tmp_path / "profiled_outer.py").write_text("import time\nimport profiled_inner\ntime.sleep(0.01)\n")
+    (tmp_path / "profiled_inner.py").write_text("import time\ntime.sleep(0.03)\n")
+    monkeypatch.syspath_prepend(tmp_path)
+    timer = ImportTimer()
+    timer.install()
+    try:
+        import profiled_outer
+    finally:
+        timer.uninstall()
+        sys.modules.pop("profiled_outer", None)
+        sys.modules.pop("profiled_inner", None)
+    outer, outer_self = timer.records["profiled_outer"]
+    inner, inner_self = timer.records["profiled_inner"]
+    assert inner >= 0.03 and inner_self == inner
+    assert outer >= inner + 0.01
+    assert 0.01 <= outer_self < outer - 0.02
+    assert profiled_outer.__loader__ is profiled_outer.__spec__.loader
+    assert type(profiled_outer.__loader__).__name__ != "_TimedLoader"
+    assert [name for name, _ in timer.slowest(1)] == ["profiled_outer"]
+
+
+def test_profiler_report():
+    """
+    Test the report lists the slowest test modules and imports first.
+    """
+    profiler = StartupProfiler(top=1)
+    profiler.modules = {"tests/test_fast.py": 0.01, "tests/test_slow.py": 0.2}
+    profiler.imports.records = {"fast": (0.01, 0.01), "slow": (0.3, 0.1)}
+    lines = profiler.report()
+    assert "tests/test_slow.py" in lines[lines.index("slowest test modules to collect:") + 1]
+    assert lines[-1].endswith("(0.100s)  slow")
+    assert not any("test_fast" in line or line.endswith(" fast") for line in lines)
+
+
+def test_plugins_import_lazily():
+    """
+    Test loading conftest and the fixture plugins imports none of the heavy or target specific modules.
+    """
+    code = (
+        "import sys\n"
+        "import conftest, concurrentCases, contractSpec, petstoreFixtures, resultLog, shardScheduler, startupProfiler\n"
+        f"print(' '.join(name for name in {LAZY_MODULES!r} if name in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=TESTS, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
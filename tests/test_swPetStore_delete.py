@@ -1,11 +1,10 @@
 import pytest
 import httpx
-from test_swPetStore_fixtures import *
 
 
 @pytest.mark.asyncio
 @pytest.mark.delete
-async def test_delete_pet(default_client: httpx.AsyncClient, mock_post_pet, fake_jwt_token):
+async def test_delete_pet(default_client: httpx.AsyncClient, mock_post_pet, fake_jwt_token, eventually):
     """
     Test the deletion of a pet from the store.
     
@@ -13,12 +12,13 @@ async def test_delete_pet(default_client: httpx.AsyncClient, mock_post_pet, fake
     1. Posts a new pet to the store.
     2. Deletes the posted pet using its ID.
     3. Verifies that the deletion was successful.
-    4. Confirms that the pet no longer exists in the store.
+    4. Confirms that the pet no longer exists in the store, once the deletion has propagated.
     
     Args:
         default_client (httpx.AsyncClient): The HTTP client used to make requests to the API.
         mock_post_pet (dict): The mock data for the pet to be posted.
-        fake_jwt_token (str): The fake JWT token for authorization.
+        fake_jwt_token (str): The fake JWT token the client authorizes with.
+        eventually (callable): Polls until a condition holds, see `waitUntil.wait_until`.
     
     Raises:
         pytest.fail: If the response is not in JSON format.
@@ -28,17 +28,17 @@ async def test_delete_pet(default_client: httpx.AsyncClient, mock_post_pet, fake
     response = await default_client.post("/pet/", json=mock_post_pet)
     assert response.status_code == 200
 
-    headers = {"Authorization": f"Bearer '{fake_jwt_token}'"}
     pet_id = mock_post_pet["id"]
-    response = await default_client.delete(f"/pet/{pet_id}", headers=headers )
+    response = await default_client.delete(f"/pet/{pet_id}")
     assert response.status_code == 200
+    assert response.request.headers["Authorization"] == f"Bearer {fake_jwt_token}"
     try:
         data = response.json()
     except ValueError:
         pytest.fail("Response is not in JSON format")
     assert int(data["message"]) == pet_id, "The pet id does not match"
-    response = await default_client.get(f"/pet/{pet_id}")
-    assert response.status_code == 404,"The pet was not deleted"
+    await eventually(lambda: default_client.get(f"/pet/{pet_id}"),
+                     lambda response: response.status_code == 404, label="pet deleted")
 
 
 
@@ -48,9 +48,10 @@ async def test_delete_pet(default_client: httpx.AsyncClient, mock_post_pet, fake
     (-1),
     (None)
 ])
+@pytest.mark.concurrent
 @pytest.mark.asyncio
 @pytest.mark.delete
-async def test_delete_pet_invalid_id(default_client: httpx.AsyncClient, pet_id, fake_jwt_token):
+async def test_delete_pet_invalid_id(default_client: httpx.AsyncClient, pet_id):
     """
     Test the deletion of a pet with invalid IDs using DDT (Data-Driven Tests).
 
@@ -60,22 +61,21 @@ async def test_delete_pet_invalid_id(default_client: httpx.AsyncClient, pet_id,
     Args:
         default_client (httpx.AsyncClient): The HTTP client used to send requests to the API.
         pet_id (int or str or None): The ID of the pet to be deleted. This is parameterized to test various invalid IDs.
-        fake_jwt_token (str): A fake JWT token used for authorization.
 
     Assertions:
         Asserts that the response status code is 400 for invalid pet IDs.
     """
-    headers = {"Authorization": f"Bearer '{fake_jwt_token}'"}
-    response = await default_client.delete(f"/pet/{pet_id}", headers=headers )
+    response = await default_client.delete(f"/pet/{pet_id}")
     assert response.status_code == 400, "the response code must be 400 for invalid ids"
 
 @pytest.mark.parametrize("pet_id", [
     (0),
     (-1)
 ])
+@pytest.mark.concurrent
 @pytest.mark.asyncio
 @pytest.mark.delete
-async def test_delete_pet_not_found(default_client: httpx.AsyncClient, pet_id, fake_jwt_token):
+async def test_delete_pet_not_found(default_client: httpx.AsyncClient, pet_id):
     """
     Test the deletion of a pet that does not exist in the store.
 
@@ -86,11 +86,9 @@ async def test_delete_pet_not_found(default_client: httpx.AsyncClient, pet_id, f
     Args:
         default_client (httpx.AsyncClient): The HTTP client used to send requests to the API.
         pet_id (int): The ID of the pet to be deleted. This is parameterized to test multiple invalid IDs.
-        fake_jwt_token (str): A fake JWT token used for authorization in the request headers.
 
     Assertions:
         Asserts that the response status code is 404, indicating that the pet was not found.
     """
-    headers = {"Authorization": f"Bearer '{fake_jwt_token}'"}
-    response = await default_client.delete(f"/pet/{pet_id}", headers=headers )
+    response = await default_client.delete(f"/pet/{pet_id}")
     assert response.status_code == 404, "the response code must be 404 for pet not found"
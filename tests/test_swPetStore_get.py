@@ -1,8 +1,7 @@
 import pytest
 import httpx
-from test_swPetStore_fixtures import default_client
-from test_swPetStore_fixtures import mock_get_pet
-from petModel import PetResponse
+from petDecoding import decode_pet, validate_stream
+from petPayloads import pet_payload
 
 
 @pytest.mark.asyncio
@@ -15,7 +14,7 @@ async def test_get_pet_by_id_success(default_client: httpx.AsyncClient, mock_get
         mock_get_pet (dict): Mocked data representing the expected response from the API.
 
     Raises:
-        pytest.fail: If the response is not in JSON format.
+        petDecoding.ResponseValidationError: If the response is not JSON or does not have the pet model.
 
     Asserts:
         The response status code matches the expected status (404).
@@ -27,11 +26,7 @@ async def test_get_pet_by_id_success(default_client: httpx.AsyncClient, mock_get
     pet_id = mock_get_pet["id"]
     response = await default_client.get(f"/pet/{pet_id}")
     assert response.status_code == 200
-    try:
-        data = response.json()
-    except ValueError:
-        pytest.fail("Response is not in JSON format")
-    pet_data = PetResponse(**data)
+    pet_data = decode_pet(response)
     assert pet_data.id == mock_get_pet["id"], "pet id does not match"
     assert isinstance(pet_data.photoUrls, list) , "photoUrls must be a list"
     assert isinstance(pet_data.tags, list), "tags do not match"
@@ -47,6 +42,7 @@ Fixture to define the data for test_get_pet_by_id_pet_not_found function in DDT
     (999999999, 404)
 ])
 
+@pytest.mark.concurrent
 @pytest.mark.asyncio
 async def test_get_pet_by_id_pet_not_found(pet_id, expected_status, default_client: httpx.AsyncClient):
     """
@@ -87,6 +83,7 @@ Fixture to define the data for test_get_pet_by_id_pet_invalid_input function in
     ("number", 404),
     ( None, 404)
 ])
+@pytest.mark.concurrent
 @pytest.mark.asyncio
 async def test_get_pet_by_id_pet_invalid_input(pet_id, expected_status, default_client: httpx.AsyncClient):
     """
@@ -107,3 +104,27 @@ async def test_get_pet_by_id_pet_invalid_input(pet_id, expected_status, default_
   
 
 
+@pytest.mark.asyncio
+async def test_find_pets_by_status_streamed(default_client: httpx.AsyncClient, pet_ids):
+    """
+    Test GET /pet/findByStatus validated item by item while the response streams in.
+
+    Args:
+        default_client (httpx.AsyncClient): The HTTP client used to make requests to the API.
+        pet_ids (idAllocator.IdBlock): The id source of the pets the test creates.
+
+    Asserts:
+        Every listed pet has the requested status and the pets just created are among them.
+    """
+    created = {pet_ids.next() for _ in range(3)}
+    for pet_id in created:
+        response = await default_client.post("/pet/", json=pet_payload(pet_id, status="pending"))
+        assert response.status_code == 200
+
+    found = set()
+    async with default_client.stream("GET", "/pet/findByStatus", params={"status": "pending"}) as response:
+        assert response.status_code == 200
+        stats = await validate_stream(response, on_item=lambda index, pet: found.add(pet.id))
+
+    assert set(stats.by_status) <= {"pending"}, f"unexpected statuses {stats.by_status}"
+    assert created <= found, f"{len(created - found)} created pets missing, {stats.invalid} invalid items: {stats.errors[:3]}"
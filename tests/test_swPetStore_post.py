@@ -1,7 +1,7 @@
 import pytest
 import httpx
-from test_swPetStore_fixtures import *
-from petModel import PetResponse
+from petDecoding import decode_pet
+from petGenerator import check_property
 
 @pytest.mark.asyncio
 @pytest.mark.post
@@ -14,19 +14,13 @@ async def test_post_pet(default_client: httpx.AsyncClient, mock_post_pet):
         mock_post_pet (dict): The mock data for the pet to be posted.
 
     Raises:
-        pytest.fail: If the response is not in JSON format.
-        pytest.fail: If the response does not have the pet model.
+        petDecoding.ResponseValidationError: If the response is not JSON or does not have the pet model.
         pytest.fail: If any of the different fields do not match the expected values.
     """
     response = await default_client.post("/pet/", json=mock_post_pet)
     assert response.status_code == 200
 
-    try:
-        data = response.json()
-    except ValueError:
-        pytest.fail("Response is not in JSON format")
-
-    pet_data = PetResponse(**data)
+    pet_data = decode_pet(response)
     assert pet_data.id == mock_post_pet["id"], "pet id does not match"
     assert pet_data.name == mock_post_pet["name"], "pet name does not match"
     assert pet_data.status == mock_post_pet["status"], "pet status does not match"
@@ -116,3 +110,58 @@ async def test_post_pet_name_invalid_dataType(default_client: httpx.AsyncClient,
     """
     response = await default_client.post("/pet/", json=mock_post_pet_name_int)
     assert response.status_code == 405, "an insertion of an integer name should not be allowed"
+
+@pytest.mark.asyncio
+@pytest.mark.post
+async def test_post_generated_pets(default_client: httpx.AsyncClient, pet_payload_generator, pet_ids, pytestconfig):
+    """
+    Property: every valid generated pet is created and returned exactly as sent.
+
+    Each case is posted under a fresh id of the test, so shrinking a failure never trips on a
+    duplicate id.
+
+    Args:
+        default_client (httpx.AsyncClient): The HTTP client used to make requests to the API.
+        pet_payload_generator (petGenerator.PayloadGenerator): The seeded payload generator.
+        pet_ids (idAllocator.IdBlock): The id source of the pets the test creates.
+        pytestconfig (pytest.Config): Gives the number of cases, --payload-cases.
+
+    Raises:
+        petGenerator.PropertyFailure: With the seed, the failing case and its shrunk payload.
+    """
+    async def created_as_sent(case):
+        payload = {**case.payload, "id": pet_ids.next()}
+        response = await default_client.post("/pet/", json=payload)
+        assert response.status_code == 200, f"status {response.status_code}"
+        assert decode_pet(response).model_dump() == {"category": {"id": 0, "name": ""}, "tags": [], **payload}
+
+    cases = pet_payload_generator.valid_cases(pytestconfig.getoption("payload_cases"))
+    await check_property(pet_payload_generator, cases, created_as_sent)
+
+@pytest.mark.asyncio
+@pytest.mark.post
+async def test_post_generated_invalid_pets(default_client: httpx.AsyncClient, pet_payload_generator, pet_ids,
+                                           pytestconfig):
+    """
+    Property: a generated pet with a missing required field, a wrongly typed value or an
+    unknown status is never created.
+
+    Each case is posted under a fresh id of the test, unless its mutation is on the id, so a
+    pet wrongly created never lands on an id of another test.
+
+    Args:
+        default_client (httpx.AsyncClient): The HTTP client used to make requests to the API.
+        pet_payload_generator (petGenerator.PayloadGenerator): The seeded payload generator.
+        pet_ids (idAllocator.IdBlock): The id source of the pets the test posts.
+        pytestconfig (pytest.Config): Gives the number of cases, --payload-cases.
+
+    Raises:
+        petGenerator.PropertyFailure: With the seed, the failing case and its shrunk payload.
+    """
+    async def rejected(case):
+        payload = case.payload if case.mutation[1] == ("id",) else {**case.payload, "id": pet_ids.next()}
+        response = await default_client.post("/pet/", json=payload)
+        assert response.status_code != 200, "an invalid pet should not be inserted"
+
+    cases = pet_payload_generator.invalid_cases(pytestconfig.getoption("payload_cases"))
+    await check_property(pet_payload_generator, cases, rejected)
@@ -1,24 +1,25 @@
 import pytest
 import httpx
-from test_swPetStore_fixtures import *
-from petModel import PetResponse
+from petDecoding import decode_pet
 
 
 @pytest.mark.asyncio
 @pytest.mark.put
-async def test_put_pet(default_client: httpx.AsyncClient, mock_post_pet):
+async def test_put_pet(default_client: httpx.AsyncClient, mock_post_pet, eventually):
     """
     Test the PUT /pet/ endpoint to update a pet's information.
 
     This test first creates a new pet using the POST /pet/ endpoint, then updates the pet's name using the PUT /pet/ endpoint.
     It verifies that the response status code is 200 and that the pet's information is correctly updated.
+    Each write is awaited until it is readable, the target may be eventually consistent.
 
     Args:
     default_client (httpx.AsyncClient): The HTTP client used to make requests to the API.
     mock_post_pet (dict): The mock data used to create a new pet.
+    eventually (callable): Polls until a condition holds, see `waitUntil.wait_until`.
 
     Raises:
-    pytest.fail: If the response is not in JSON format.
+    petDecoding.ResponseValidationError: If the response is not JSON or does not have the pet model.
 
     Asserts:
     response.status_code == 200: The response status code should be 200.
@@ -27,16 +28,17 @@ async def test_put_pet(default_client: httpx.AsyncClient, mock_post_pet):
     """
     response = await default_client.post("/pet/", json=mock_post_pet)
     data = response.json()
+    pet_url = f"/pet/{mock_post_pet['id']}"
+    await eventually(lambda: default_client.get(pet_url),
+                     lambda response: response.status_code == 200, label="pet created")
     data["name"] = "joey"
     response = await default_client.put("/pet/", json=data)
     assert response.status_code == 200
-    try:
-        data = response.json()
-    except ValueError:
-        pytest.fail("Response is not in JSON format")
-    pet_data = PetResponse(**data)
+    pet_data = decode_pet(response)
     assert pet_data.id == mock_post_pet["id"], "pet id does not match"
     assert pet_data.name == "joey", "updated pet name does not match"
+    await eventually(lambda: default_client.get(pet_url),
+                     lambda response: decode_pet(response).name == "joey", label="pet updated")
 
 
 @pytest.mark.asyncio
@@ -71,6 +73,7 @@ async def test_put_pet_required_fields(default_client: httpx.AsyncClient, mock_p
     (None),
     ("one")
 ])
+@pytest.mark.concurrent
 @pytest.mark.asyncio
 @pytest.mark.put
 async def test_put_pet_invalid_id(default_client: httpx.AsyncClient, mock_post_pet, pet_id):
@@ -0,0 +1,94 @@
+from typing import Dict
+
+import pytest
+import httpx
+from petDecoding import decode, decode_order
+
+
+@pytest.mark.asyncio
+@pytest.mark.post
+async def test_place_order(default_client: httpx.AsyncClient, mock_order, eventually):
+    """
+    Test the POST /store/order endpoint places an order that can then be fetched by its id.
+
+    Args:
+        default_client (httpx.AsyncClient): The HTTP client used to make requests to the API.
+        mock_order (dict): The mock data for the order to be placed.
+        eventually (callable): Polls until a condition holds, see `waitUntil.wait_until`.
+
+    Raises:
+        petDecoding.ResponseValidationError: If a response does not have the order model.
+    """
+    response = await default_client.post("/store/order", json=mock_order)
+    assert response.status_code == 200
+    order = decode_order(response)
+    assert order.id == mock_order["id"], "order id does not match"
+    assert order.petId == mock_order["petId"], "pet id does not match"
+    assert order.quantity == mock_order["quantity"], "quantity does not match"
+    assert order.status == mock_order["status"], "status does not match"
+    assert order.complete == mock_order["complete"], "complete does not match"
+
+    response = await eventually(lambda: default_client.get(f"/store/order/{mock_order['id']}"),
+                                lambda response: response.status_code == 200, label="order placed")
+    assert decode_order(response) == order, "the fetched order does not match the placed one"
+
+
+@pytest.mark.asyncio
+@pytest.mark.post
+async def test_place_order_invalid_status(default_client: httpx.AsyncClient, mock_order):
+    """
+    Test the POST /store/order endpoint refuses an order with a status outside of the enum.
+
+    Args:
+        default_client (httpx.AsyncClient): The HTTP client used to make requests to the API.
+        mock_order (dict): The mock data for the order, given an invalid status.
+    """
+    response = await default_client.post("/store/order", json=dict(mock_order, status="lost"))
+    assert response.status_code != 200, "an order with an invalid status should not be placed"
+
+
+@pytest.mark.asyncio
+@pytest.mark.delete
+async def test_delete_order(default_client: httpx.AsyncClient, mock_order, eventually):
+    """
+    Test the DELETE /store/order/{orderId} endpoint removes a placed order.
+
+    Args:
+        default_client (httpx.AsyncClient): The HTTP client used to make requests to the API.
+        mock_order (dict): The mock data for the order to be placed and deleted.
+        eventually (callable): Polls until a condition holds, see `waitUntil.wait_until`.
+    """
+    response = await default_client.post("/store/order", json=mock_order)
+    assert response.status_code == 200
+
+    order_id = mock_order["id"]
+    await eventually(lambda: default_client.delete(f"/store/order/{order_id}"),
+                     lambda response: response.status_code == 200, label="order deleted")
+    await eventually(lambda: default_client.get(f"/store/order/{order_id}"),
+                     lambda response: response.status_code == 404, label="order gone")
+
+
+@pytest.mark.asyncio
+@pytest.mark.get
+async def test_get_inventory(default_client: httpx.AsyncClient, mock_post_pet, eventually):
+    """
+    Test the GET /store/inventory endpoint counts the pets of a status once one is posted.
+
+    Other tests post and delete pets concurrently, so only the presence of the status is checked,
+    not its count.
+
+    Args:
+        default_client (httpx.AsyncClient): The HTTP client used to make requests to the API.
+        mock_post_pet (dict): The mock data for the pet to be posted.
+        eventually (callable): Polls until a condition holds, see `waitUntil.wait_until`.
+
+    Raises:
+        petDecoding.ResponseValidationError: If the inventory is not a map of status to count.
+    """
+    response = await default_client.post("/pet", json=mock_post_pet)
+    assert response.status_code == 200
+
+    response = await eventually(lambda: default_client.get("/store/inventory"),
+                                lambda response: decode(response, Dict[str, int]).get(mock_post_pet["status"], 0) > 0,
+                                label="pet in inventory")
+    assert all(count >= 0 for count in decode(response, Dict[str, int]).values()), "counts must not be negative"
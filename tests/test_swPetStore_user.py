@@ -0,0 +1,78 @@
+import pytest
+import httpx
+from petDecoding import decode_user
+
+
+@pytest.mark.asyncio
+@pytest.mark.post
+async def test_create_user(default_client: httpx.AsyncClient, mock_user, eventually):
+    """
+    Test the POST /user endpoint creates a user that can then be fetched by its username.
+
+    Args:
+        default_client (httpx.AsyncClient): The HTTP client used to make requests to the API.
+        mock_user (dict): The mock data for the user to be created.
+        eventually (callable): Polls until a condition holds, see `waitUntil.wait_until`.
+
+    Raises:
+        petDecoding.ResponseValidationError: If the fetched user does not have the user model.
+    """
+    response = await default_client.post("/user", json=mock_user)
+    assert response.status_code == 200
+
+    response = await eventually(lambda: default_client.get(f"/user/{mock_user['username']}"),
+                                lambda response: response.status_code == 200, label="user created")
+    user = decode_user(response)
+    assert user.username == mock_user["username"], "username does not match"
+    assert user.email == mock_user["email"], "email does not match"
+    assert user.userStatus == mock_user["userStatus"], "userStatus does not match"
+
+
+@pytest.mark.parametrize("path", ["/user/createWithArray", "/user/createWithList"])
+@pytest.mark.parametrize("size", [1, 10, 100])
+@pytest.mark.asyncio
+@pytest.mark.post
+async def test_create_users_in_bulk(default_client: httpx.AsyncClient, mock_user_batch, eventually, path, size):
+    """
+    Test the bulk user endpoints create every user of the batch.
+
+    The first and the last user of the batch are fetched back, so a batch cut short shows.
+
+    Args:
+        default_client (httpx.AsyncClient): The HTTP client used to make requests to the API.
+        mock_user_batch (callable): Builds a batch of mock users.
+        eventually (callable): Polls until a condition holds, see `waitUntil.wait_until`.
+        path (str): The bulk endpoint.
+        size (int): Number of users in the batch.
+    """
+    users = mock_user_batch(size)
+    response = await default_client.post(path, json=users)
+    assert response.status_code == 200
+
+    for expected in (users[0], users[-1]):
+        response = await eventually(lambda: default_client.get(f"/user/{expected['username']}"),
+                                    lambda response: response.status_code == 200, label="user created")
+        user = decode_user(response)
+        assert user.username == expected["username"], "username does not match"
+        assert user.id == expected["id"], "user id does not match"
+
+
+@pytest.mark.asyncio
+@pytest.mark.delete
+async def test_delete_user(default_client: httpx.AsyncClient, mock_user, eventually):
+    """
+    Test the DELETE /user/{username} endpoint removes a created user.
+
+    Args:
+        default_client (httpx.AsyncClient): The HTTP client used to make requests to the API.
+        mock_user (dict): The mock data for the user to be created and deleted.
+        eventually (callable): Polls until a condition holds, see `waitUntil.wait_until`.
+    """
+    response = await default_client.post("/user", json=mock_user)
+    assert response.status_code == 200
+
+    username = mock_user["username"]
+    await eventually(lambda: default_client.delete(f"/user/{username}"),
+                     lambda response: response.status_code == 200, label="user deleted")
+    await eventually(lambda: default_client.get(f"/user/{username}"),
+                     lambda response: response.status_code == 404, label="user gone")
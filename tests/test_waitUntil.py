@@ -0,0 +1,55 @@
+import random
+import pytest
+from waitUntil import Backoff, ConvergenceLog, ConvergenceTimeout, wait_until
+
+
+def test_backoff_grows_with_jitter_and_cap():
+    """
+    Test delays double per attempt up to the cap and jitter only ever shortens them.
+    """
+    exact = Backoff(initial=0.1, factor=2, maximum=0.5, jitter=0)
+    assert [exact.delay(attempt) for attempt in range(5)] == [0.1, 0.2, 0.4, 0.5, 0.5]
+    jittered = Backoff(initial=0.1, factor=2, maximum=0.5, jitter=0.5, rng=random.Random(1))
+    delays = [jittered.delay(2) for _ in range(50)]
+    assert all(0.2 <= delay <= 0.4 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+@pytest.mark.asyncio
+async def test_wait_until_converges_and_records():
+    """
+    Test a condition that holds on the third attempt is retried, returned and recorded.
+    """
+    log = ConvergenceLog(timeout=5)
+    eventually = log.for_test("tests/test_x.py::test_y")
+    attempts = []
+
+    async def probe():
+        attempts.append(len(attempts))
+        return len(attempts)
+
+    value = await eventually(probe, lambda count: count >= 3, backoff=Backoff(initial=0.001), label="replicated")
+    assert value == 3
+    record = log.records[0]
+    assert (record.label, record.attempts, record.converged) == ("replicated", 3, True)
+    assert "replicated: 1 waits, 1 retried, 0 timed out" in log.summary()[0]
+
+
+@pytest.mark.asyncio
+async def test_wait_until_times_out_with_last_failure():
+    """
+    Test an asserting condition that never holds fails at the deadline with its last assertion.
+    """
+    async def probe():
+        return 404
+
+    def deleted(status):
+        assert status == 200, f"still {status}"
+
+    done = []
+    with pytest.raises(ConvergenceTimeout) as timeout:
+        await wait_until(probe, deleted, timeout=0.05, backoff=Backoff(initial=0.01), label="pet visible",
+                         on_done=lambda *result: done.append(result))
+    assert timeout.value.attempts > 1
+    assert "still 404" in str(timeout.value)
+    assert done[0][2] is False
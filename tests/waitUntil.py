@@ -0,0 +1,158 @@
+import asyncio
+import collections
+import inspect
+import json
+import random
+import time
+
+from requestTiming import percentile
+
+
+class ConvergenceTimeout(AssertionError):
+    """The condition of `wait_until` did not hold before its deadline."""
+
+    def __init__(self, label, attempts, elapsed, last):
+        self.label = label
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.last = last
+        super().__init__(f"{label} did not hold after {attempts} attempts in {elapsed:.2f}s, last: {last}")
+
+
+class Convergence:
+    """How long one wait took: attempts, seconds until the condition held (or gave up), and whether it did."""
+
+    def __init__(self, label, nodeid, attempts, elapsed, converged):
+        self.label = label
+        self.nodeid = nodeid
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.converged = converged
+
+    def as_dict(self):
+        return {
+            "label": self.label,
+            "nodeid": self.nodeid,
+            "attempts": self.attempts,
+            "elapsed_ms": self.elapsed * 1000,
+            "converged": self.converged,
+        }
+
+
+class Backoff:
+    """
+    Exponential backoff with jitter: `initial` seconds, times `factor` per attempt, capped at
+    `maximum`, each delay randomly shortened by up to `jitter` of itself so pollers spread out.
+    """
+
+    def __init__(self, initial=0.05, factor=2.0, maximum=1.0, jitter=0.5, rng=None):
+        self.initial = initial
+        self.factor = factor
+        self.maximum = maximum
+        self.jitter = jitter
+        self.random = rng or random.Random()
+
+    def delay(self, attempt):
+        delay = min(self.maximum, self.initial * self.factor ** attempt)
+        return delay * (1 - self.jitter * self.random.random())
+
+
+def _describe(value):
+    status = getattr(value, "status_code", None)
+    if status is not None:
+        return f"status {status}, body {value.text[:200]!r}"
+    return repr(value)
+
+
+async def wait_until(probe, condition, timeout=10.0, backoff=None, label="condition", on_done=None):
+    """
+    Call `probe` until `condition` holds for its result, backing off between attempts.
+
+    The first attempt is immediate, so a target that is already consistent costs no waiting.
+    `condition` either returns a truth value or asserts; an AssertionError counts as not holding.
+
+    Args:
+        probe (callable): Async callable returning the value to check, e.g. `lambda: client.get(url)`.
+        condition (callable): Called with the probed value.
+        timeout (float): Seconds after which to give up.
+        backoff (Backoff): The delays between attempts, `Backoff()` by default.
+        label (str): What is awaited, for the error and the metrics.
+        on_done (callable): Called with `(attempts, elapsed seconds, converged)` when done.
+
+    Returns:
+        The last probed value, the one the condition held for.
+
+    Raises:
+        ConvergenceTimeout: If the condition still did not hold at the deadline.
+    """
+    backoff = backoff or Backoff()
+    started = time.perf_counter()
+    deadline = started + timeout
+    attempts = 0
+    while True:
+        value = await probe()
+        attempts += 1
+        try:
+            result = condition(value)
+            if inspect.isawaitable(result):
+                result = await result
+            held = result is None or bool(result)
+            last = value
+        except AssertionError as error:
+            held = False
+            last = error
+        elapsed = time.perf_counter() - started
+        if held:
+            if on_done is not None:
+                on_done(attempts, elapsed, True)
+            return value
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            if on_done is not None:
+                on_done(attempts, elapsed, False)
+            raise ConvergenceTimeout(label, attempts, elapsed, _describe(last))
+        await asyncio.sleep(min(backoff.delay(attempts - 1), remaining))
+
+
+class ConvergenceLog:
+    """
+    Convergence times of a test session, the replication lag seen by the tests.
+
+    Args:
+        timeout (float): The default deadline of the waits.
+        keep (int or None): Number of the latest waits kept, all of them by default.
+    """
+
+    def __init__(self, timeout=10.0, keep=None):
+        self.timeout = timeout
+        self.records = [] if keep is None else collections.deque(maxlen=keep)
+
+    def for_test(self, nodeid):
+        """Return an async `wait_until` bound to the test `nodeid` that records every wait in the log."""
+
+        async def eventually(probe, condition, timeout=None, backoff=None, label="condition"):
+            def record(attempts, elapsed, converged):
+                self.records.append(Convergence(label, nodeid, attempts, elapsed, converged))
+
+            return await wait_until(probe, condition, self.timeout if timeout is None else timeout,
+                                    backoff, label, record)
+
+        return eventually
+
+    def summary(self):
+        grouped = {}
+        for record in self.records:
+            grouped.setdefault(record.label, []).append(record)
+        rows = []
+        for label, records in sorted(grouped.items()):
+            elapsed = sorted(record.elapsed * 1000 for record in records)
+            retried = sum(record.attempts > 1 for record in records)
+            timeouts = sum(not record.converged for record in records)
+            rows.append(f"{label}: {len(records)} waits, {retried} retried, {timeouts} timed out, "
+                        f"p50 {percentile(elapsed, 50):.1f}ms p95 {percentile(elapsed, 95):.1f}ms "
+                        f"max attempts {max(record.attempts for record in records)}")
+        return rows
+
+    def write_json(self, path):
+        with open(path, "w") as file:
+            json.dump({"waits": [record.as_dict() for record in self.records]}, file, indent=2)